@@ -1,13 +1,25 @@
-from agent.agent_graph import build_agent_graph
+import asyncio
+import importlib
+from contextlib import aclosing
 from agent.state import AgentState
-from agent.llm import create_ollama_llm, DEFAULT_MODEL
+from agent.conf.config import DEFAULT_MODEL
+from agent.runtime import get_runtime, rebuild_runtimes
 
-def answer_with_agent(question: str, model_name=DEFAULT_MODEL):
-    """LangGraph 에이전트를 사용하여 질문에 답변"""
-    agent = build_agent_graph()
-    
-    # 에이전트 실행
-    initial_state = {
+# LangGraph/LangChain을 불러오는 모듈은 처음 사용할 때 import
+_LAZY_EXPORTS = {
+    "build_agent_graph": "agent.agent_graph",
+    "create_ollama_llm": "agent.llm",
+}
+
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'agent' has no attribute '{name}'")
+    return getattr(importlib.import_module(module), name)
+
+def create_initial_state(question: str) -> AgentState:
+    """그래프 실행에 사용할 초기 상태 생성"""
+    return {
         "question": question,
         "thoughts": [],
         "research_results": "",
@@ -18,36 +30,70 @@ def answer_with_agent(question: str, model_name=DEFAULT_MODEL):
         "work_results": None,
         "next": "check_game_resource"
     }
+
+def stage_outputs(state) -> dict:
+    """작업 기록에 남길 단계별 중간 결과 (task_blobs로 압축 저장)"""
+    return {
+        "thoughts": "\n\n".join(str(thought) for thought in state.get("thoughts") or []),
+        "research_results": str(state.get("research_results") or ""),
+        "work_results": str(state.get("work_results") or ""),
+    }
+
+async def aanswer_with_agent(question: str, model_name=DEFAULT_MODEL, provider="ollama"):
+    """LangGraph 에이전트를 사용하여 질문에 답변 (비동기, provider는 노드에서 사용할 LLM - 'ollama' 또는 'google')"""
+    # 미리 컴파일된 런타임 재사용
+    agent = get_runtime(model_name, provider=provider)
     
     # 그래프 실행 및 결과 반환
-    result = agent.invoke(initial_state)
+    result = await agent.ainvoke(create_initial_state(question))
     return result
 
+def answer_with_agent(question: str, model_name=DEFAULT_MODEL):
+    """LangGraph 에이전트를 사용하여 질문에 답변 (이벤트 루프 밖에서 사용하는 동기 버전)"""
+    return asyncio.run(aanswer_with_agent(question, model_name))
+
+async def stream_agent_events(question: str, model_name=DEFAULT_MODEL, provider="ollama"):
+    """
+    에이전트 실행 이벤트를 순서대로 생성 (provider는 노드에서 사용할 LLM - 'ollama' 또는 'google')
+
+    Yields:
+        dict: 노드 완료 시 {"event": "node", "node": 이름},
+              답변 토큰마다 {"event": "token", "text": 토큰},
+              마지막으로 {"event": "done", "answer": 최종 답변, "intermediates": 단계별 중간 결과}
+    """
+    agent = get_runtime(model_name, provider=provider)
+    final_state = {}
+    
+    # 소비하는 쪽이 스트림을 닫으면 실행 중인 노드(진행 중인 LLM 요청 포함)도 취소
+    async with aclosing(agent.astream(create_initial_state(question), stream_mode=["updates", "custom"])) as stream:
+        async for mode, chunk in stream:
+            if mode == "custom":
+                if "token" in chunk:
+                    yield {"event": "token", "text": chunk["token"]}
+                continue
+            
+            for node, update in chunk.items():
+                final_state.update(update or {})
+                yield {"event": "node", "node": node}
+    
+    yield {"event": "done", "answer": final_state.get("answer", ""), "intermediates": stage_outputs(final_state)}
+
 def streaming_agent_execution(question: str, model_name=DEFAULT_MODEL):
     """에이전트 실행 과정을 스트리밍 방식으로 출력"""
+    asyncio.run(_print_agent_execution(question, model_name))
+
+async def _print_agent_execution(question: str, model_name=DEFAULT_MODEL):
     print("=== 에이전트 실행 시작 ===\n")
     
     print(f"📝 질문: {question}\n")
     
-    agent = build_agent_graph()
-    
-    # 에이전트 실행 및 각 단계 출력
-    initial_state = {
-        "question": question,
-        "thoughts": [],
-        "research_results": "",
-        "answer": "",
-        "is_game_resource_request": False,
-        "resource_type": None,
-        "resource_details": {},
-        "work_results": None,
-        "next": "check_game_resource"
-    }
+    agent = get_runtime(model_name)
     
-    for event in agent.stream(initial_state):
-        node = event.get("node")
-        if node:
-            state = event["state"]
+    # 에이전트 실행 및 각 단계 출력 (노드별 변경분을 누적하여 현재 상태 유지)
+    state = create_initial_state(question)
+    async for event in agent.astream(create_initial_state(question)):
+        for node, update in event.items():
+            state = {**state, **(update or {})}
             
             if node == "check_game_resource":
                 is_valid = state.get("is_game_resource_request", False) and state.get("resource_type") in ["3d_model", "animation"]
@@ -0,0 +1,137 @@
+"""
+백엔드별 동시 실행 수 제한과 우선순위 대기열을 관리하는 admission control 모듈
+
+각 백엔드(ollama, google)는 최대 동시 실행 수, 최대 대기열 길이, 대기 시간 제한을 가지며
+대기열이 가득 차면 즉시 거절(429)하고, 대기 시간이 초과되면 거절(503)합니다.
+"""
+
+import math
+import heapq
+import itertools
+import asyncio
+from contextlib import asynccontextmanager
+from agent.tracing import span
+from agent.conf.config import (
+    OLLAMA_MAX_CONCURRENCY, OLLAMA_MAX_QUEUE, OLLAMA_QUEUE_TIMEOUT,
+    GOOGLE_MAX_CONCURRENCY, GOOGLE_MAX_QUEUE, GOOGLE_QUEUE_TIMEOUT
+)
+
+# 우선순위 클래스 (값이 작을수록 먼저 처리)
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+class AdmissionRejected(Exception):
+    """대기열이 가득 찼거나 대기 시간이 초과되어 요청을 받을 수 없는 경우"""
+
+    def __init__(self, message, status_code, retry_after):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """동시 실행 슬롯과 우선순위 대기열"""
+
+    def __init__(self, name, max_concurrency, max_queue, queue_timeout):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiters = []
+        self._counter = itertools.count()
+        self._avg_hold = 1.0
+        self.stats = {"admitted": 0, "queued": 0, "rejected_full": 0, "rejected_timeout": 0}
+
+    @property
+    def active(self):
+        return self._active
+
+    @property
+    def queue_depth(self):
+        return sum(1 for *_, future in self._waiters if not future.done())
+
+    def retry_after(self) -> int:
+        """평균 실행 시간과 대기열 길이로 재시도까지 기다릴 시간(초) 추정"""
+        estimate = self._avg_hold * (self.queue_depth + 1) / max(self.max_concurrency, 1)
+        return max(1, math.ceil(estimate))
+
+    def check(self):
+        """대기열이 가득 찼으면 바로 AdmissionRejected 발생 (슬롯은 잡지 않음)"""
+        if self._active >= self.max_concurrency and self.queue_depth >= self.max_queue:
+            self.stats["rejected_full"] += 1
+            raise AdmissionRejected(
+                f"{self.name} 백엔드 대기열이 가득 찼습니다. (최대 {self.max_queue}개)",
+                status_code=429, retry_after=self.retry_after()
+            )
+
+    async def acquire(self, priority="normal"):
+        """실행 슬롯 획득. 빈 슬롯이 없으면 우선순위 순서대로 대기"""
+        if self._active < self.max_concurrency and self.queue_depth == 0:
+            self._active += 1
+            self.stats["admitted"] += 1
+            return
+
+        self.check()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITIES.get(priority, PRIORITIES["normal"]), next(self._counter), future))
+        self.stats["queued"] += 1
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await future
+        except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+            # release()가 슬롯을 넘겨준 직후에 취소/시간 초과되면 받은 슬롯을 바로 반환
+            if future.done() and not future.cancelled():
+                self.release()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.stats["rejected_timeout"] += 1
+            raise AdmissionRejected(
+                f"{self.name} 백엔드 대기 시간({self.queue_timeout}초)이 초과되었습니다.",
+                status_code=503, retry_after=self.retry_after()
+            )
+        self.stats["admitted"] += 1
+
+    def release(self, held_seconds=None):
+        """슬롯 반환. 대기 중인 요청이 있으면 슬롯을 바로 넘겨줌"""
+        if held_seconds is not None:
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * held_seconds
+
+        while self._waiters:
+            *_, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority="normal"):
+        with span("admission.wait", backend=self.name, priority=priority):
+            await self.acquire(priority)
+        started = asyncio.get_running_loop().time()
+        try:
+            yield
+        finally:
+            self.release(asyncio.get_running_loop().time() - started)
+
+    def snapshot(self):
+        return {
+            **self.stats,
+            "active": self._active,
+            "queue_depth": self.queue_depth,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "avg_hold_seconds": round(self._avg_hold, 3),
+        }
+
+# 백엔드별 컨트롤러
+controllers = {
+    "ollama": AdmissionController("ollama", OLLAMA_MAX_CONCURRENCY, OLLAMA_MAX_QUEUE, OLLAMA_QUEUE_TIMEOUT),
+    "google": AdmissionController("google", GOOGLE_MAX_CONCURRENCY, GOOGLE_MAX_QUEUE, GOOGLE_QUEUE_TIMEOUT),
+}
+
+def get_controller(service: str) -> AdmissionController:
+    """서비스 이름에 해당하는 컨트롤러 반환 (google 외에는 ollama)"""
+    return controllers["google" if service.lower() == "google" else "ollama"]
+
+def admission_stats():
+    return {name: controller.snapshot() for name, controller in controllers.items()}
@@ -1,4 +1,5 @@
-from typing import Union, Literal
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Tuple, Union
 from langgraph.graph import StateGraph, END
 
 from agent.state import AgentState
@@ -7,57 +8,88 @@ from agent.think import think
 from agent.research import research
 from agent.work import work_step
 from agent.answer import generate_answer
+from agent.metrics import instrument_node
 
-def router(state: AgentState) -> Union[Literal["think", "research_step", "answer_step", "work_step", "reject_request"], Literal[END]]:
-    """다음 단계 결정"""
-    next_step = state["next"]
-    # END 문자열을 실제 END 상수로 변환
-    if next_step == "END":
-        return END
-    return next_step
+@dataclass(frozen=True)
+class Stage:
+    """파이프라인 단계 선언: 실행에 필요한 상태 키와 생성하는 상태 키"""
+    name: str
+    func: Callable
+    requires: Tuple[str, ...]
+    produces: Tuple[str, ...]
 
-def build_agent_graph():
+# check_game_resource 단계가 끝나면 사용할 수 있는 상태 키
+CHECK_OUTPUTS = ("question", "is_game_resource_request", "resource_type", "resource_details")
+
+# 게임 리소스 요청 파이프라인
+# research_step은 게임 리소스 요청일 때 thoughts를 사용하지 않으므로 think와 병렬로 실행됩니다.
+RESOURCE_PIPELINE = (
+    Stage("think", think, requires=("question",), produces=("thoughts",)),
+    Stage("research_step", research, requires=("resource_type", "resource_details"), produces=("research_results",)),
+    Stage("work_step", work_step, requires=("resource_type",), produces=("work_results",)),
+    Stage("answer_step", generate_answer,
+          requires=("question", "resource_type", "research_results", "work_results"), produces=("answer",)),
+)
+
+def schedule_stages(stages: Iterable[Stage], available: Iterable[str]) -> List[List[Stage]]:
+    """
+    선언된 입력 의존성에 따라 단계들을 병렬 실행 가능한 레벨로 묶음
+
+    각 레벨의 단계는 이전 레벨까지 생성된 상태 키만 필요로 하므로 동시에 실행할 수 있고,
+    다음 레벨은 이전 레벨의 모든 단계가 끝난 뒤 실행됩니다.
+
+    Raises:
+        ValueError: 어떤 단계의 입력도 만족시킬 수 없는 경우
+    """
+    produced = set(available)
+    remaining = list(stages)
+    levels = []
+
+    while remaining:
+        ready = [stage for stage in remaining if set(stage.requires) <= produced]
+        if not ready:
+            missing = {stage.name: sorted(set(stage.requires) - produced) for stage in remaining}
+            raise ValueError(f"입력을 만족할 수 없는 단계가 있습니다: {missing}")
+
+        levels.append(ready)
+        for stage in ready:
+            produced.update(stage.produces)
+        remaining = [stage for stage in remaining if stage not in ready]
+
+    return levels
+
+def build_agent_graph(stages: Iterable[Stage] = RESOURCE_PIPELINE):
     """에이전트 그래프 구성"""
     workflow = StateGraph(AgentState)
-    
-    # 노드 추가
-    workflow.add_node("check_game_resource", check_game_resource_request)
-    workflow.add_node("reject_request", reject_request)
-    workflow.add_node("think", think)
-    workflow.add_node("research_step", research)
-    workflow.add_node("work_step", work_step)
-    workflow.add_node("answer_step", generate_answer)
-    
+    levels = schedule_stages(stages, CHECK_OUTPUTS)
+    first_level = [stage.name for stage in levels[0]]
+
+    # 노드 추가 (노드별 실행 시간/오류 수 기록)
+    workflow.add_node("check_game_resource", instrument_node("check_game_resource", check_game_resource_request))
+    workflow.add_node("reject_request", instrument_node("reject_request", reject_request))
+    for level in levels:
+        for stage in level:
+            workflow.add_node(stage.name, instrument_node(stage.name, stage.func))
+
     # 시작 노드 설정
     workflow.set_entry_point("check_game_resource")
-    
-    # 엣지 연결
-    workflow.add_conditional_edges("check_game_resource", router, {
-        "think": "think",
-        "reject_request": "reject_request"
-    })
-    
-    workflow.add_conditional_edges("reject_request", router, {
-        END: END
-    })
-    
-    workflow.add_conditional_edges("think", router, {
-        "research_step": "research_step",
-        "answer_step": "answer_step"
-    })
-    
-    workflow.add_conditional_edges("research_step", router, {
-        "work_step": "work_step",
-        "answer_step": "answer_step"
-    })
-    
-    workflow.add_conditional_edges("work_step", router, {
-        "answer_step": "answer_step"
-    })
-    
-    workflow.add_conditional_edges("answer_step", router, {
-        END: END
-    })
-    
+
+    # 요청 분석 후 거부하거나 첫 레벨 단계들로 동시에 분기
+    def route_after_check(state: AgentState) -> Union[str, List[str]]:
+        if state["next"] == "reject_request":
+            return "reject_request"
+        return first_level
+
+    workflow.add_conditional_edges("check_game_resource", route_after_check, ["reject_request", *first_level])
+    workflow.add_edge("reject_request", END)
+
+    # 레벨 사이는 이전 레벨의 모든 단계가 끝날 때까지 기다린 뒤 진행 (join)
+    for previous, current in zip(levels, levels[1:]):
+        for stage in current:
+            workflow.add_edge([prev.name for prev in previous], stage.name)
+
+    for stage in levels[-1]:
+        workflow.add_edge(stage.name, END)
+
     # 그래프 컴파일
-    return workflow.compile()
\ No newline at end of file
+    return workflow.compile()
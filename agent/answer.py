@@ -1,54 +1,46 @@
-import json
+from langchain_core.runnables import RunnableConfig
+from langgraph.config import get_stream_writer
 from agent.state import AgentState
-from agent.llm import create_ollama_llm
-from langchain_core.prompts import PromptTemplate
+from agent.runtime import node_runtime
+from agent.budget import build_prompt
 
-def generate_answer(state: AgentState) -> AgentState:
+async def stream_tokens(llm, prompt_text: str) -> str:
+    """LLM 출력을 토큰 단위로 스트림 라이터에 전달하면서 전체 답변을 반환"""
+    writer = get_stream_writer()
+    chunks = []
+    async for chunk in llm.astream(prompt_text):
+        chunks.append(chunk)
+        writer({"token": chunk})
+    return "".join(chunks)
+
+async def generate_answer(state: AgentState, config: RunnableConfig) -> AgentState:
     """답변 생성 단계: 최종 답변 작성"""
-    llm = create_ollama_llm()
+    runtime = node_runtime(config)
+    llm = runtime.node_llm("answer_step")
     
     if state.get("is_game_resource_request", False) and state.get("work_results"):
-        prompt = PromptTemplate.from_template(
-            """게임 리소스 제작 요청에 대한 최종 답변을 생성하세요:
-            
-            요청 내용: {question}
-            요청 유형: {resource_type}
-            조사 결과: {research_results}
-            작업 결과: {work_results}
-            
-            사용자가 이해하기 쉽게 리소스 제작 과정과 결과를 설명하는 답변을 작성하세요:"""
-        )
+        prompt = runtime.prompts["answer_resource"]
         
         resource_type = "3D 모델" if state["resource_type"] == "3d_model" else "애니메이션"
-        answer = llm.invoke(
-            prompt.format(
-                question=state["question"],
-                resource_type=resource_type,
-                research_results=state["research_results"],
-                work_results=state["work_results"]
-            )
+        answer = await stream_tokens(
+            llm,
+            build_prompt("answer_step", prompt, {
+                "question": state["question"],
+                "resource_type": resource_type
+            }, {
+                "research_results": state["research_results"],
+                "work_results": state["work_results"]
+            })
         )
     else:
-        prompt = PromptTemplate.from_template(
-            """질문에 대한 최종 답변을 생성하세요:
-            
-            질문: {question}
-            지금까지 사고: {thoughts}
-            조사 결과: {research_results}
-            
-            명확하고 구조화된 최종 답변:"""
-        )
+        prompt = runtime.prompts["answer_general"]
         
-        answer = llm.invoke(
-            prompt.format(
-                question=state["question"],
-                thoughts="\n".join(state["thoughts"]),
-                research_results=state["research_results"]
-            )
+        answer = await stream_tokens(
+            llm,
+            build_prompt("answer_step", prompt, {"question": state["question"]}, {
+                "thoughts": "\n".join(state["thoughts"]),
+                "research_results": state["research_results"]
+            })
         )
     
-    return {
-        **state,
-        "answer": answer,
-        "next": "END"
-    }
\ No newline at end of file
+    return {"answer": answer}
@@ -0,0 +1,146 @@
+"""
+노드별 토큰 예산과 컨텍스트 압축 모듈
+
+앞 단계 결과(research_results, thoughts 등)는 길이 제한 없이 다음 프롬프트에 들어가므로, 노드마다
+- 입력 예산(NODE_INPUT_BUDGETS): 프롬프트 크기. 넘으면 앞 단계 결과를 중요 문장 추출 또는 자르기로 줄임
+- 출력 예산(NODE_OUTPUT_BUDGETS): 생성 최대 토큰 (Ollama num_predict, Google max_output_tokens)
+을 적용하여 단계별 처리 시간과 컨텍스트 사용량을 일정하게 유지합니다.
+토큰 수는 토크나이저 없이 문자 수로 추정합니다 (ASCII 약 4자, 한글 등은 약 1.5자당 1토큰).
+"""
+
+import re
+import math
+import hashlib
+from collections import Counter
+from agent.metrics import CONTEXT_TOKENS_SAVED, NODE_PROMPT_TOKENS
+from agent.tracing import span
+from agent.conf.config import TOKEN_BUDGETS_ENABLED, NODE_INPUT_BUDGETS, NODE_OUTPUT_BUDGETS, CONTEXT_COMPACTION
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?。])\s+|\n+")
+_WORD = re.compile(r"\w+")
+
+def parse_budgets(spec):
+    """"노드=토큰 수,..." 형식 문자열을 dict로 변환"""
+    budgets = {}
+    for item in spec.split(","):
+        if "=" in item:
+            node, tokens = item.split("=", 1)
+            budgets[node.strip()] = int(tokens)
+    return budgets
+
+input_budgets = parse_budgets(NODE_INPUT_BUDGETS)
+output_budgets = parse_budgets(NODE_OUTPUT_BUDGETS)
+
+def budget_signature():
+    """예산 설정의 해시 (노드 결과 캐시 키에 포함하여 예산을 바꾸면 캐시를 다시 채움)"""
+    raw = f"{TOKEN_BUDGETS_ENABLED}\x00{NODE_INPUT_BUDGETS}\x00{NODE_OUTPUT_BUDGETS}\x00{CONTEXT_COMPACTION}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:12]
+
+def output_budget(node):
+    """노드의 생성 최대 토큰 수 (예산이 없으면 None)"""
+    return output_budgets.get(node) if TOKEN_BUDGETS_ENABLED else None
+
+def estimate_tokens(text):
+    """문자 수 기반 토큰 수 추정"""
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 1.5)
+
+def truncate(text, max_tokens):
+    """추정 토큰 수가 max_tokens 이하가 되도록 뒷부분을 자름"""
+    if max_tokens <= 0:
+        return ""
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    cut = int(len(text) * max_tokens / tokens)
+    while cut > 0 and estimate_tokens(text[:cut]) + 1 > max_tokens:
+        cut -= max(1, cut // 20)
+    return text[:max(cut, 0)].rstrip() + "…"
+
+def summarize(text, max_tokens):
+    """
+    중요 문장 추출 요약
+
+    문장마다 문서 전체에서 자주 나온 단어의 평균 빈도로 점수를 매기고(첫 문장은 가산),
+    점수가 높은 문장부터 예산 안에 들어가는 만큼 골라 원래 순서대로 이어 붙입니다.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    sentences = [sentence.strip() for sentence in _SENTENCE_BREAK.split(text) if sentence.strip()]
+    if len(sentences) <= 1:
+        return truncate(text, max_tokens)
+
+    words = [[word for word in _WORD.findall(sentence.lower()) if len(word) > 1] for sentence in sentences]
+    frequency = Counter(word for sentence_words in words for word in sentence_words)
+
+    def score(index):
+        if not words[index]:
+            return 0.0
+        value = sum(frequency[word] for word in words[index]) / len(words[index])
+        return value * 1.5 if index == 0 else value
+
+    chosen, used = [], 0
+    for index in sorted(range(len(sentences)), key=score, reverse=True):
+        cost = estimate_tokens(sentences[index]) + 1
+        if used + cost <= max_tokens:
+            chosen.append(index)
+            used += cost
+    if not chosen:
+        return truncate(sentences[0], max_tokens)
+    return "\n".join(sentences[index] for index in sorted(chosen))
+
+def compact(text, max_tokens):
+    """CONTEXT_COMPACTION 방식으로 text를 max_tokens 이하로 줄임"""
+    return truncate(text, max_tokens) if CONTEXT_COMPACTION == "truncate" else summarize(text, max_tokens)
+
+def _allocate(sizes, available):
+    """
+    남은 예산을 필드에 나눠 줌 (작은 필드는 그대로 두고, 남는 예산을 큰 필드끼리 똑같이 나눔)
+    """
+    allocation = {}
+    remaining = max(available, 0)
+    ordered = sorted(sizes, key=sizes.get)
+    for index, name in enumerate(ordered):
+        share = remaining // (len(ordered) - index)
+        allocation[name] = min(sizes[name], share)
+        remaining -= allocation[name]
+    return allocation
+
+def build_prompt(node, template, fixed, compactable=None):
+    """
+    노드 입력 예산에 맞춰 프롬프트 생성
+
+    Args:
+        node (str): 그래프 노드 이름 (예산과 지표에 사용)
+        template: PromptTemplate
+        fixed (dict): 줄이지 않는 값 (사용자 질문 등)
+        compactable (dict, optional): 예산을 넘으면 줄일 앞 단계 결과
+
+    Returns:
+        str: 완성된 프롬프트
+    """
+    compactable = compactable or {}
+    budget = input_budgets.get(node) if TOKEN_BUDGETS_ENABLED else None
+    prompt_text = template.format(**fixed, **compactable)
+    before = estimate_tokens(prompt_text)
+    if budget is None or before <= budget or not compactable:
+        NODE_PROMPT_TOKENS.observe(before, node=node)
+        return prompt_text
+
+    with span("compact_context", node=node, budget=budget, tokens_before=before) as compact_span:
+        overhead = estimate_tokens(template.format(**fixed, **{name: "" for name in compactable}))
+        sizes = {name: estimate_tokens(value) for name, value in compactable.items()}
+        allocation = _allocate(sizes, budget - overhead)
+        compacted = {
+            name: value if sizes[name] <= allocation[name] else compact(value, allocation[name])
+            for name, value in compactable.items()
+        }
+        prompt_text = template.format(**fixed, **compacted)
+        after = estimate_tokens(prompt_text)
+        if compact_span is not None:
+            compact_span.attrs["tokens_after"] = after
+
+    NODE_PROMPT_TOKENS.observe(after, node=node)
+    CONTEXT_TOKENS_SAVED.inc(before - after, node=node)
+    print(f"[{node}] 컨텍스트 압축: {before} → {after} 토큰 (추정, 예산 {budget})")
+    return prompt_text
@@ -0,0 +1,112 @@
+"""
+LLM 클라이언트에 연결하는 LangChain 콜백 모듈
+
+LangChain 콜백 모듈은 불러오는 데 시간이 걸리므로, 지표(metrics)와 추적(tracing) 모듈과 분리하여
+LLM 클라이언트를 만들 때만 불러옵니다.
+"""
+
+import asyncio
+from langchain_core.callbacks import BaseCallbackHandler
+from agent.metrics import LLM_ERRORS, LLM_TOKENS, LLM_TRUNCATIONS, current_node
+from agent.tracing import current_span
+from agent.cancellation import current_usage
+from agent.budget import estimate_tokens
+
+def _last_generation_info(response):
+    generations = [generation for batch in response.generations for generation in batch]
+    return (generations[-1].generation_info or {}) if generations else {}
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """Ollama 응답의 prompt_eval_count/eval_count를 노드별 토큰 수로 기록하는 콜백"""
+
+    # 별도 스레드로 넘기지 않고 바로 실행 (기록 비용이 작음)
+    run_inline = True
+
+    def on_llm_end(self, response, **kwargs):
+        node = current_node.get()
+        for generations in response.generations:
+            for generation in generations:
+                info = generation.generation_info or {}
+                LLM_TOKENS.inc(info.get("prompt_eval_count") or 0, backend="ollama", node=node, kind="prompt")
+                LLM_TOKENS.inc(info.get("eval_count") or 0, backend="ollama", node=node, kind="completion")
+
+    def on_llm_error(self, error, **kwargs):
+        # 취소는 오류로 세지 않음 (cancelled_generations_total에 기록)
+        if not isinstance(error, asyncio.CancelledError):
+            LLM_ERRORS.inc(backend="ollama", node=current_node.get())
+
+class LLMTraceHandler(BaseCallbackHandler):
+    """LLM 호출마다 프롬프트/응답 크기와 토큰 수를 담은 span 기록"""
+
+    run_inline = True
+
+    def __init__(self):
+        self._spans = {}
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        parent = current_span.get()
+        if parent is None:
+            return
+        self._spans[run_id] = parent.child("llm", prompt_chars=sum(len(prompt) for prompt in prompts))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        llm_span = self._spans.pop(run_id, None)
+        if llm_span is None:
+            return
+        generations = [generation for batch in response.generations for generation in batch]
+        info = _last_generation_info(response)
+        llm_span.finish(
+            completion_chars=sum(len(generation.text) for generation in generations),
+            # Ollama는 prompt_eval_count/eval_count, Google은 prompt_token_count/candidates_token_count
+            prompt_tokens=info.get("prompt_eval_count", info.get("prompt_token_count")),
+            completion_tokens=info.get("eval_count", info.get("candidates_token_count"))
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        llm_span = self._spans.pop(run_id, None)
+        if llm_span is None:
+            return
+        if isinstance(error, asyncio.CancelledError):
+            llm_span.finish(cancelled=True)
+        else:
+            llm_span.finish(error=str(error))
+
+class GenerationUsageHandler(BaseCallbackHandler):
+    """
+    실행 중인 요청의 생성 토큰 수 기록 (취소된 요청이 버린 토큰 수 계산에 사용)
+
+    Ollama 스트림은 청크 하나가 토큰 하나이고, Google 스트림은 청크가 길어 문자 수로 추정합니다.
+    생성 최대 토큰에 걸려 잘린 응답(done_reason이 length)은 노드를 기록해 호출한 쪽에 알립니다.
+    """
+
+    run_inline = True
+
+    def __init__(self, backend, estimate_chunks=False):
+        self.backend = backend
+        self.estimate_chunks = estimate_chunks
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        usage = current_usage.get()
+        if usage is not None:
+            usage.add_chunk(run_id, estimate_tokens(token) if self.estimate_chunks else 1)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = current_usage.get()
+        info = _last_generation_info(response)
+        if info.get("done_reason") == "length":
+            node = current_node.get()
+            LLM_TRUNCATIONS.inc(backend=self.backend, node=node)
+            if usage is not None and node not in usage.truncated:
+                usage.truncated.append(node)
+        if usage is None:
+            return
+        usage.finish(
+            run_id,
+            info.get("prompt_eval_count", info.get("prompt_token_count")) or 0,
+            info.get("eval_count", info.get("candidates_token_count")) or 0
+        )
+
+token_usage_handler = TokenUsageHandler()
+llm_trace_handler = LLMTraceHandler()
+ollama_usage_handler = GenerationUsageHandler("ollama")
+google_usage_handler = GenerationUsageHandler("google", estimate_chunks=True)
@@ -0,0 +1,91 @@
+"""
+클라이언트 연결이 끊긴 요청의 생성 중단(취소) 모듈
+
+app.py는 클라이언트 연결이 끊기면 요청의 CancelToken을 취소하고 실행 중인 태스크를 cancel하여
+진행 중인 Ollama/Google HTTP 요청을 바로 중단합니다. 그래프 노드는 시작하기 전에 토큰을 확인하므로
+(raise_if_cancelled) 취소된 요청은 다음 노드를 실행하지 않습니다.
+같은 요청을 합친(single-flight) 실행은 기다리는 요청이 모두 취소되었을 때만 중단합니다.
+취소 전까지 생성한 토큰 수는 track_generation()으로 모아 wasted_tokens_total 지표에 기록합니다.
+"""
+
+import asyncio
+import contextvars
+from contextlib import contextmanager
+from agent.metrics import CANCELLED_GENERATIONS, WASTED_TOKENS
+
+class CancelToken:
+    """요청 하나의 취소 상태"""
+
+    def __init__(self):
+        self.cancelled = False
+        self.reason = None
+
+    def cancel(self, reason="client_disconnected"):
+        self.cancelled = True
+        self.reason = reason
+
+current_cancel_token = contextvars.ContextVar("cancel_token", default=None)
+
+def raise_if_cancelled():
+    """현재 요청이 취소되었으면 asyncio.CancelledError 발생 (노드 사이에서 호출)"""
+    token = current_cancel_token.get()
+    if token is not None and token.cancelled:
+        raise asyncio.CancelledError(token.reason)
+
+def detach_cancel_token():
+    """
+    현재 컨텍스트를 요청의 CancelToken에서 분리
+
+    여러 요청이 함께 기다리는 실행(single-flight 태스크)에서 호출하여, 먼저 온 요청이 취소되어도
+    실행이 멈추지 않도록 함 (모든 요청이 취소되면 태스크 자체를 cancel)
+    """
+    current_cancel_token.set(None)
+
+class GenerationUsage:
+    """실행 하나에서 생성한 토큰 수 (끝난 LLM 호출의 토큰 수 + 진행 중인 스트림의 청크 수)"""
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.truncated = []  # 생성 최대 토큰에 걸려 응답이 잘린 노드
+        self._streaming = {}  # LLM 호출(run_id)별 받은 청크 수
+
+    def add_chunk(self, run_id, tokens=1):
+        self._streaming[run_id] = self._streaming.get(run_id, 0) + tokens
+
+    def finish(self, run_id, prompt_tokens, completion_tokens):
+        streamed = self._streaming.pop(run_id, 0)
+        self.prompt_tokens += prompt_tokens
+        # 토큰 수가 없는 응답은 받은 청크 수로 대신함
+        self.completion_tokens += completion_tokens or streamed
+
+    @property
+    def generated_tokens(self):
+        return self.completion_tokens + sum(self._streaming.values())
+
+current_usage = contextvars.ContextVar("generation_usage", default=None)
+
+@contextmanager
+def track_generation(backend):
+    """
+    블록 안에서 생성한 토큰 수를 모으고, 블록이 취소되면 버려진 토큰 수를 지표에 기록
+
+    Args:
+        backend (str): 지표에 사용할 백엔드 이름 (ollama, google)
+    """
+    usage = GenerationUsage()
+    token = current_usage.set(usage)
+    try:
+        yield usage
+    except (asyncio.CancelledError, GeneratorExit):
+        CANCELLED_GENERATIONS.inc(backend=backend)
+        WASTED_TOKENS.inc(usage.prompt_tokens, backend=backend, kind="prompt")
+        WASTED_TOKENS.inc(usage.generated_tokens, backend=backend, kind="completion")
+        print(f"생성 취소 ({backend}): 버려진 토큰 {usage.generated_tokens}개")
+        raise
+    finally:
+        try:
+            current_usage.reset(token)
+        except ValueError:
+            # 스트림이 다른 컨텍스트에서 닫힌 경우
+            pass
@@ -1,58 +1,108 @@
 import json
-import re
+from typing import Dict, Literal
+from pydantic import BaseModel, Field
+from langchain_core.runnables import RunnableConfig
 from agent.state import AgentState
-from agent.llm import create_ollama_llm
-from langchain_core.prompts import PromptTemplate
+from agent.runtime import node_runtime
+from agent.classifier import classify, extract_details, record_llm_classification
+from agent.tracing import span
+from agent.metrics import CLASSIFICATION_PARSES
+from agent.node_cache import memoize_node, skip_store
+from agent.budget import build_prompt
+from agent.conf.config import CLASSIFICATION_STRUCTURED_OUTPUT, CLASSIFICATION_REPAIR_ATTEMPTS
 
-def check_game_resource_request(state: AgentState) -> AgentState:
+class ResourceClassification(BaseModel):
+    """LLM 분류 응답 형식 (Ollama에는 JSON 스키마로 전달하여 생성 단계에서 형식을 강제)"""
+    is_game_resource_request: bool
+    resource_type: Literal["3d_model", "animation", "other"]
+    details: Dict[str, str] = Field(default_factory=dict)
+
+CLASSIFICATION_SCHEMA = ResourceClassification.model_json_schema()
+
+_decoder = json.JSONDecoder()
+
+def parse_classification(text: str) -> ResourceClassification:
+    """응답의 첫 JSON 객체를 ResourceClassification으로 검증 (실패하면 ValueError)"""
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("응답에 JSON 객체가 없습니다.")
+    data, _ = _decoder.raw_decode(text, start)
+    return ResourceClassification.model_validate(data)
+
+async def check_game_resource_request(state: AgentState, config: RunnableConfig) -> AgentState:
     """게임 리소스 제작 요청인지 확인"""
-    llm = create_ollama_llm()
-    prompt = PromptTemplate.from_template(
-        """사용자의 질문이 게임 리소스(3D 모델 또는 애니메이션) 제작 요청인지 분석하세요.
-        
-        질문: {question}
-        
-        다음 정보를 JSON 형식으로 응답하세요:
-        1. is_game_resource_request: 게임 리소스 제작 요청인지 여부 (true/false)
-        2. resource_type: 요청된 리소스 유형 ("3d_model", "animation", "other" 중 하나)
-        3. 요청된 리소스의 세부 정보 (캐릭터 이름, 스타일, 포즈 등)
-        
-        JSON 형식 응답:"""
+    # 로컬 분류기가 확신하는 경우 LLM 호출 없이 결정
+    with span("classify_local") as classify_span:
+        prediction = classify(state["question"])
+        if classify_span is not None:
+            classify_span.attrs["confident"] = prediction is not None
+    if prediction is not None:
+        return {
+            "is_game_resource_request": prediction.is_game_resource_request,
+            "resource_type": prediction.resource_type,
+            # LLM 분류의 details와 같은 키로 세부 정보 추출
+            "resource_details": extract_details(state["question"], prediction.resource_type) if prediction.is_game_resource_request else {},
+            "next": "think" if prediction.is_game_resource_request else "reject_request"
+        }
+    
+    return await classify_with_llm(state, config)
+
+# LLM 분류 결과는 질문에만 의존 (로컬 분류기가 확신하지 못한 질문만 캐시 조회)
+@memoize_node(inputs=("question",), prompts=("check_game_resource", "repair_classification"))
+async def classify_with_llm(state: AgentState, config: RunnableConfig) -> AgentState:
+    """LLM으로 게임 리소스 요청 여부와 리소스 정보 분석 (파싱에 실패하면 CLASSIFICATION_REPAIR_ATTEMPTS번까지 수정 요청)"""
+    runtime = node_runtime(config)
+    if CLASSIFICATION_STRUCTURED_OUTPUT:
+        llm = runtime.structured_llm("check_game_resource", CLASSIFICATION_SCHEMA)
+    else:
+        llm = runtime.node_llm("check_game_resource")
+    
+    analysis = await llm.ainvoke(
+        build_prompt("check_game_resource", runtime.prompts["check_game_resource"], {"question": state["question"]})
     )
     
-    analysis = llm.invoke(prompt.format(question=state["question"]))
+    classification = None
+    for attempt in range(CLASSIFICATION_REPAIR_ATTEMPTS + 1):
+        with span("parse_classification", chars=len(analysis), attempt=attempt) as parse_span:
+            try:
+                classification = parse_classification(analysis)
+                break
+            except ValueError as e:
+                error = str(e)
+                if parse_span is not None:
+                    parse_span.attrs["failed"] = True
+        if attempt == CLASSIFICATION_REPAIR_ATTEMPTS:
+            break
+        print(f"분류 응답 파싱 실패, 수정 요청 ({attempt + 1}/{CLASSIFICATION_REPAIR_ATTEMPTS}): {error[:200]}")
+        analysis = await llm.ainvoke(build_prompt(
+            "check_game_resource", runtime.prompts["repair_classification"],
+            {"error": error[:300]}, {"output": analysis}
+        ))
     
-    try:
-        json_match = re.search(r'(\{.*\})', analysis, re.DOTALL)
-        if json_match:
-            json_str = json_match.group(1)
-            analysis_dict = json.loads(json_str)
-        else:
-            analysis_dict = json.loads(analysis)
-    except:
-        analysis_dict = {
-            "is_game_resource_request": False,
-            "resource_type": "other",
-            "details": {}
-        }
+    if classification is not None:
+        CLASSIFICATION_PARSES.inc(backend=runtime.key.provider, result="ok" if attempt == 0 else "repaired")
+        # 파싱에 성공한 LLM 분류 결과만 로컬 분류기 학습 데이터로 기록
+        await record_llm_classification(state["question"], classification.resource_type)
+    else:
+        CLASSIFICATION_PARSES.inc(backend=runtime.key.provider, result="failed")
+        # 다시 실행하면 파싱될 수 있으므로 실패 결과는 캐시하지 않음
+        skip_store()
+        classification = ResourceClassification(is_game_resource_request=False, resource_type="other")
     
-    is_valid_request = (analysis_dict.get("is_game_resource_request", False) and 
-                        analysis_dict.get("resource_type") in ["3d_model", "animation"])
+    is_valid_request = classification.is_game_resource_request and classification.resource_type in ["3d_model", "animation"]
     
     next_step = "think" if is_valid_request else "reject_request"
     
     return {
-        **state,
-        "is_game_resource_request": analysis_dict.get("is_game_resource_request", False),
-        "resource_type": analysis_dict.get("resource_type", "other"),
-        "resource_details": analysis_dict.get("details", {}),
+        "is_game_resource_request": classification.is_game_resource_request,
+        "resource_type": classification.resource_type,
+        "resource_details": classification.details,
         "next": next_step
     }
 
-def reject_request(state: AgentState) -> AgentState:
+async def reject_request(state: AgentState) -> AgentState:
     """게임 리소스 요청이 아닌 경우 거부 메시지 생성"""
     return {
-        **state,
         "answer": "지금은 3D 모델과 애니메이션 제작 요청만 가능합니다.",
         "next": "END"
-    }
\ No newline at end of file
+    }
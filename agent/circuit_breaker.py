@@ -0,0 +1,85 @@
+"""
+외부 의존성(Redis, LLM 백엔드 등)의 장애를 감지하는 circuit breaker 모듈
+
+연속 실패가 failure_threshold에 도달하면 open 상태가 되어 cooldown 동안 호출을 건너뛰고,
+cooldown이 지나면 호출 하나만 통과시켜(half_open) 성공하면 다시 closed로 돌아갑니다.
+"""
+
+import time
+import threading
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """연속 실패 횟수 기반 circuit breaker"""
+
+    def __init__(self, name, failure_threshold=3, cooldown=5.0, initial_state=CLOSED):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = initial_state
+        self.failures = 0
+        self.last_error = None
+        self._opened_at = 0.0
+        self._probe_started = None
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "rejected": 0, "successes": 0, "failures": 0}
+
+    def allow(self) -> bool:
+        """
+        호출해도 되는지 여부
+
+        open 상태에서 cooldown이 지났거나 half_open 상태이면 한 호출만 확인용으로 통과시킵니다.
+        확인 호출이 cooldown 안에 끝나지 않으면 다음 호출에 다시 기회를 줍니다.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_at < self.cooldown:
+                self.stats["rejected"] += 1
+                return False
+            if self._probe_started is not None and now - self._probe_started < self.cooldown:
+                self.stats["rejected"] += 1
+                return False
+
+            self.state = HALF_OPEN
+            self._probe_started = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.stats["successes"] += 1
+            if self.state != CLOSED:
+                print(f"{self.name} 연결 복구")
+            self.state = CLOSED
+            self.failures = 0
+            self._probe_started = None
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.stats["failures"] += 1
+            self.failures += 1
+            self.last_error = str(error) if error is not None else None
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    print(f"{self.name} 연결 차단 ({self.cooldown}초 후 재확인): {self.last_error}")
+                    self.stats["opened"] += 1
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_started = None
+
+    @property
+    def healthy(self):
+        return self.state == CLOSED
+
+    def snapshot(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "last_error": self.last_error,
+            **self.stats,
+        }
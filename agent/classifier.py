@@ -0,0 +1,296 @@
+"""
+게임 리소스 요청 여부를 LLM 호출 없이 판단하는 로컬 분류기 모듈
+
+1. 키워드/정규식 규칙
+2. 문자 n-gram 해시 특징을 사용하는 NumPy 소프트맥스 선형 모델 (기록된 LLM 분류 결과로 학습)
+
+두 단계 중 하나라도 설정된 임계값 이상으로 확신하면 그 결과를 사용하고,
+그렇지 않으면 None을 반환하여 LLM 분류로 넘깁니다.
+
+학습/평가는 scripts/classifier.py를 사용합니다.
+"""
+
+import os
+import re
+import json
+import zlib
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from agent.conf.config import (
+    CLASSIFIER_ENABLED, CLASSIFIER_MODEL_PATH,
+    CLASSIFIER_ACCEPT_THRESHOLD, CLASSIFIER_REJECT_THRESHOLD,
+    get_async_redis_client
+)
+
+LABELS = ("other", "3d_model", "animation")
+SAMPLES_KEY = "classifier:samples"
+MAX_SAMPLES = 50000
+NUM_FEATURES = 2 ** 14
+NGRAM_RANGE = (1, 3)
+
+def _keywords(*words):
+    """
+    토큰 시작에서만 일치하는 키워드 패턴 (부분 문자열 일치로 "언어 모델"의 "모델" 같은 단어에 걸리지 않도록)
+
+    한국어 키워드는 조사가 붙을 수 있으므로 앞쪽 경계만, 영문/숫자 키워드는 앞뒤 경계를 모두 확인합니다.
+    """
+    patterns = []
+    for word in words:
+        if re.match(r"[0-9a-z]", word):
+            patterns.append(rf"(?<![0-9a-z]){word}(?![0-9a-z])")
+        else:
+            patterns.append(rf"(?<![가-힣]){word}")
+    return re.compile("|".join(patterns))
+
+# 리소스 유형이 분명한 키워드 (제작 동사와 함께 있으면 바로 결정)
+ANIMATION_PATTERN = _keywords(
+    "애니메이션", "모션", "리깅", "키프레임", "animations?", "motions?", "rig(?:ging)?", "keyframes?", "walk cycle"
+)
+MODEL_PATTERN = _keywords(
+    "3d", "3차원", "메시", "폴리곤", "로우 ?폴리", "low-?poly", "meshe?s?", "polygons?", "fbx", "gltf", "glb"
+)
+# 게임 맥락이 있어야 리소스로 보는 모호한 키워드 ("소설 캐릭터", "자동차 모델" 등)
+ACTION_PATTERN = _keywords("걷는", "걷기", "달리는", "달리기", "점프", "공격", "춤", "idle", "walk(?:ing)?", "run(?:ning)?", "jump(?:ing)?", "attack")
+OBJECT_PATTERN = _keywords(
+    "모델", "캐릭터", "오브젝트", "소품", "무기", "건물", "에셋", "models?", "characters?", "props?", "weapons?", "assets?"
+)
+GAME_PATTERN = _keywords("게임", "유니티", "언리얼", "games?", "unity", "unreal", "에셋", "assets?")
+# 리소스 키워드와 겹치지만 게임 리소스가 아닌 요청 (언어 모델, 데이터 모델, 코드 등)
+OFF_TOPIC_PATTERN = _keywords(
+    "언어 ?모델", "llm", "gpt", "머신 ?러닝", "딥 ?러닝", "기계 ?학습", "신경망", "인공지능", "데이터 ?모델", "예측 ?모델",
+    "분류 ?모델", "모델 ?학습", "모델을 학습", "코드", "코딩", "프로그램", "파이썬", "자바스크립트", "sql", "엑셀",
+    "번역", "요약", "이메일", "language models?", "machine learning", "deep learning", "neural", "data models?",
+    "code", "python", "javascript", "excel", "translate", "summar(?:y|ize)", "email"
+)
+# 제작 요청 동사
+CREATE_PATTERN = _keywords("만들", "생성", "제작", "그려", "뽑아", "create", "make", "generate", "build", "design")
+# 세부 정보로 뽑는 스타일 키워드
+STYLE_PATTERN = _keywords(
+    "로우 ?폴리", "카툰", "실사", "리얼", "픽셀", "판타지", "중세", "sf", "사이버펑크", "귀여운",
+    "low-?poly", "cartoon", "realistic", "pixel", "fantasy", "medieval", "sci-fi", "cyberpunk", "cute"
+)
+
+@dataclass
+class Prediction:
+    """분류 결과"""
+    resource_type: str
+    confidence: float
+    source: str
+
+    @property
+    def is_game_resource_request(self) -> bool:
+        return self.resource_type in ("3d_model", "animation")
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).lower()
+    return re.sub(r"\s+", " ", text).strip()
+
+def rule_predict(question: str) -> Optional[Prediction]:
+    """
+    키워드 규칙으로 분류
+
+    제작 동사와 함께 리소스 유형이 분명한 키워드(또는 게임 맥락의 모호한 키워드)가 있으면 요청으로,
+    리소스 키워드 없이 다른 분야의 요청(언어 모델, 코드 등)이면 거부로 판단합니다.
+    아무 규칙에도 걸리지 않거나 신호가 엇갈리면 None을 반환해 모델/LLM 분류로 넘깁니다.
+    """
+    text = normalize_text(question)
+    is_create = bool(CREATE_PATTERN.search(text))
+    is_off_topic = bool(OFF_TOPIC_PATTERN.search(text))
+    in_game = bool(GAME_PATTERN.search(text))
+    is_animation = bool(ANIMATION_PATTERN.search(text))
+    is_action = bool(ACTION_PATTERN.search(text))
+    is_model = bool(MODEL_PATTERN.search(text)) or (in_game and bool(OBJECT_PATTERN.search(text)))
+
+    if is_off_topic:
+        if is_animation or is_model:
+            return None
+        return Prediction("other", 0.95, "rule")
+
+    if not is_create:
+        return None
+    if is_animation or (is_action and is_model):
+        # "달리는 캐릭터 모델"처럼 동작만 있고 애니메이션 키워드가 없으면 낮은 확신도로 반환
+        return Prediction("animation", 0.95 if is_animation else 0.8, "rule")
+    if is_model:
+        return Prediction("3d_model", 0.95, "rule")
+    return None
+
+def extract_details(question: str, resource_type: str) -> Dict[str, str]:
+    """
+    LLM 없이 분류한 요청의 세부 정보 (LLM 분류 프롬프트와 같은 "대상", "스타일", "동작" 키, 찾은 것만)
+
+    대상은 제작 동사 앞(없으면 뒤)의 문장입니다.
+    """
+    text = normalize_text(question)
+    details = {}
+    verb = CREATE_PATTERN.search(text)
+    target = text[:verb.start()] if verb else text
+    if verb and not target.strip(" .,!?"):
+        target = text[verb.end():]
+    # 끝의 목적격 조사와 문장 부호 제거
+    target = re.sub(r"(을|를)?[\s.,!?]*$", "", target.strip()).strip(" .,!?")
+    if target:
+        details["대상"] = target
+    styles = list(dict.fromkeys(match.group() for match in STYLE_PATTERN.finditer(text)))
+    if styles:
+        details["스타일"] = ", ".join(styles)
+    if resource_type == "animation":
+        motions = list(dict.fromkeys(match.group() for match in ACTION_PATTERN.finditer(text)))
+        if motions:
+            details["동작"] = ", ".join(motions)
+    return details
+
+def featurize(question: str) -> np.ndarray:
+    """문자 n-gram을 crc32로 해시하여 L2 정규화된 특징 벡터 생성"""
+    text = f" {normalize_text(question)} "
+    vector = np.zeros(NUM_FEATURES, dtype=np.float32)
+    for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+        for i in range(len(text) - n + 1):
+            vector[zlib.crc32(text[i:i + n].encode("utf-8")) % NUM_FEATURES] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class LinearClassifier:
+    """해시 특징 기반 소프트맥스 선형 분류기"""
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray):
+        self.weights = weights
+        self.bias = bias
+
+    @classmethod
+    def train(cls, questions: List[str], labels: List[str], epochs=300, learning_rate=1.0, l2=1e-4):
+        features = np.stack([featurize(q) for q in questions])
+        targets = np.zeros((len(labels), len(LABELS)), dtype=np.float32)
+        targets[np.arange(len(labels)), [LABELS.index(label) for label in labels]] = 1.0
+
+        weights = np.zeros((NUM_FEATURES, len(LABELS)), dtype=np.float32)
+        bias = np.zeros(len(LABELS), dtype=np.float32)
+        for _ in range(epochs):
+            probs = _softmax(features @ weights + bias)
+            grad = (probs - targets) / len(features)
+            weights -= learning_rate * (features.T @ grad + l2 * weights)
+            bias -= learning_rate * grad.sum(axis=0)
+        return cls(weights, bias)
+
+    @classmethod
+    def load(cls, path: str) -> "LinearClassifier":
+        data = np.load(path)
+        return cls(data["weights"], data["bias"])
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(path, weights=self.weights, bias=self.bias)
+
+    def predict(self, question: str) -> Prediction:
+        probs = _softmax(featurize(question) @ self.weights + self.bias)
+        index = int(np.argmax(probs))
+        return Prediction(LABELS[index], float(probs[index]), "model")
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
+
+# 학습된 모델 (파일이 없으면 규칙만 사용)
+_model = None
+_model_loaded = False
+
+def get_model() -> Optional[LinearClassifier]:
+    global _model, _model_loaded
+    if not _model_loaded:
+        _model_loaded = True
+        if os.path.exists(CLASSIFIER_MODEL_PATH):
+            _model = LinearClassifier.load(CLASSIFIER_MODEL_PATH)
+            print(f"로컬 분류기 모델 로드: {CLASSIFIER_MODEL_PATH}")
+    return _model
+
+def is_confident(prediction: Optional[Prediction]) -> bool:
+    if prediction is None:
+        return False
+    threshold = CLASSIFIER_ACCEPT_THRESHOLD if prediction.is_game_resource_request else CLASSIFIER_REJECT_THRESHOLD
+    return prediction.confidence >= threshold
+
+def classify(question: str, model: Optional[LinearClassifier] = None) -> Optional[Prediction]:
+    """
+    확신할 수 있는 경우에만 분류 결과 반환
+
+    Returns:
+        Prediction 또는 None (LLM 분류가 필요한 경우)
+    """
+    if not CLASSIFIER_ENABLED:
+        return None
+
+    prediction = rule_predict(question)
+    if is_confident(prediction):
+        return prediction
+
+    model = model or get_model()
+    if model is not None:
+        prediction = model.predict(question)
+        if is_confident(prediction):
+            return prediction
+    return None
+
+async def record_llm_classification(question: str, resource_type: str):
+    """LLM 분류 결과를 학습 데이터로 Redis에 기록"""
+    redis_client = await get_async_redis_client()
+    if redis_client is None:
+        return
+
+    label = resource_type if resource_type in LABELS else "other"
+    try:
+        sample = json.dumps({"question": question, "label": label}, ensure_ascii=False)
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.lpush(SAMPLES_KEY, sample)
+            pipe.ltrim(SAMPLES_KEY, 0, MAX_SAMPLES - 1)
+            await pipe.execute()
+    except Exception as e:
+        print(f"분류 샘플 기록 실패: {str(e)}")
+
+def load_samples(path: str) -> Tuple[List[str], List[str]]:
+    questions, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                sample = json.loads(line)
+                questions.append(sample["question"])
+                labels.append(sample["label"] if sample["label"] in LABELS else "other")
+    return questions, labels
+
+def evaluate(questions: List[str], labels: List[str], model: Optional[LinearClassifier] = None):
+    """
+    규칙, 모델, 결합 분류기의 커버리지(LLM 없이 처리한 비율)와 정확도 평가
+
+    Returns:
+        dict: 단계별 coverage, accuracy 및 결합 분류기의 평균 지연 시간(마이크로초)
+    """
+    def confident_only(prediction):
+        return prediction if is_confident(prediction) else None
+
+    stages = {
+        "rule": lambda q: confident_only(rule_predict(q)),
+        "combined": lambda q: classify(q, model),
+    }
+    if model is not None:
+        stages["model"] = lambda q: confident_only(model.predict(q))
+
+    report = {"samples": len(questions)}
+    for name, predict in stages.items():
+        decided = correct = 0
+        started = time.perf_counter()
+        for question, label in zip(questions, labels):
+            prediction = predict(question)
+            if prediction is not None:
+                decided += 1
+                correct += prediction.resource_type == label
+        elapsed = time.perf_counter() - started
+        report[name] = {
+            "coverage": decided / len(questions) if questions else 0.0,
+            "accuracy": correct / decided if decided else None,
+            "avg_latency_us": elapsed / len(questions) * 1e6 if questions else 0.0,
+        }
+    return report
@@ -3,8 +3,11 @@
 """
 
 import os
+import asyncio
 import redis
+import redis.asyncio as aioredis
 from dotenv import load_dotenv
+from agent.circuit_breaker import CircuitBreaker, HALF_OPEN
 
 # .env 파일 로드
 load_dotenv()
@@ -12,6 +15,17 @@ load_dotenv()
 # LLM 관련 설정
 DEFAULT_MODEL = os.getenv("MODEL", "gemma3:4b")  # 기본 Ollama 모델
 OLLAMA_PORT = int(os.getenv("OLLAMA_PORT", 11434))
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", f"http://localhost:{OLLAMA_PORT}")
+
+# Ollama 모델 상주(keep-alive)와 예열(warm-up) 설정
+_keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # 마지막 요청 후 모델을 메모리에 유지할 시간 (예: 30m, 1h, -1이면 계속 유지)
+OLLAMA_KEEP_ALIVE = int(_keep_alive) if _keep_alive.lstrip("-").isdigit() else _keep_alive
+OLLAMA_PRELOAD_MODELS = [model.strip() for model in os.getenv("OLLAMA_PRELOAD_MODELS", "").split(",") if model.strip()]  # MODEL 외에 미리 올릴 모델
+OLLAMA_WARMUP_ENABLED = os.getenv("OLLAMA_WARMUP_ENABLED", "true").lower() == "true"
+OLLAMA_WARMUP_REQUIRED = os.getenv("OLLAMA_WARMUP_REQUIRED", "true").lower() == "true"  # 모델을 올리기 전에는 /api/ready가 503
+OLLAMA_WARMUP_TIMEOUT = float(os.getenv("OLLAMA_WARMUP_TIMEOUT", 300))  # 초 단위, 시작 시 모델 로드를 재시도하는 최대 시간
+OLLAMA_WARMUP_INTERVAL = float(os.getenv("OLLAMA_WARMUP_INTERVAL", 30))  # 초 단위, 상주 여부(/api/ps) 확인 주기
+OLLAMA_WARMUP_IDLE = float(os.getenv("OLLAMA_WARMUP_IDLE", 600))  # 초 단위, 이 시간 동안 요청이 없으면 짧은 예열 생성 실행
 
 # Google AI 관련 설정
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
@@ -26,38 +40,255 @@ REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_DB = int(os.getenv("REDIS_DB", 0))
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
 
+# 응답 캐시 설정
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 3600))  # 초 단위
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 10000))
+
+# 노드 결과 캐시 설정 (think, research, check_game_resource 등 중간 단계)
+NODE_CACHE_ENABLED = os.getenv("NODE_CACHE_ENABLED", "true").lower() == "true"
+NODE_CACHE_TTL = int(os.getenv("NODE_CACHE_TTL", 86400))  # 초 단위
+NODE_CACHE_LOCAL_SIZE = int(os.getenv("NODE_CACHE_LOCAL_SIZE", 1024))  # 프로세스 내 LRU 항목 수
+NODE_CACHE_VERSION = os.getenv("NODE_CACHE_VERSION", "1")  # 올리면 기존 캐시 항목을 모두 무시
+
+# 노드별 토큰 예산 설정 ("노드=토큰 수" 목록, 토큰 수는 문자 수 기반 추정치)
+TOKEN_BUDGETS_ENABLED = os.getenv("TOKEN_BUDGETS_ENABLED", "true").lower() == "true"
+NODE_INPUT_BUDGETS = os.getenv("NODE_INPUT_BUDGETS", "check_game_resource=512,think=512,research_step=1024,answer_step=2048")  # 프롬프트 최대 크기
+NODE_OUTPUT_BUDGETS = os.getenv("NODE_OUTPUT_BUDGETS", "check_game_resource=128")  # 생성 최대 토큰 (num_predict). 기본은 분류(스키마로 제한한 짧은 JSON)만 제한, 잘리면 응답의 truncated에 노드 표시
+CONTEXT_COMPACTION = os.getenv("CONTEXT_COMPACTION", "extractive")  # 예산을 넘는 앞 단계 결과 처리 - 'extractive'(중요 문장 추출) 또는 'truncate'(뒷부분 자르기)
+
+# 로컬 분류기 설정 (check_game_resource 앞단)
+CLASSIFIER_ENABLED = os.getenv("CLASSIFIER_ENABLED", "true").lower() == "true"
+CLASSIFIER_MODEL_PATH = os.getenv("CLASSIFIER_MODEL_PATH", "data/classifier.npz")
+CLASSIFIER_ACCEPT_THRESHOLD = float(os.getenv("CLASSIFIER_ACCEPT_THRESHOLD", 0.9))
+CLASSIFIER_REJECT_THRESHOLD = float(os.getenv("CLASSIFIER_REJECT_THRESHOLD", 0.9))
+
+# LLM 분류 출력 설정 (JSON 스키마로 응답 형식 제한)
+CLASSIFICATION_STRUCTURED_OUTPUT = os.getenv("CLASSIFICATION_STRUCTURED_OUTPUT", "true").lower() == "true"
+CLASSIFICATION_REPAIR_ATTEMPTS = int(os.getenv("CLASSIFICATION_REPAIR_ATTEMPTS", 1))  # 파싱 실패 시 수정 요청 횟수
+
+# 작업 기록 write-behind 설정
+TASK_LOG_QUEUE_SIZE = int(os.getenv("TASK_LOG_QUEUE_SIZE", 10000))
+TASK_LOG_BATCH_SIZE = int(os.getenv("TASK_LOG_BATCH_SIZE", 200))
+TASK_LOG_FLUSH_INTERVAL = float(os.getenv("TASK_LOG_FLUSH_INTERVAL", 0.05))  # 초 단위
+TASK_LOG_WRITE_TIMEOUT = float(os.getenv("TASK_LOG_WRITE_TIMEOUT", 1.0))  # 초 단위
+TASK_LOG_SPILL_PATH = os.getenv("TASK_LOG_SPILL_PATH", "data/task_log_spill.jsonl")  # 비우면 버림
+TASK_LOG_MAX_ATTEMPTS = int(os.getenv("TASK_LOG_MAX_ATTEMPTS", 3))  # 작업 자체가 잘못돼 이만큼 실패하면 {SPILL_PATH}.bad로 옮김
+
+# 작업 기록 보존 설정 (task:{task_id} 해시와 tasks:index* 색인)
+TASK_HISTORY_TTL = int(os.getenv("TASK_HISTORY_TTL", 7 * 24 * 3600))  # 초 단위, 마지막 기록 후 보존 기간 (0이면 만료 없음)
+TASK_HISTORY_MAX_ENTRIES = int(os.getenv("TASK_HISTORY_MAX_ENTRIES", 100000))  # 넘으면 오래된 작업부터 삭제 (0이면 제한 없음)
+TASK_HISTORY_PRUNE_INTERVAL = float(os.getenv("TASK_HISTORY_PRUNE_INTERVAL", 60.0))  # 초 단위, 색인 정리 주기
+
+# 작업 출력 압축 저장 설정 (전체 답변과 단계별 중간 결과, task:{task_id}:blobs)
+TASK_BLOB_ENABLED = os.getenv("TASK_BLOB_ENABLED", "true").lower() == "true"
+TASK_BLOB_LEVEL = int(os.getenv("TASK_BLOB_LEVEL", 3))  # zstd 압축 수준
+TASK_BLOB_DICT_DIR = os.getenv("TASK_BLOB_DICT_DIR", "data/task_blob_dicts")  # 학습한 압축 사전 위치 (가장 최근 사전으로 압축)
+
+# 비동기 작업 큐 설정
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))  # 워커 프로세스 수
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", 4))  # 프로세스당 동시 작업 수
+JOB_QUEUE_MAX_DEPTH = int(os.getenv("JOB_QUEUE_MAX_DEPTH", 1000))
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", 10))  # 초 단위
+JOB_STUCK_TIMEOUT = float(os.getenv("JOB_STUCK_TIMEOUT", 300))  # 초 단위, 하트비트가 끊긴 작업을 재등록
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+
+# 동일 요청 합치기(single-flight) 설정
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+SINGLE_FLIGHT_DISTRIBUTED = os.getenv("SINGLE_FLIGHT_DISTRIBUTED", "false").lower() == "true"  # 프로세스 간 합치기
+SINGLE_FLIGHT_LOCK_TTL = int(os.getenv("SINGLE_FLIGHT_LOCK_TTL", 300))  # 초 단위
+SINGLE_FLIGHT_WAIT_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_WAIT_TIMEOUT", 300))  # 초 단위
+
+# 백엔드별 admission control 설정 (동시 실행 수, 대기열 길이, 대기 시간 제한)
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", 4))
+OLLAMA_MAX_QUEUE = int(os.getenv("OLLAMA_MAX_QUEUE", 32))
+OLLAMA_QUEUE_TIMEOUT = float(os.getenv("OLLAMA_QUEUE_TIMEOUT", 30))  # 초 단위
+GOOGLE_MAX_CONCURRENCY = int(os.getenv("GOOGLE_MAX_CONCURRENCY", 16))
+GOOGLE_MAX_QUEUE = int(os.getenv("GOOGLE_MAX_QUEUE", 64))
+GOOGLE_QUEUE_TIMEOUT = float(os.getenv("GOOGLE_QUEUE_TIMEOUT", 30))  # 초 단위
+
+# 일괄 생성(/api/generate/batch) 설정
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 500))  # 요청 하나에 담을 수 있는 프롬프트 수
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))  # 일괄 요청 하나에서 동시에 실행하는 생성 수
+
+# 백엔드 자동 선택(라우팅) 설정 - 서비스를 지정하지 않은 요청에 적용
+ROUTING_ENABLED = os.getenv("ROUTING_ENABLED", "true").lower() == "true"
+ROUTING_WINDOW = int(os.getenv("ROUTING_WINDOW", 100))  # 백엔드별로 기록하는 최근 요청 수
+ROUTING_TIMEOUT = float(os.getenv("ROUTING_TIMEOUT", 120))  # 초 단위, 넘기면 다음 백엔드로 전환
+ROUTING_DEFAULT_LATENCY = float(os.getenv("ROUTING_DEFAULT_LATENCY", 5.0))  # 초 단위, 기록이 없을 때 예상 처리 시간
+ROUTING_FAILURE_THRESHOLD = int(os.getenv("ROUTING_FAILURE_THRESHOLD", 3))  # 연속 실패 시 백엔드 제외
+ROUTING_COOLDOWN = float(os.getenv("ROUTING_COOLDOWN", 30))  # 초 단위, 제외한 백엔드 재확인까지
+ROUTING_HEDGE = os.getenv("ROUTING_HEDGE", "false").lower() == "true"  # 느린 요청을 다른 백엔드에도 보냄
+ROUTING_HEDGE_MIN_DELAY = float(os.getenv("ROUTING_HEDGE_MIN_DELAY", 2.0))  # 초 단위, 중복 요청 전 최소 대기 (기본은 p95)
+
+# Google AI 호출 설정
+GOOGLE_AGENT_PIPELINE = os.getenv("GOOGLE_AGENT_PIPELINE", "true").lower() == "true"  # google 요청도 에이전트 그래프로 실행
+GOOGLE_CALL_CONCURRENCY = int(os.getenv("GOOGLE_CALL_CONCURRENCY", 8))  # 프로세스 전체에서 동시에 보내는 API 호출 수
+GOOGLE_RETRY_ATTEMPTS = int(os.getenv("GOOGLE_RETRY_ATTEMPTS", 3))  # 요청 한도 초과/일시 오류 시 재시도 횟수
+GOOGLE_RETRY_BACKOFF = float(os.getenv("GOOGLE_RETRY_BACKOFF", 1.0))  # 초 단위, 재시도마다 두 배
+
+# 클라이언트 연결 종료 시 생성 취소 설정
+CANCEL_ON_DISCONNECT = os.getenv("CANCEL_ON_DISCONNECT", "true").lower() == "true"
+DISCONNECT_POLL_INTERVAL = float(os.getenv("DISCONNECT_POLL_INTERVAL", 0.5))  # 초 단위, 스트리밍이 아닌 요청의 연결 확인 주기
+
+# 요청 추적(trace) 설정
+TRACE_PROFILE_DIR = os.getenv("TRACE_PROFILE_DIR", "data/profiles")
+TRACE_PROFILE_SAMPLE_RATE = float(os.getenv("TRACE_PROFILE_SAMPLE_RATE", 0.0))  # trace 요청 중 cProfile을 함께 저장할 비율
+TRACE_PROFILE_ALLOWED = os.getenv("TRACE_PROFILE_ALLOWED", "false").lower() == "true"  # 요청("profile": true, X-Profile: 1)으로 cProfile을 켤 수 있는지 여부 (프로세스 전체를 프로파일링하므로 기본 꺼짐)
+
+# 서버 시작 설정
+FAST_START = os.getenv("FAST_START", "true").lower() == "true"  # 준비 작업을 백그라운드에서 실행하고 바로 요청을 받음
+REDIS_CONNECT_RETRIES = int(os.getenv("REDIS_CONNECT_RETRIES", 5))
+REDIS_CONNECT_BACKOFF = float(os.getenv("REDIS_CONNECT_BACKOFF", 0.5))  # 초 단위, 재시도마다 두 배
+
+# Redis 연결 풀과 장애 감지 설정
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 2.0))  # 초 단위, 차단 명령(BLMOVE 1초)보다 길어야 함
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", 1.0))  # 초 단위
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 2.0))  # 초 단위, 풀에 남은 연결이 없을 때 기다리는 시간
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))  # 초 단위, 오래 쉰 연결은 사용 전에 확인
+REDIS_BREAKER_THRESHOLD = int(os.getenv("REDIS_BREAKER_THRESHOLD", 3))  # 연속 실패 횟수
+REDIS_BREAKER_COOLDOWN = float(os.getenv("REDIS_BREAKER_COOLDOWN", 5.0))  # 초 단위, 차단 후 재확인까지
+
+# Redis 클라이언트 (연결 풀 공유, 장애 시 circuit breaker로 호출 생략)
+REDIS_UNAVAILABLE_ERRORS = (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)
+
+# 처음에는 연결을 확인하지 않았으므로 half_open 상태로 시작하여 첫 호출 때 ping으로 확인
+redis_breaker = CircuitBreaker("Redis", REDIS_BREAKER_THRESHOLD, REDIS_BREAKER_COOLDOWN, initial_state=HALF_OPEN)
+
+def _redis_connection_kwargs():
+    return {
+        "host": REDIS_HOST,
+        "port": REDIS_PORT,
+        "db": REDIS_DB,
+        "password": REDIS_PASSWORD,
+        "decode_responses": True,
+        "socket_timeout": REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": REDIS_CONNECT_TIMEOUT,
+        "socket_keepalive": True,
+        "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+        "max_connections": REDIS_MAX_CONNECTIONS,
+    }
+
+class _BreakerPipeline(redis.client.Pipeline):
+    def execute(self, raise_on_error=True):
+        try:
+            result = super().execute(raise_on_error)
+        except REDIS_UNAVAILABLE_ERRORS as e:
+            redis_breaker.record_failure(e)
+            raise
+        redis_breaker.record_success()
+        return result
+
+class _BreakerRedis(redis.Redis):
+    """연결 오류/타임아웃을 circuit breaker에 기록하는 Redis 클라이언트"""
+
+    def execute_command(self, *args, **options):
+        try:
+            result = super().execute_command(*args, **options)
+        except REDIS_UNAVAILABLE_ERRORS as e:
+            redis_breaker.record_failure(e)
+            raise
+        redis_breaker.record_success()
+        return result
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return _BreakerPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+class _AsyncBreakerPipeline(aioredis.client.Pipeline):
+    async def execute(self, raise_on_error=True):
+        try:
+            result = await super().execute(raise_on_error)
+        except REDIS_UNAVAILABLE_ERRORS as e:
+            redis_breaker.record_failure(e)
+            raise
+        redis_breaker.record_success()
+        return result
+
+class _AsyncBreakerRedis(aioredis.Redis):
+    """연결 오류/타임아웃을 circuit breaker에 기록하는 비동기 Redis 클라이언트"""
+
+    async def execute_command(self, *args, **options):
+        try:
+            result = await super().execute_command(*args, **options)
+        except REDIS_UNAVAILABLE_ERRORS as e:
+            redis_breaker.record_failure(e)
+            raise
+        redis_breaker.record_success()
+        return result
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return _AsyncBreakerPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
 # 싱글톤 패턴으로 Redis 클라이언트 생성
 redis_client = None
 
 def get_redis_client():
-    """Redis 클라이언트 인스턴스를 반환합니다. 싱글톤 패턴 적용."""
+    """
+    Redis 클라이언트 인스턴스를 반환합니다. 싱글톤 패턴 적용.
+    
+    연결은 풀에서 필요할 때 다시 맺으므로 Redis가 재시작되어도 같은 클라이언트를 계속 사용합니다.
+    circuit breaker가 열려 있거나 확인용 ping이 실패하면 None을 반환합니다.
+    """
     global redis_client
     
-    if redis_client is not None:
-        return redis_client
+    if not redis_breaker.allow():
+        return None
+    
+    if redis_client is None:
+        pool = redis.BlockingConnectionPool(timeout=REDIS_POOL_TIMEOUT, **_redis_connection_kwargs())
+        redis_client = _BreakerRedis(connection_pool=pool)
+    
+    if not redis_breaker.healthy:
+        # 장애 후 확인 (성공/실패는 breaker에 기록됨)
+        try:
+            redis_client.ping()
+        except Exception as e:
+            print(f"Redis 연결 실패: {str(e)}")
+            return None
+    return redis_client
+
+# 비동기 Redis 클라이언트 (요청 처리 경로에서 사용)
+async_redis_client = None
+
+async def get_async_redis_client():
+    """
+    비동기 Redis 클라이언트 인스턴스를 반환합니다.
     
-    try:
-        # Redis 클라이언트 초기화
-        client = redis.Redis(
-            host=REDIS_HOST,
-            port=REDIS_PORT,
-            db=REDIS_DB,
-            password=REDIS_PASSWORD,
-            decode_responses=True
-        )
-        
-        # Redis 연결 테스트
-        client.ping()
-        print("Redis 연결 성공")
-        redis_client = client
-        return client
-    except Exception as e:
-        print(f"Redis 연결 실패: {str(e)}")
+    get_redis_client와 같은 circuit breaker를 사용하여, Redis 장애 중에는 타임아웃을 기다리지 않고 바로 None을 반환합니다.
+    """
+    global async_redis_client
+    
+    if not redis_breaker.allow():
         return None
+    
+    if async_redis_client is None:
+        pool = aioredis.BlockingConnectionPool(timeout=REDIS_POOL_TIMEOUT, **_redis_connection_kwargs())
+        async_redis_client = _AsyncBreakerRedis(connection_pool=pool)
+    
+    if not redis_breaker.healthy:
+        try:
+            await async_redis_client.ping()
+        except Exception as e:
+            print(f"비동기 Redis 연결 실패: {str(e)}")
+            return None
+    return async_redis_client
+
+def redis_health():
+    """Redis 연결 상태와 circuit breaker 통계"""
+    return {"host": f"{REDIS_HOST}:{REDIS_PORT}", **redis_breaker.snapshot()}
+
+async def connect_async_redis(retries=REDIS_CONNECT_RETRIES, backoff=REDIS_CONNECT_BACKOFF):
+    """비동기 Redis 연결을 재시도하며 시도. 모두 실패하면 None"""
+    for attempt in range(retries + 1):
+        client = await get_async_redis_client()
+        if client is not None or attempt == retries:
+            return client
+        await asyncio.sleep(backoff * 2 ** attempt)
 
 # 환경 정보 출력 함수
-def print_environment_info():
-    """현재 환경 설정 정보를 출력합니다."""
+def print_environment_info(check_redis=True):
+    """현재 환경 설정 정보를 출력합니다. (check_redis=False면 Redis 연결을 확인하지 않음)"""
     print("\n=== 환경 설정 정보 ===")
     print(f"기본 서비스: {DEFAULT_SERVICE}")
     print(f"Ollama 모델: {DEFAULT_MODEL}")
@@ -68,8 +299,9 @@ def print_environment_info():
     else:
         print("Google API 키: 설정되지 않음")
     
-    redis = get_redis_client()
-    if redis:
+    if not check_redis:
+        print(f"Redis: {REDIS_HOST}:{REDIS_PORT} (백그라운드에서 연결)")
+    elif get_redis_client():
         print(f"Redis 연결: {REDIS_HOST}:{REDIS_PORT}")
     else:
         print("Redis 연결: 사용 불가")
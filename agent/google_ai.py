@@ -0,0 +1,176 @@
+"""
+Google Generative AI 호출 모듈
+
+모델 객체는 모델 이름별로 한 번만 만들어 재사용하고, 호출은 모두 비동기 API로 보냅니다.
+프로세스 전체의 동시 호출 수는 GOOGLE_CALL_CONCURRENCY로 제한하고, 요청 한도 초과(429)나
+일시적인 서버 오류는 지수 백오프로 GOOGLE_RETRY_ATTEMPTS번까지 재시도합니다.
+스트리밍은 첫 청크를 받기 전에 난 오류만 재시도합니다. (이미 보낸 청크를 되돌릴 수 없음)
+"""
+
+import random
+import asyncio
+import threading
+from agent.conf.config import GOOGLE_API_KEY, GOOGLE_CALL_CONCURRENCY, GOOGLE_RETRY_ATTEMPTS, GOOGLE_RETRY_BACKOFF
+from agent.metrics import GOOGLE_RETRIES, LLM_ERRORS, LLM_TOKENS, current_node
+
+# Google AI SDK는 불러오는 데 오래 걸리므로 처음 사용할 때 초기화
+_genai = None
+_retryable = None
+
+# 모델 이름별로 재사용하는 GenerativeModel
+_models = {}
+_models_lock = threading.Lock()
+
+# 이벤트 루프별 동시 호출 제한 (asyncio.run으로 루프가 바뀌는 스크립트 실행도 지원)
+_call_limit = (None, None)
+
+def get_genai():
+    """google.generativeai 모듈을 불러와 API 키를 설정한 뒤 반환"""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        if GOOGLE_API_KEY:
+            genai.configure(api_key=GOOGLE_API_KEY)
+        _genai = genai
+    return _genai
+
+def get_model(model_name):
+    """모델 이름별로 캐시된 GenerativeModel 반환"""
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+
+    with _models_lock:
+        if model_name not in _models:
+            _models[model_name] = get_genai().GenerativeModel(model_name)
+        return _models[model_name]
+
+def clear_model_cache():
+    """캐시된 모델 객체 제거 (SDK 설정을 바꾼 뒤 사용)"""
+    with _models_lock:
+        _models.clear()
+
+def retryable_errors():
+    """재시도할 오류 종류 (요청 한도 초과, 일시적인 서버 오류, 시간 초과)"""
+    global _retryable
+    if _retryable is None:
+        from google.api_core import exceptions
+        _retryable = (
+            exceptions.TooManyRequests, exceptions.ResourceExhausted,
+            exceptions.ServiceUnavailable, exceptions.InternalServerError, exceptions.DeadlineExceeded
+        )
+    return _retryable
+
+def _semaphore():
+    global _call_limit
+    loop = asyncio.get_running_loop()
+    if _call_limit[0] is not loop:
+        _call_limit = (loop, asyncio.Semaphore(GOOGLE_CALL_CONCURRENCY))
+    return _call_limit[1]
+
+async def _backoff(attempt, error):
+    """attempt번째 실패 후 대기 (마지막 시도였으면 False)"""
+    if attempt >= GOOGLE_RETRY_ATTEMPTS:
+        return False
+    delay = GOOGLE_RETRY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.0)
+    GOOGLE_RETRIES.inc(reason=type(error).__name__)
+    print(f"Google AI 요청 재시도 ({attempt + 1}/{GOOGLE_RETRY_ATTEMPTS}, {delay:.1f}초 후): {str(error)}")
+    await asyncio.sleep(delay)
+    return True
+
+def chunk_text(chunk):
+    """응답/청크의 텍스트 (텍스트가 없는 청크는 빈 문자열)"""
+    try:
+        return chunk.text or ""
+    except (AttributeError, ValueError):
+        return ""
+
+def usage_counts(usage_metadata):
+    """usage_metadata를 토큰 수 dict로 변환 (없으면 빈 dict)"""
+    if usage_metadata is None:
+        return {}
+    return {
+        "prompt_token_count": getattr(usage_metadata, "prompt_token_count", 0) or 0,
+        "candidates_token_count": getattr(usage_metadata, "candidates_token_count", 0) or 0,
+    }
+
+def record_usage(usage_metadata):
+    """토큰 사용량을 현재 노드 기준으로 지표에 기록"""
+    counts = usage_counts(usage_metadata)
+    if not counts:
+        return
+    node = current_node.get()
+    LLM_TOKENS.inc(counts["prompt_token_count"], backend="google", node=node, kind="prompt")
+    LLM_TOKENS.inc(counts["candidates_token_count"], backend="google", node=node, kind="completion")
+
+async def generate(prompt, model_name, **kwargs):
+    """
+    전체 응답 생성
+
+    Args:
+        prompt (str): 프롬프트
+        model_name (str): Google AI 모델 이름
+        **kwargs: generate_content_async에 전달할 인자 (generation_config 등)
+
+    Returns:
+        tuple: (응답 텍스트, usage_metadata)
+    """
+    attempt = 0
+    while True:
+        try:
+            async with _semaphore():
+                response = await get_model(model_name).generate_content_async(prompt, **kwargs)
+            break
+        except retryable_errors() as e:
+            if not await _backoff(attempt, e):
+                LLM_ERRORS.inc(backend="google", node=current_node.get())
+                raise
+            attempt += 1
+        except Exception:
+            LLM_ERRORS.inc(backend="google", node=current_node.get())
+            raise
+
+    usage_metadata = getattr(response, "usage_metadata", None)
+    record_usage(usage_metadata)
+    return chunk_text(response), usage_metadata
+
+async def stream(prompt, model_name, **kwargs):
+    """
+    응답 청크를 받는 대로 전달 (스트림이 끝날 때까지 동시 호출 슬롯 하나를 사용)
+
+    Yields:
+        응답 청크 (텍스트는 chunk_text(), 토큰 사용량은 마지막 청크의 usage_metadata)
+    """
+    semaphore = _semaphore()
+    attempt = 0
+    while True:
+        await semaphore.acquire()
+        try:
+            response = await get_model(model_name).generate_content_async(prompt, stream=True, **kwargs)
+            break
+        except retryable_errors() as e:
+            semaphore.release()
+            if not await _backoff(attempt, e):
+                LLM_ERRORS.inc(backend="google", node=current_node.get())
+                raise
+            attempt += 1
+        except Exception:
+            semaphore.release()
+            LLM_ERRORS.inc(backend="google", node=current_node.get())
+            raise
+        except BaseException:
+            semaphore.release()
+            raise
+
+    usage_metadata = None
+    try:
+        async for chunk in response:
+            # 토큰 사용량은 마지막 청크에 누적되어 옴
+            usage_metadata = getattr(chunk, "usage_metadata", None) or usage_metadata
+            yield chunk
+    except Exception:
+        LLM_ERRORS.inc(backend="google", node=current_node.get())
+        raise
+    finally:
+        semaphore.release()
+    record_usage(usage_metadata)
@@ -0,0 +1,210 @@
+"""
+Redis 기반 비동기 작업 큐 모듈
+
+API 프로세스는 작업을 등록(enqueue)하고 상태를 조회하며, 워커 프로세스(worker.py)는
+jobs:pending 리스트에서 작업을 꺼내 jobs:processing으로 옮긴 뒤 실행합니다.
+실행 중인 작업은 jobs:heartbeats에 주기적으로 하트비트를 남기고,
+하트비트가 끊긴 작업은 다시 대기열로 돌려보냅니다.
+작업 기록의 상태 변경은 task_history.update_task로 써서 상태별 색인도 함께 갱신합니다.
+"""
+
+import time
+import uuid
+import datetime
+from agent.conf.config import (
+    JOB_QUEUE_MAX_DEPTH, JOB_STUCK_TIMEOUT, JOB_MAX_ATTEMPTS, TASK_BLOB_ENABLED,
+    get_async_redis_client
+)
+from agent.task_history import update_task, query_tasks
+from agent.task_blobs import BLOB_FIELDS, PREVIEW_CHARS, stored_sizes, read_blobs, write_blobs
+
+PENDING_KEY = "jobs:pending"
+PROCESSING_KEY = "jobs:processing"
+HEARTBEAT_KEY = "jobs:heartbeats"
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+class QueueFullError(Exception):
+    """대기열이 최대 길이에 도달한 경우"""
+
+class QueueUnavailableError(Exception):
+    """Redis에 연결할 수 없어 작업 큐를 사용할 수 없는 경우"""
+
+def done_channel(task_id: str) -> str:
+    return f"jobs:done:{task_id}"
+
+async def _require_redis():
+    redis_client = await get_async_redis_client()
+    if redis_client is None:
+        raise QueueUnavailableError("Redis에 연결할 수 없어 작업을 등록할 수 없습니다.")
+    return redis_client
+
+async def enqueue_job(prompt, model, service, use_cache=True, priority="normal") -> str:
+    """
+    작업을 대기열에 등록하고 task_id 반환
+
+    Raises:
+        QueueFullError: 대기열이 JOB_QUEUE_MAX_DEPTH 이상인 경우
+        QueueUnavailableError: Redis를 사용할 수 없는 경우
+    """
+    redis_client = await _require_redis()
+    if await redis_client.llen(PENDING_KEY) >= JOB_QUEUE_MAX_DEPTH:
+        raise QueueFullError(f"작업 대기열이 가득 찼습니다. (최대 {JOB_QUEUE_MAX_DEPTH}개)")
+
+    task_id = str(uuid.uuid4())
+    timestamp = datetime.datetime.now().isoformat()
+    # 작업 기록을 먼저 써서 워커가 꺼냈을 때 기록이 있도록 함
+    await update_task(redis_client, task_id, {
+        "task_id": task_id,
+        "timestamp": timestamp,
+        "service": service,
+        "model": model,
+        "prompt": prompt,
+        "use_cache": int(use_cache),
+        "priority": priority,
+        "attempts": 0,
+        "status": "queued"
+    })
+    await redis_client.lpush(PENDING_KEY, task_id)
+    return task_id
+
+async def get_job(task_id: str):
+    """작업 기록 조회. 없으면 None"""
+    redis_client = await _require_redis()
+    job = await redis_client.hgetall(f"task:{task_id}")
+    return job or None
+
+async def get_job_outputs(task_id: str, fields=BLOB_FIELDS):
+    """
+    압축 저장된 작업 출력 조회
+
+    Returns:
+        dict: {"stored_bytes": 필드별 저장 크기, "outputs": 요청한 필드의 압축 해제한 값}
+    """
+    redis_client = await _require_redis()
+    sizes = await stored_sizes(redis_client, task_id)
+    wanted = [name for name in fields if name in sizes]
+    outputs = await read_blobs(redis_client, task_id, wanted) if wanted else {}
+    return {"stored_bytes": sizes, "outputs": outputs}
+
+async def list_jobs(**filters):
+    """
+    색인으로 작업 목록 조회 (task_history.query_tasks 인자 그대로 전달)
+
+    Raises:
+        QueueUnavailableError: Redis를 사용할 수 없는 경우
+    """
+    redis_client = await _require_redis()
+    return await query_tasks(redis_client, **filters)
+
+async def wait_for_job(task_id: str, timeout: float):
+    """
+    작업이 끝날 때까지 최대 timeout초 기다린 뒤 작업 기록 반환 (long-poll)
+    """
+    redis_client = await _require_redis()
+    pubsub = redis_client.pubsub()
+    await pubsub.subscribe(done_channel(task_id))
+    try:
+        # 구독 후 다시 확인하여 그 사이에 끝난 작업을 놓치지 않음
+        job = await get_job(task_id)
+        if job is None or job.get("status") in TERMINAL_STATUSES:
+            return job
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=min(1.0, deadline - time.monotonic()))
+            if message is not None:
+                break
+        return await get_job(task_id)
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
+
+async def queue_stats():
+    """대기/실행 중 작업 수 반환"""
+    redis_client = await get_async_redis_client()
+    if redis_client is None:
+        return {"available": False}
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.llen(PENDING_KEY)
+        pipe.llen(PROCESSING_KEY)
+        pending, processing = await pipe.execute()
+    return {"available": True, "pending": pending, "processing": processing, "max_depth": JOB_QUEUE_MAX_DEPTH}
+
+# 이하 워커에서 사용하는 함수
+
+async def claim_job(redis_client, timeout: float = 1.0):
+    """대기열에서 작업 하나를 꺼내 실행 중으로 표시. 없으면 None"""
+    task_id = await redis_client.blmove(PENDING_KEY, PROCESSING_KEY, timeout, "RIGHT", "LEFT")
+    if task_id is None:
+        return None
+
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.zadd(HEARTBEAT_KEY, {task_id: time.time()})
+        pipe.hincrby(f"task:{task_id}", "attempts", 1)
+        await pipe.execute()
+    await update_task(redis_client, task_id, {"status": "running", "started_at": datetime.datetime.now().isoformat()})
+    return task_id
+
+async def heartbeat(redis_client, task_id: str):
+    await redis_client.zadd(HEARTBEAT_KEY, {task_id: time.time()})
+
+async def complete_job(redis_client, task_id: str, status: str, result: str, intermediates=None):
+    """
+    작업 결과를 기록하고 실행 목록에서 제거한 뒤 대기 중인 조회 요청에 알림
+
+    완료된 작업의 전체 답변과 중간 결과는 압축 출력(task:{task_id}:blobs)에 저장하고, 작업 기록의 result에는
+    앞부분(PREVIEW_CHARS)만 남깁니다. 잘린 경우 result_truncated가 1이며 전체는 include=response로 조회합니다.
+
+    Args:
+        intermediates (dict, optional): 단계별 중간 결과 (thoughts, research_results, work_results)
+    """
+    fields = {"status": status, "completed_at": datetime.datetime.now().isoformat(), "result": result}
+    if TASK_BLOB_ENABLED and status == "completed":
+        # 완료 알림을 받은 조회 요청이 바로 읽을 수 있도록 상태보다 먼저 기록
+        async with redis_client.pipeline(transaction=False) as pipe:
+            write_blobs(pipe, task_id, {"response": result, **(intermediates or {})})
+            await pipe.execute()
+        if len(result) > PREVIEW_CHARS:
+            fields.update(result=result[:PREVIEW_CHARS], result_truncated=1)
+    await update_task(redis_client, task_id, fields)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.lrem(PROCESSING_KEY, 1, task_id)
+        pipe.zrem(HEARTBEAT_KEY, task_id)
+        pipe.publish(done_channel(task_id), status)
+        await pipe.execute()
+
+async def requeue_job(redis_client, task_id: str):
+    """실행 중인 작업을 대기열 앞쪽(다음에 꺼낼 위치)으로 되돌림"""
+    # 다른 워커가 다시 꺼내 running으로 바꾼 뒤에 queued로 덮어쓰지 않도록 상태를 먼저 기록
+    await update_task(redis_client, task_id, {"status": "queued"})
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.lrem(PROCESSING_KEY, 1, task_id)
+        pipe.zrem(HEARTBEAT_KEY, task_id)
+        pipe.rpush(PENDING_KEY, task_id)
+        await pipe.execute()
+
+async def requeue_stuck_jobs(redis_client) -> int:
+    """
+    하트비트가 JOB_STUCK_TIMEOUT 이상 끊긴 작업을 대기열 앞쪽으로 되돌림
+
+    JOB_MAX_ATTEMPTS 이상 시도한 작업은 실패로 처리합니다.
+
+    Returns:
+        int: 되돌리거나 실패 처리한 작업 수
+    """
+    stuck = await redis_client.zrangebyscore(HEARTBEAT_KEY, 0, time.time() - JOB_STUCK_TIMEOUT)
+    handled = 0
+    for task_id in stuck:
+        # 여러 워커가 동시에 확인해도 LREM에 성공한 하나만 처리
+        if not await redis_client.lrem(PROCESSING_KEY, 1, task_id):
+            await redis_client.zrem(HEARTBEAT_KEY, task_id)
+            continue
+
+        attempts = int(await redis_client.hget(f"task:{task_id}", "attempts") or 0)
+        if attempts >= JOB_MAX_ATTEMPTS:
+            await complete_job(redis_client, task_id, "failed", f"작업이 {attempts}번 시도 후에도 완료되지 않았습니다.")
+        else:
+            await requeue_job(redis_client, task_id)
+            print(f"멈춘 작업 재등록: {task_id} (시도 {attempts}회)")
+        handled += 1
+    return handled
@@ -1,16 +1,288 @@
 """
 LLM 모델 생성 및 관리를 위한 모듈
+
+Ollama는 마지막 요청 후 keep_alive 시간이 지나거나 다른 모델을 올리면서 메모리가 부족해지면 모델을 내립니다.
+ModelWarmer는 시작할 때 사용할 모델을 미리 올리고(preload), 주기적으로 상주 여부(/api/ps)를 확인해
+내려간 모델은 다시 올리며, 오래 쉬는 모델에는 짧은 예열 생성을 보내 첫 요청이 로드 시간을 기다리지 않게 합니다.
 """
 
+import time
+import asyncio
+import datetime
+import threading
+from typing import Any, AsyncIterator, List, Optional
+import ollama
 from langchain_ollama import OllamaLLM
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import Generation, GenerationChunk, LLMResult
 from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
-from agent.conf.config import DEFAULT_MODEL, OLLAMA_PORT
+from agent import google_ai
+from agent.conf.config import (
+    DEFAULT_MODEL, GOOGLE_MODEL, OLLAMA_BASE_URL, OLLAMA_KEEP_ALIVE, OLLAMA_PRELOAD_MODELS,
+    OLLAMA_WARMUP_TIMEOUT, OLLAMA_WARMUP_INTERVAL, OLLAMA_WARMUP_IDLE
+)
+from agent.callbacks import token_usage_handler, llm_trace_handler, ollama_usage_handler, google_usage_handler
+from agent.metrics import OLLAMA_MODEL_LOADS, OLLAMA_WARMUPS, OLLAMA_COLD_REQUESTS
+
+# (모델, base_url)별로 재사용하는 LLM 클라이언트 (Google은 base_url 자리에 "google")
+_llm_cache = {}
+_llm_lock = threading.Lock()
+
+class GoogleGenerativeLLM(LLM):
+    """
+    agent.google_ai를 사용하는 LangChain LLM
+
+    그래프 노드에서 OllamaLLM 대신 사용할 수 있으며, 모델 객체 캐시, 동시 호출 제한, 재시도를 그대로 사용합니다.
+    토큰 수는 generation_info의 prompt_token_count/candidates_token_count로 전달합니다.
+    """
+
+    model: str = GOOGLE_MODEL
+    max_output_tokens: Optional[int] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "google-generativeai"
+
+    @property
+    def _identifying_params(self):
+        return {"model": self.model, "max_output_tokens": self.max_output_tokens}
+
+    def _request_kwargs(self, stop, format=None):
+        generation_config = {}
+        if stop:
+            generation_config["stop_sequences"] = stop
+        if self.max_output_tokens is not None:
+            generation_config["max_output_tokens"] = self.max_output_tokens
+        if format:
+            # OllamaLLM과 같은 format 인자 (스키마 dict 또는 "json")를 JSON 응답 모드로 처리
+            generation_config["response_mime_type"] = "application/json"
+        return {"generation_config": generation_config} if generation_config else {}
+
+    def _generation_info(self, usage_metadata):
+        info = google_ai.usage_counts(usage_metadata)
+        # 생성 최대 토큰에 걸려 잘린 응답은 Ollama와 같은 done_reason으로 표시
+        if self.max_output_tokens is not None and info.get("candidates_token_count", 0) >= self.max_output_tokens:
+            info["done_reason"] = "length"
+        return info
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        # 동기 호출은 이벤트 루프 밖(스크립트)에서만 사용
+        text, _ = asyncio.run(google_ai.generate(prompt, self.model, **self._request_kwargs(stop, kwargs.get("format"))))
+        return text
 
-def create_ollama_llm(model_name=DEFAULT_MODEL, streaming=False):
+    async def _agenerate(self, prompts: List[str], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> LLMResult:
+        generations = []
+        for prompt in prompts:
+            text, usage_metadata = await google_ai.generate(prompt, self.model, **self._request_kwargs(stop, kwargs.get("format")))
+            generations.append([Generation(text=text, generation_info=self._generation_info(usage_metadata))])
+        return LLMResult(generations=generations)
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> AsyncIterator[GenerationChunk]:
+        async for chunk in google_ai.stream(prompt, self.model, **self._request_kwargs(stop, kwargs.get("format"))):
+            generation = GenerationChunk(
+                text=google_ai.chunk_text(chunk),
+                generation_info=self._generation_info(getattr(chunk, "usage_metadata", None)) or None
+            )
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(generation.text, chunk=generation)
+            yield generation
+
+def create_ollama_llm(model_name=DEFAULT_MODEL, streaming=False, base_url=OLLAMA_BASE_URL):
     """LangChain Ollama LLM 생성"""
     callbacks = [StreamingStdOutCallbackHandler()] if streaming else []
+    callbacks += [token_usage_handler, llm_trace_handler, ollama_usage_handler]  # 노드별 토큰 수, 요청 trace, 취소 시 버린 토큰 수 기록
     return OllamaLLM(
         model=model_name,
-        base_url=f"http://localhost:{OLLAMA_PORT}",
+        base_url=base_url,
+        keep_alive=OLLAMA_KEEP_ALIVE,  # 요청마다 Ollama 기본값(5분)으로 줄어들지 않도록 예열과 같은 값 사용
         callbacks=callbacks
-    )
\ No newline at end of file
+    )
+
+def get_ollama_llm(model_name=DEFAULT_MODEL, base_url=OLLAMA_BASE_URL):
+    """모델별로 캐시된 Ollama LLM 클라이언트 반환"""
+    key = (model_name, base_url)
+    llm = _llm_cache.get(key)
+    if llm is not None:
+        return llm
+
+    with _llm_lock:
+        if key not in _llm_cache:
+            _llm_cache[key] = create_ollama_llm(model_name, base_url=base_url)
+        return _llm_cache[key]
+
+def create_google_llm(model_name=GOOGLE_MODEL, streaming=False):
+    """Google Generative AI LLM 생성 (토큰 수와 오류 수는 agent.google_ai에서 기록)"""
+    callbacks = [StreamingStdOutCallbackHandler()] if streaming else []
+    callbacks += [llm_trace_handler, google_usage_handler]
+    return GoogleGenerativeLLM(model=model_name, callbacks=callbacks)
+
+def get_google_llm(model_name=GOOGLE_MODEL):
+    """모델별로 캐시된 Google LLM 클라이언트 반환"""
+    key = (model_name, "google")
+    llm = _llm_cache.get(key)
+    if llm is not None:
+        return llm
+
+    with _llm_lock:
+        if key not in _llm_cache:
+            _llm_cache[key] = create_google_llm(model_name)
+        return _llm_cache[key]
+
+def clear_llm_cache(model_name=None):
+    """캐시된 LLM 클라이언트 제거 (model_name이 없으면 전체 제거)"""
+    with _llm_lock:
+        for key in list(_llm_cache):
+            if model_name is None or key[0] == model_name:
+                del _llm_cache[key]
+
+class ModelWarmer:
+    """
+    Ollama 모델 상주 관리자 (시작 시 로드, 상주 여부 확인, 내려간 모델 재로드, 유휴 예열)
+
+    모델별로 상주 여부, 로드 횟수와 시간, 예열 횟수, 마지막 요청 후 경과 시간을 기록합니다.
+    """
+
+    def __init__(self, models, base_url=OLLAMA_BASE_URL, keep_alive=OLLAMA_KEEP_ALIVE,
+                 interval=OLLAMA_WARMUP_INTERVAL, idle=OLLAMA_WARMUP_IDLE):
+        self.base_url = base_url
+        self.keep_alive = keep_alive
+        self.interval = interval
+        self.idle = idle
+        self.models = {model: self._new_state() for model in dict.fromkeys(models)}
+        self._client = None
+        self._task = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _new_state():
+        return {"resident": None, "expires_at": None, "size_vram": None, "loads": 0, "last_load_seconds": None,
+                "warmups": 0, "last_warmup": None, "last_used": None, "cold_requests": 0, "error": None, "_warmed_at": None}
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = ollama.AsyncClient(host=self.base_url)
+        return self._client
+
+    def mark_used(self, model):
+        """실제 요청이 모델을 사용했음을 기록 (유휴 예열 시점 계산, 로드되지 않은 상태면 cold 요청으로 집계)"""
+        state = self.models.setdefault(model, self._new_state())
+        state["last_used"] = time.monotonic()
+        if state["resident"] is False:
+            state["cold_requests"] += 1
+            OLLAMA_COLD_REQUESTS.inc(model=model)
+            # 이 요청이 모델을 올리므로 다음 확인 전까지는 알 수 없음으로 표시
+            state["resident"] = None
+
+    async def start(self, timeout=OLLAMA_WARMUP_TIMEOUT):
+        """
+        모든 모델을 올리고 주기적인 확인 태스크 시작
+
+        Ollama에 연결할 수 없으면 timeout초 동안 재시도합니다. 준비 단계(readiness)로 사용합니다.
+
+        Returns:
+            bool: 모든 모델을 올렸는지 여부
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+        deadline = time.monotonic() + timeout
+        delay = 1.0
+        while True:
+            results = await asyncio.gather(*[self.warm(model, "preload") for model in self.models if not self.models[model]["resident"]])
+            if all(results):
+                return True
+            if time.monotonic() + delay > deadline:
+                return False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def warm(self, model, reason):
+        """
+        모델 로드 또는 짧은 예열 생성 (preload/evicted는 생성 없이 로드만, idle은 1토큰 생성)
+
+        Returns:
+            bool: 성공 여부
+        """
+        state = self.models.setdefault(model, self._new_state())
+        OLLAMA_WARMUPS.inc(model=model, reason=reason)
+        started = time.perf_counter()
+        try:
+            if reason == "idle":
+                response = await self.client.generate(model=model, prompt="안녕", options={"num_predict": 1}, keep_alive=self.keep_alive)
+            else:
+                # 프롬프트 없이 요청하면 생성하지 않고 모델만 메모리에 올림
+                response = await self.client.generate(model=model, keep_alive=self.keep_alive)
+        except Exception as e:
+            state["error"] = str(e)
+            print(f"Ollama 모델 예열 실패 ({model}, {reason}): {str(e)}")
+            return False
+
+        elapsed = time.perf_counter() - started
+        load_seconds = (response.load_duration or 0) / 1e9
+        state.update(resident=True, error=None, warmups=state["warmups"] + 1, _warmed_at=time.monotonic(),
+                     last_warmup={"reason": reason, "at": datetime.datetime.now().isoformat(), "seconds": round(elapsed, 3)})
+        # 이미 올라가 있던 모델은 load_duration이 매우 짧음
+        if reason != "idle" or load_seconds > 0.5:
+            state["loads"] += 1
+            state["last_load_seconds"] = round(load_seconds or elapsed, 3)
+            OLLAMA_MODEL_LOADS.observe(load_seconds or elapsed, model=model, reason=reason)
+            print(f"Ollama 모델 로드: {model} ({reason}, {state['last_load_seconds']}초)")
+        return True
+
+    async def refresh(self):
+        """/api/ps로 상주 여부 갱신. 확인할 수 없으면 False"""
+        try:
+            response = await self.client.ps()
+        except Exception as e:
+            print(f"Ollama 모델 상주 여부 확인 실패: {str(e)}")
+            return False
+
+        loaded = {model.model: model for model in response.models}
+        for name, state in self.models.items():
+            model = loaded.get(name) or loaded.get(f"{name}:latest")
+            state["resident"] = model is not None
+            state["expires_at"] = model.expires_at.isoformat() if model is not None and model.expires_at else None
+            state["size_vram"] = model.size_vram if model is not None else None
+        return True
+
+    async def check(self):
+        """내려간 모델은 다시 올리고, 오래 쉰 모델에는 예열 생성 실행"""
+        async with self._lock:
+            if not await self.refresh():
+                return
+            now = time.monotonic()
+            for model, state in self.models.items():
+                if not state["resident"]:
+                    await self.warm(model, "evicted")
+                elif now - max(state["last_used"] or 0, state["_warmed_at"] or 0) >= self.idle:
+                    await self.warm(model, "idle")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                print(f"Ollama 모델 예열 확인 실패: {str(e)}")
+
+    def snapshot(self):
+        """모델별 상주 여부와 로드/예열 기록"""
+        now = time.monotonic()
+        models = {}
+        for model, state in self.models.items():
+            models[model] = {key: value for key, value in state.items() if not key.startswith("_") and key != "last_used"}
+            models[model]["idle_seconds"] = round(now - state["last_used"], 1) if state["last_used"] else None
+        return {"keep_alive": self.keep_alive, "interval": self.interval, "idle": self.idle, "models": models}
+
+# 프로세스 전역 모델 상주 관리자 (기본 모델 + OLLAMA_PRELOAD_MODELS)
+model_warmer = ModelWarmer([DEFAULT_MODEL, *OLLAMA_PRELOAD_MODELS])
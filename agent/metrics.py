@@ -0,0 +1,170 @@
+"""
+Prometheus 형식 지표 수집 모듈
+
+요청 경로의 오버헤드를 줄이기 위해 외부 라이브러리 없이 메모리 안에서 카운터/게이지/히스토그램을 누적하고,
+/metrics 요청이 올 때만 텍스트 형식으로 변환합니다.
+
+- 그래프 노드: instrument_node()로 감싸 실행 시간과 오류 수 기록
+- Ollama LLM 호출: agent.callbacks의 TokenUsageHandler로 토큰 수와 오류 수를 노드별로 기록
+- Google AI 호출: agent.google_ai에서 토큰 수, 오류 수, 재시도 수를 노드별로 기록
+- 백엔드 호출, 캐시 조회, Redis 기록: agent_manager, task_log에서 직접 기록
+"""
+
+import time
+import bisect
+import inspect
+import threading
+import contextvars
+from typing import TYPE_CHECKING
+from agent.tracing import span
+
+if TYPE_CHECKING:
+    from langchain_core.runnables import RunnableConfig
+
+# 요청 하나의 처리 시간 분포에 맞춘 히스토그램 구간 (초)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry = []
+
+# 현재 실행 중인 그래프 노드 이름 (LLM 콜백에서 노드별로 토큰 수를 나누는 데 사용)
+current_node = contextvars.ContextVar("current_node", default="")
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(labelnames, values), *extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", bound)])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+def render() -> str:
+    """등록된 모든 지표를 Prometheus 텍스트 형식으로 변환"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# 지표 정의
+NODE_DURATION = Histogram("agent_node_duration_seconds", "에이전트 그래프 노드 실행 시간", ("node",))
+NODE_ERRORS = Counter("agent_node_errors_total", "에이전트 그래프 노드 오류 수", ("node",))
+LLM_TOKENS = Counter("llm_tokens_total", "LLM 프롬프트/생성 토큰 수", ("backend", "node", "kind"))
+LLM_ERRORS = Counter("llm_errors_total", "LLM 호출 오류 수", ("backend", "node"))
+GOOGLE_RETRIES = Counter("google_retries_total", "Google AI 요청 재시도 수 (오류 종류별)", ("reason",))
+BACKEND_DURATION = Histogram("backend_request_duration_seconds", "백엔드(ollama/google) 생성 요청 시간", ("backend",))
+BACKEND_ERRORS = Counter("backend_errors_total", "백엔드 생성 요청 오류 수", ("backend",))
+ROUTING_DECISIONS = Counter("routing_decisions_total", "자동 선택된 백엔드별 요청 수 (primary/failover/hedge)", ("service", "outcome"))
+NODE_PROMPT_TOKENS = Histogram("node_prompt_tokens", "노드별 프롬프트 크기 (추정 토큰 수, 압축 후)", ("node",),
+                               buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192))
+CONTEXT_TOKENS_SAVED = Counter("context_tokens_saved_total", "컨텍스트 압축으로 줄인 프롬프트 토큰 수 (추정)", ("node",))
+CLASSIFICATION_PARSES = Counter("classification_parse_total", "LLM 분류 응답 파싱 결과 (ok/repaired/failed)", ("backend", "result"))
+CANCELLED_GENERATIONS = Counter("cancelled_generations_total", "취소로 중단한 생성 수 (클라이언트 연결 종료, 중복 요청의 늦은 쪽 등)", ("backend",))
+WASTED_TOKENS = Counter("wasted_tokens_total", "취소된 생성이 중단 전까지 사용한 토큰 수 (아무도 받지 않은 토큰, 생성 토큰은 추정 포함)", ("backend", "kind"))
+NODE_CACHE_LOOKUPS = Counter("node_cache_lookups_total", "노드 결과 캐시 조회 결과 (local_hit/redis_hit/miss)", ("node", "result"))
+CACHE_LOOKUPS = Counter("response_cache_lookups_total", "응답 캐시 조회 결과 (hit/miss/bypass)", ("result",))
+TASK_LOG_FLUSH_DURATION = Histogram("task_log_flush_duration_seconds", "작업 기록 Redis 배치 쓰기 시간")
+TASK_LOG_FLUSH_ERRORS = Counter("task_log_flush_errors_total", "작업 기록 Redis 배치 쓰기 실패 수")
+OLLAMA_MODEL_LOADS = Histogram("ollama_model_load_seconds", "Ollama 모델 로드 시간 (예열/재로드 포함)", ("model", "reason"),
+                               buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0))
+OLLAMA_WARMUPS = Counter("ollama_warmups_total", "Ollama 모델 예열 요청 수 (preload/idle/evicted)", ("model", "reason"))
+OLLAMA_COLD_REQUESTS = Counter("ollama_cold_requests_total", "모델이 메모리에 없는 상태에서 들어온 요청 수", ("model",))
+LLM_TRUNCATIONS = Counter("llm_output_truncated_total", "생성 최대 토큰(출력 예산)에 걸려 잘린 LLM 응답 수", ("backend", "node"))
+TASK_BLOB_BYTES = Counter("task_blob_bytes_total", "압축 저장한 작업 출력 크기 (raw: 원본, stored: 압축 후)", ("field", "kind"))
+
+# /metrics 요청 시점에 채우는 게이지
+ADMISSION_ACTIVE = Gauge("admission_active_requests", "백엔드별 실행 중인 요청 수", ("backend",))
+ADMISSION_QUEUE_DEPTH = Gauge("admission_queue_depth", "백엔드별 대기 중인 요청 수", ("backend",))
+JOB_QUEUE_DEPTH = Gauge("job_queue_depth", "비동기 작업 큐 길이", ("state",))
+TASK_LOG_PENDING = Gauge("task_log_pending", "Redis에 기록되지 않은 작업 기록 수")
+SINGLE_FLIGHT_INFLIGHT = Gauge("single_flight_inflight", "합치기 대상으로 진행 중인 요청 수")
+CACHE_ENTRIES = Gauge("response_cache_entries", "응답 캐시 항목 수")
+CACHE_HIT_RATE = Gauge("response_cache_hit_rate", "응답 캐시 적중률 (전체 프로세스 누적)")
+OLLAMA_MODEL_RESIDENT = Gauge("ollama_model_resident", "Ollama 모델 상주 여부 (1: 메모리에 있음, 0: 없음)", ("model",))
+
+def instrument_node(name, func):
+    """그래프 노드 함수를 감싸 실행 시간과 오류 수를 기록 (trace 중이면 노드 span도 생성, 취소된 요청이면 실행하지 않음)"""
+    from agent.cancellation import raise_if_cancelled
+    takes_config = len(inspect.signature(func).parameters) > 1
+
+    async def node(state, config: "RunnableConfig"):
+        # 클라이언트가 떠난 요청은 다음 노드를 실행하지 않음
+        raise_if_cancelled()
+        token = current_node.set(name)
+        started = time.perf_counter()
+        try:
+            with span(f"node:{name}"):
+                return await (func(state, config) if takes_config else func(state))
+        except Exception:
+            NODE_ERRORS.inc(node=name)
+            raise
+        finally:
+            NODE_DURATION.observe(time.perf_counter() - started, node=name)
+            current_node.reset(token)
+
+    node.__name__ = getattr(func, "__name__", name)
+    return node
@@ -0,0 +1,176 @@
+"""
+그래프 노드 단위 결과 캐시(memoization) 모듈
+
+전체 프롬프트가 달라도 중간 단계의 입력은 자주 겹치므로, 노드마다 결과를 결정하는 상태 키(inputs)를 선언하고
+그 값이 같으면 LLM 호출 없이 이전 결과를 사용합니다.
+- 1단계: 프로세스 안의 LRU (NODE_CACHE_LOCAL_SIZE개)
+- 2단계: Redis (NODE_CACHE_TTL초, 프로세스 간 공유)
+캐시 키에는 모델, LLM 제공자, 노드가 사용하는 프롬프트 템플릿의 해시, 토큰 예산 설정, NODE_CACHE_VERSION이 들어가므로
+모델, 프롬프트, 예산을 바꾸면 이전 결과는 자연히 사용되지 않습니다.
+최종 답변(answer_step)과 생성 최대 토큰에 걸려 잘린 결과는 캐시하지 않습니다.
+"""
+
+import copy
+import json
+import time
+import hashlib
+import functools
+import threading
+import contextvars
+from collections import OrderedDict
+from agent.metrics import NODE_CACHE_LOOKUPS, current_node
+from agent.tracing import span
+from agent.runtime import node_runtime
+from agent.response_cache import normalize_prompt
+from agent.budget import budget_signature
+from agent.cancellation import current_usage
+from agent.conf.config import (
+    NODE_CACHE_ENABLED, NODE_CACHE_TTL, NODE_CACHE_LOCAL_SIZE, NODE_CACHE_VERSION,
+    get_async_redis_client
+)
+
+CACHE_PREFIX = "node_cache"
+
+# 현재 노드 결과를 저장하지 않도록 표시 (파싱 실패처럼 다시 실행하면 달라질 수 있는 결과)
+_skip_store = contextvars.ContextVar("node_cache_skip_store", default=False)
+
+def skip_store():
+    """실행 중인 노드의 결과를 캐시에 저장하지 않음"""
+    _skip_store.set(True)
+
+class LocalLRU:
+    """만료 시각이 있는 프로세스 내 LRU 캐시"""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+local_cache = LocalLRU(NODE_CACHE_LOCAL_SIZE, NODE_CACHE_TTL)
+
+def template_version(prompt_names):
+    """노드가 사용하는 프롬프트 템플릿 원문의 해시 (템플릿을 고치면 바뀜)"""
+    from agent.prompts import PROMPT_TEMPLATES
+    raw = "\x00".join(PROMPT_TEMPLATES[name] for name in prompt_names)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:12]
+
+def _normalize(value):
+    return normalize_prompt(value) if isinstance(value, str) else value
+
+def node_cache_key(node, runtime, inputs, version):
+    """노드 이름, 모델, 제공자, 템플릿 버전, 입력 값으로 캐시 키 생성"""
+    raw = json.dumps({
+        "node": node,
+        "model": runtime.model_name,
+        "provider": runtime.key.provider,
+        "templates": version,
+        "version": NODE_CACHE_VERSION,
+        "budgets": budget_signature(),
+        "inputs": {name: _normalize(value) for name, value in inputs.items()},
+    }, ensure_ascii=False, sort_keys=True)
+    return f"{CACHE_PREFIX}:{node}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+async def _redis_get(key):
+    redis_client = await get_async_redis_client()
+    if redis_client is None:
+        return None
+    try:
+        cached = await redis_client.get(key)
+        return json.loads(cached) if cached is not None else None
+    except Exception as e:
+        print(f"노드 캐시 조회 실패: {str(e)}")
+        return None
+
+async def _redis_set(key, value):
+    redis_client = await get_async_redis_client()
+    if redis_client is None:
+        return
+    try:
+        await redis_client.set(key, json.dumps(value, ensure_ascii=False), ex=NODE_CACHE_TTL)
+    except Exception as e:
+        print(f"노드 캐시 저장 실패: {str(e)}")
+
+def memoize_node(inputs, prompts=(), when=None):
+    """
+    노드 결과를 선언한 입력 상태 키 기준으로 캐시하는 데코레이터
+
+    Args:
+        inputs (tuple): 노드 결과를 결정하는 상태 키
+        prompts (tuple): 노드가 사용하는 프롬프트 템플릿 이름 (템플릿 버전을 키에 포함)
+        when (callable, optional): 상태를 받아 캐시를 사용할지 결정 (입력이 선언과 다른 분기가 있는 경우)
+    """
+    version = template_version(prompts)
+
+    def decorator(func):
+        name = func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(state, config):
+            if not NODE_CACHE_ENABLED or (when is not None and not when(state)):
+                return await func(state, config)
+
+            node = current_node.get() or name
+            key = node_cache_key(name, node_runtime(config), {field: state.get(field) for field in inputs}, version)
+            with span("node_cache.lookup") as lookup_span:
+                result, tier = local_cache.get(key), "local_hit"
+                if result is None:
+                    result, tier = await _redis_get(key), "redis_hit"
+                    if result is not None:
+                        local_cache.set(key, result)
+                if result is None:
+                    tier = "miss"
+                if lookup_span is not None:
+                    lookup_span.attrs["result"] = tier
+            NODE_CACHE_LOOKUPS.inc(node=node, result=tier)
+            if result is not None:
+                # 로컬 캐시 항목을 그래프 상태에서 수정하지 않도록 복사하여 반환
+                return copy.deepcopy(result)
+
+            token = _skip_store.set(False)
+            try:
+                result = await func(state, config)
+                skipped = _skip_store.get()
+            finally:
+                _skip_store.reset(token)
+            # 잘린 결과를 다른 요청이 캐시에서 받으면 잘렸다는 표시 없이 최종 답변까지 캐시되므로 저장하지 않음
+            usage = current_usage.get()
+            if usage is not None and node in usage.truncated:
+                skipped = True
+            if not skipped:
+                local_cache.set(key, result)
+                await _redis_set(key, result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+def node_cache_stats():
+    return {"enabled": NODE_CACHE_ENABLED, "ttl": NODE_CACHE_TTL, "local_entries": len(local_cache), "local_max_entries": NODE_CACHE_LOCAL_SIZE}
@@ -0,0 +1,76 @@
+"""
+에이전트 노드에서 사용하는 프롬프트 템플릿 모음
+"""
+
+from typing import Dict
+from langchain_core.prompts import PromptTemplate
+
+PROMPT_TEMPLATES = {
+    "check_game_resource": """사용자의 질문이 게임 리소스(3D 모델 또는 애니메이션) 제작 요청인지 분석하세요.
+
+        질문: {question}
+
+        다음 키만 있는 JSON 객체 하나로 응답하세요:
+        - is_game_resource_request: 게임 리소스 제작 요청인지 여부 (true/false)
+        - resource_type: 요청된 리소스 유형 ("3d_model", "animation", "other" 중 하나)
+        - details: 요청된 리소스의 세부 정보 ("대상", "스타일", "동작" 중 알 수 있는 키만, 짧은 문자열 값)
+
+        JSON:""",
+
+    "repair_classification": """다음 응답은 요구한 JSON 형식이 아닙니다.
+
+        응답: {output}
+        오류: {error}
+
+        is_game_resource_request(true/false), resource_type("3d_model", "animation", "other" 중 하나),
+        details(문자열 값 객체) 키만 있는 올바른 JSON 객체 하나로 다시 응답하세요.
+
+        JSON:""",
+
+    "think": """질문을 분석하고 게임 리소스 제작에 대한 사고 과정을 설명하세요:
+
+        질문: {question}
+
+        사고 과정:""",
+
+    "research_resource": """사용자가 게임 리소스 제작을 요청했습니다. 다음 정보를 바탕으로 제작 방법과 단계를 상세히 설명하세요:
+
+            요청 유형: {resource_type}
+            요청 세부 정보: {resource_details}
+
+            다음 내용을 포함해주세요:
+            1. 필요한 소프트웨어와 도구
+            2. 제작 단계와 프로세스
+            3. 일반적인 기술적 고려사항
+            4. 작업 시간 추정
+
+            자세한 조사 결과:""",
+
+    "research_general": """질문에 대한 정보를 조사하고 수집하세요:
+
+            질문: {question}
+            지금까지 사고: {thoughts}
+
+            조사 결과:""",
+
+    "answer_resource": """게임 리소스 제작 요청에 대한 최종 답변을 생성하세요:
+
+            요청 내용: {question}
+            요청 유형: {resource_type}
+            조사 결과: {research_results}
+            작업 결과: {work_results}
+
+            사용자가 이해하기 쉽게 리소스 제작 과정과 결과를 설명하는 답변을 작성하세요:""",
+
+    "answer_general": """질문에 대한 최종 답변을 생성하세요:
+
+            질문: {question}
+            지금까지 사고: {thoughts}
+            조사 결과: {research_results}
+
+            명확하고 구조화된 최종 답변:""",
+}
+
+def build_prompts() -> Dict[str, PromptTemplate]:
+    """모든 프롬프트 템플릿을 파싱하여 이름별로 반환"""
+    return {name: PromptTemplate.from_template(template) for name, template in PROMPT_TEMPLATES.items()}
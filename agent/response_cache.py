@@ -0,0 +1,118 @@
+"""
+반복 프롬프트에 대한 Redis 응답 캐시 모듈
+
+키는 정규화된 프롬프트 + 모델 + 서비스로 구성되며, 항목마다 TTL을 두고
+최근 사용 시각 기준 sorted set으로 최대 항목 수를 넘으면 오래된 항목부터 제거합니다.
+"""
+
+import re
+import json
+import time
+import hashlib
+import unicodedata
+from agent.conf.config import (
+    RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES,
+    get_async_redis_client
+)
+
+CACHE_PREFIX = "response_cache"
+CACHE_INDEX_KEY = f"{CACHE_PREFIX}:index"
+CACHE_STATS_KEY = f"{CACHE_PREFIX}:stats"
+
+def normalize_prompt(prompt: str) -> str:
+    """유니코드 정규화, 공백 정리, 소문자 변환으로 같은 의미의 프롬프트를 하나로 묶음"""
+    text = unicodedata.normalize("NFKC", prompt).strip().lower()
+    return re.sub(r"\s+", " ", text)
+
+def request_fingerprint(prompt: str, model: str, service: str) -> str:
+    """같은 응답을 기대할 수 있는 요청을 구분하는 해시 (정규화된 프롬프트 + 모델 + 서비스)"""
+    raw = f"{service.lower()}\x00{model}\x00{normalize_prompt(prompt)}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def cache_key(prompt: str, model: str, service: str) -> str:
+    """캐시 항목 키 생성"""
+    return f"{CACHE_PREFIX}:{request_fingerprint(prompt, model, service)}"
+
+async def get_cached_response(prompt: str, model: str, service: str):
+    """
+    캐시된 응답 조회
+
+    Returns:
+        dict: {"response": 응답, "latency": 원래 생성 시간(초)} 또는 None
+    """
+    redis_client = await get_async_redis_client()
+    if redis_client is None or not RESPONSE_CACHE_ENABLED:
+        return None
+
+    key = cache_key(prompt, model, service)
+    try:
+        cached = await redis_client.get(key)
+        if cached is None:
+            await redis_client.hincrby(CACHE_STATS_KEY, "misses", 1)
+            return None
+
+        entry = json.loads(cached)
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.zadd(CACHE_INDEX_KEY, {key: time.time()})
+            pipe.hincrby(CACHE_STATS_KEY, "hits", 1)
+            pipe.hincrbyfloat(CACHE_STATS_KEY, "saved_seconds", entry.get("latency", 0.0))
+            await pipe.execute()
+        return entry
+    except Exception as e:
+        print(f"응답 캐시 조회 실패: {str(e)}")
+        return None
+
+async def store_response(prompt: str, model: str, service: str, response: str, latency: float):
+    """생성된 응답을 캐시에 저장하고 최대 항목 수를 넘으면 오래된 항목 제거"""
+    redis_client = await get_async_redis_client()
+    if redis_client is None or not RESPONSE_CACHE_ENABLED:
+        return
+
+    key = cache_key(prompt, model, service)
+    entry = json.dumps({"response": response, "latency": latency}, ensure_ascii=False)
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.set(key, entry, ex=RESPONSE_CACHE_TTL)
+            pipe.zadd(CACHE_INDEX_KEY, {key: time.time()})
+            pipe.zcard(CACHE_INDEX_KEY)
+            *_, size = await pipe.execute()
+
+        if size > RESPONSE_CACHE_MAX_ENTRIES:
+            evicted = await redis_client.zpopmin(CACHE_INDEX_KEY, size - RESPONSE_CACHE_MAX_ENTRIES)
+            if evicted:
+                await redis_client.delete(*[member for member, _ in evicted])
+                await redis_client.hincrby(CACHE_STATS_KEY, "evictions", len(evicted))
+    except Exception as e:
+        print(f"응답 캐시 저장 실패: {str(e)}")
+
+async def get_cache_stats():
+    """캐시 적중률 및 절약된 생성 시간 통계 반환"""
+    stats = {
+        "enabled": RESPONSE_CACHE_ENABLED,
+        "ttl": RESPONSE_CACHE_TTL,
+        "max_entries": RESPONSE_CACHE_MAX_ENTRIES,
+    }
+
+    redis_client = await get_async_redis_client()
+    if redis_client is None:
+        return {**stats, "available": False}
+
+    try:
+        raw = await redis_client.hgetall(CACHE_STATS_KEY)
+        entries = await redis_client.zcard(CACHE_INDEX_KEY)
+    except Exception as e:
+        return {**stats, "available": False, "error": str(e)}
+
+    hits = int(raw.get("hits", 0))
+    misses = int(raw.get("misses", 0))
+    lookups = hits + misses
+    return {
+        **stats,
+        "available": True,
+        "entries": entries,
+        "hits": hits,
+        "misses": misses,
+        "evictions": int(raw.get("evictions", 0)),
+        "hit_rate": hits / lookups if lookups else 0.0,
+        "saved_seconds": float(raw.get("saved_seconds", 0.0)),
+    }
@@ -0,0 +1,206 @@
+"""
+서비스를 지정하지 않은 요청의 백엔드(ollama, google) 선택과 장애 전환(failover) 모듈
+
+백엔드마다 최근 ROUTING_WINDOW개 요청의 처리 시간과 성공 여부를 기록하고, admission 대기열 상태와 합쳐
+예상 처리 시간이 가장 짧은 백엔드부터 시도합니다. 연속으로 실패한 백엔드는 circuit breaker로 잠시 제외하고,
+오류가 나거나 ROUTING_TIMEOUT을 넘기면 다음 백엔드로 전환합니다.
+ROUTING_HEDGE가 켜져 있으면 첫 백엔드의 p95 처리 시간이 지나도 끝나지 않은 요청을 다음 백엔드에도 보내
+먼저 성공한 결과를 사용합니다.
+"""
+
+import asyncio
+import threading
+from collections import deque
+from agent.admission import AdmissionRejected, get_controller
+from agent.circuit_breaker import CircuitBreaker
+from agent.metrics import ROUTING_DECISIONS
+from agent.conf.config import (
+    DEFAULT_MODEL, DEFAULT_SERVICE, GOOGLE_MODEL, GOOGLE_API_KEY,
+    ROUTING_WINDOW, ROUTING_TIMEOUT, ROUTING_DEFAULT_LATENCY,
+    ROUTING_FAILURE_THRESHOLD, ROUTING_COOLDOWN, ROUTING_HEDGE, ROUTING_HEDGE_MIN_DELAY
+)
+
+# 자동 선택을 뜻하는 서비스 이름
+AUTO = "auto"
+
+# 자동 선택 시 백엔드별로 사용할 모델
+BACKEND_MODELS = {"ollama": DEFAULT_MODEL, "google": GOOGLE_MODEL}
+
+class BackendStats:
+    """백엔드 하나의 최근 처리 시간, 오류율, 상태(circuit breaker)"""
+
+    def __init__(self, name, window=ROUTING_WINDOW):
+        self.name = name
+        self.model = BACKEND_MODELS[name]
+        self.breaker = CircuitBreaker(f"{name} 백엔드", ROUTING_FAILURE_THRESHOLD, ROUTING_COOLDOWN)
+        self._samples = deque(maxlen=window)  # (처리 시간, 성공 여부)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, ok, error=None):
+        with self._lock:
+            self._samples.append((seconds, ok))
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure(error)
+
+    def latency(self, quantile=0.5):
+        """성공한 요청 처리 시간의 분위수 (기록이 없으면 None)"""
+        with self._lock:
+            durations = sorted(seconds for seconds, ok in self._samples if ok)
+        if not durations:
+            return None
+        return durations[min(len(durations) - 1, int(quantile * len(durations)))]
+
+    def error_rate(self):
+        with self._lock:
+            samples = list(self._samples)
+        return sum(1 for _, ok in samples if not ok) / len(samples) if samples else 0.0
+
+    def expected_seconds(self):
+        """중앙값 처리 시간에 대기열에서 기다릴 시간과 오류율을 반영한 예상 처리 시간"""
+        controller = get_controller(self.name)
+        backlog = max(0, controller.active + controller.queue_depth + 1 - controller.max_concurrency)
+        base = self.latency(0.5) or ROUTING_DEFAULT_LATENCY
+        return base * (1 + backlog / max(controller.max_concurrency, 1)) / max(1 - self.error_rate(), 0.1)
+
+    def snapshot(self):
+        p50, p95 = self.latency(0.5), self.latency(0.95)
+        return {
+            "model": self.model,
+            "samples": len(self._samples),
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "error_rate": round(self.error_rate(), 3),
+            "expected_seconds": round(self.expected_seconds(), 3),
+            "breaker": self.breaker.snapshot(),
+        }
+
+class BackendRouter:
+    """백엔드 선택, 장애 전환, 중복 요청(hedging)"""
+
+    def __init__(self, names=("ollama", "google")):
+        self.backends = {name: BackendStats(name) for name in names}
+
+    def observe(self, service, seconds, ok, error=None):
+        """백엔드 요청 하나의 결과 기록 (서비스를 지정한 요청도 포함)"""
+        backend = self.backends.get(service.lower())
+        if backend is not None:
+            backend.observe(seconds, ok, error)
+
+    def candidates(self):
+        """사용 가능한 백엔드를 예상 처리 시간 순으로 정렬 (같으면 DEFAULT_SERVICE 우선)"""
+        available = [backend for backend in self.backends.values() if backend.name != "google" or GOOGLE_API_KEY]
+        return sorted(available, key=lambda backend: (backend.expected_seconds(), backend.name != DEFAULT_SERVICE))
+
+    def hedge_delay(self, backend):
+        return max(ROUTING_HEDGE_MIN_DELAY, backend.latency(0.95) or ROUTING_DEFAULT_LATENCY)
+
+    async def run(self, call, decision):
+        """
+        예상 처리 시간 순으로 call(service)를 실행하고 처음 성공한 결과 반환
+
+        Args:
+            call: 서비스 이름을 받아 결과 dict를 반환하는 코루틴 함수
+            decision (dict): 선택 과정을 기록할 dict (예외가 나도 호출한 쪽에서 기록할 수 있도록 전달받음)
+
+        Returns:
+            dict: 성공한 결과. 모두 실패하면 마지막 오류 결과
+
+        Raises:
+            AdmissionRejected: 시도한 백엔드가 모두 대기열 때문에 거절한 경우
+        """
+        order = self.candidates()
+        decision.update({
+            "mode": AUTO,
+            "expected_seconds": {backend.name: round(backend.expected_seconds(), 3) for backend in order},
+            "attempts": [],
+        })
+
+        last = None
+        tried = set()
+        for index, backend in enumerate(order):
+            if backend.name in tried:
+                continue
+            # 차단 중인 백엔드는 건너뛰지만, 남은 백엔드가 없으면 마지막으로 시도
+            if not backend.breaker.allow() and (index < len(order) - 1 or tried):
+                decision["attempts"].append({"service": backend.name, "skipped": "unhealthy"})
+                continue
+
+            rest = [other for other in order[index + 1:] if other.name not in tried]
+            hedge = rest[0] if ROUTING_HEDGE and rest else None
+            tried.add(backend.name)
+            try:
+                result, winner = await self._attempt(backend, hedge, call, decision, tried)
+            except AdmissionRejected as e:
+                last = e
+                continue
+
+            decision.update({"service": winner.name, "model": winner.model})
+            if "error" not in result:
+                outcome = "hedge" if winner is not backend else ("failover" if len(tried) > 1 else "primary")
+                decision["outcome"] = outcome
+                ROUTING_DECISIONS.inc(service=winner.name, outcome=outcome)
+                return result
+            last = result
+
+        decision["outcome"] = "failed"
+        if isinstance(last, AdmissionRejected):
+            raise last
+        return last or {"error": "사용할 수 있는 백엔드가 없습니다."}
+
+    async def _call(self, backend, call, decision):
+        try:
+            result = await asyncio.wait_for(call(backend.name), ROUTING_TIMEOUT)
+        except asyncio.TimeoutError:
+            backend.breaker.record_failure("timeout")
+            result = {"error": f"{backend.name} 응답 시간({ROUTING_TIMEOUT}초)이 초과되었습니다."}
+        except AdmissionRejected as e:
+            decision["attempts"].append({"service": backend.name, "error": str(e), "status_code": e.status_code})
+            raise
+        decision["attempts"].append({"service": backend.name, "error": result.get("error")} if "error" in result else {"service": backend.name})
+        return result
+
+    async def _attempt(self, backend, hedge, call, decision, tried):
+        """backend로 실행하고, hedge가 있으면 지연 후 중복 실행하여 먼저 성공한 (결과, 백엔드) 반환"""
+        tasks = {asyncio.ensure_future(self._call(backend, call, decision)): backend}
+        try:
+            if hedge is not None:
+                delay = self.hedge_delay(backend)
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and hedge.breaker.allow():
+                    decision["hedged_after_seconds"] = round(delay, 3)
+                    tried.add(hedge.name)
+                    tasks[asyncio.ensure_future(self._call(hedge, call, decision))] = hedge
+
+            outcome = None
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    owner = tasks.pop(task)
+                    try:
+                        result = task.result()
+                    except AdmissionRejected as e:
+                        outcome = outcome or e
+                        continue
+                    if "error" not in result:
+                        return result, owner
+                    outcome = (result, owner)
+            if isinstance(outcome, AdmissionRejected):
+                raise outcome
+            return outcome
+        finally:
+            # 늦은 쪽은 취소 (같은 요청을 기다리는 다른 요청이 없으면 백엔드 실행도 중단됨)
+            for task, owner in tasks.items():
+                task.cancel()
+                decision["attempts"].append({"service": owner.name, "cancelled": True})
+
+    def snapshot(self):
+        return {
+            "hedge": ROUTING_HEDGE,
+            "timeout_seconds": ROUTING_TIMEOUT,
+            "backends": {name: backend.snapshot() for name, backend in self.backends.items()},
+        }
+
+# 프로세스 전역 인스턴스
+router = BackendRouter()
@@ -0,0 +1,133 @@
+"""
+에이전트 런타임 레지스트리 모듈
+
+그래프 컴파일, 프롬프트 파싱, LLM 클라이언트 생성을 (모델, 설정) 키마다 한 번만 수행하고
+프로세스 전체에서 재사용합니다.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+from agent.conf.config import DEFAULT_MODEL, GOOGLE_MODEL, OLLAMA_BASE_URL
+
+if TYPE_CHECKING:
+    from langchain_core.runnables import RunnableConfig
+
+@dataclass(frozen=True)
+class RuntimeKey:
+    """런타임을 구분하는 키 (모델 + 설정)"""
+    model_name: str = DEFAULT_MODEL
+    base_url: str = OLLAMA_BASE_URL
+    provider: str = "ollama"  # 노드에서 사용할 LLM - 'ollama' 또는 'google'
+
+class AgentRuntime:
+    """컴파일된 그래프, 파싱된 프롬프트, LLM 클라이언트를 묶은 실행 단위"""
+
+    def __init__(self, key: RuntimeKey):
+        # 노드 모듈이 이 모듈을 참조하므로 순환 import를 피하기 위해 여기서 import
+        # (LangGraph/LangChain은 불러오는 데 오래 걸리므로 첫 런타임을 만들 때까지 미룸)
+        from agent.agent_graph import build_agent_graph
+        from agent.llm import get_google_llm, get_ollama_llm
+        from agent.prompts import build_prompts
+
+        self.key = key
+        self.model_name = key.model_name
+        if key.provider == "google":
+            self.llm = get_google_llm(key.model_name)
+        else:
+            self.llm = get_ollama_llm(key.model_name, key.base_url)
+        self.prompts = build_prompts()
+        self.graph = build_agent_graph()
+        self._node_llms = {}
+
+    def node_llm(self, node):
+        """노드 출력 예산(생성 최대 토큰 수)을 적용한 LLM 반환 (예산이 없으면 기본 LLM)"""
+        from agent.budget import output_budget
+        limit = output_budget(node)
+        if limit is None:
+            return self.llm
+
+        llm = self._node_llms.get(node)
+        if llm is None:
+            field = "max_output_tokens" if self.key.provider == "google" else "num_predict"
+            llm = self._node_llms[node] = self.llm.model_copy(update={field: limit})
+        return llm
+
+    def structured_llm(self, node, schema):
+        """
+        응답을 JSON 스키마(dict)에 맞추도록 제한한 노드 LLM 반환
+
+        Ollama는 format에 스키마를 넘겨 생성 단계에서 형식을 강제하고,
+        Google은 JSON 응답 모드(response_mime_type)를 사용합니다.
+        """
+        return self.node_llm(node).bind(format=schema)
+
+    def run_config(self) -> "RunnableConfig":
+        """노드에서 런타임을 참조할 수 있도록 그래프 실행 설정 생성"""
+        return {"configurable": {"runtime": self}}
+
+    async def ainvoke(self, state):
+        return await self.graph.ainvoke(state, config=self.run_config())
+
+    def astream(self, state, **kwargs):
+        return self.graph.astream(state, config=self.run_config(), **kwargs)
+
+# 프로세스 전역 런타임 레지스트리
+_runtimes = {}
+_registry_lock = threading.Lock()
+
+def get_runtime(model_name: str = DEFAULT_MODEL, base_url: str = OLLAMA_BASE_URL, provider: str = "ollama") -> AgentRuntime:
+    """(모델, 설정, LLM 제공자) 키에 해당하는 런타임을 반환. 없으면 한 번만 생성"""
+    key = RuntimeKey(model_name or (GOOGLE_MODEL if provider == "google" else DEFAULT_MODEL), base_url, provider)
+    runtime = _runtimes.get(key)
+    if runtime is not None:
+        return runtime
+
+    with _registry_lock:
+        if key not in _runtimes:
+            _runtimes[key] = AgentRuntime(key)
+            print(f"에이전트 런타임 생성: {key.model_name} ({key.base_url if key.provider == 'ollama' else key.provider})")
+        return _runtimes[key]
+
+def rebuild_runtimes(model_name: Optional[str] = None, provider: Optional[str] = None):
+    """
+    등록된 런타임(그래프, 파싱된 프롬프트, LLM 클라이언트)을 새로 만들어 교체
+
+    새 런타임을 모두 만든 뒤 한 번에 교체하므로, 실행 중인 요청은 기존 런타임으로 끝까지 진행됩니다.
+    설정 값(agent.conf.config, .env), 프롬프트 템플릿, 토큰 예산은 프로세스 시작 때 읽은 값을 그대로 사용하므로
+    이를 바꾼 경우에는 프로세스를 다시 시작해야 합니다.
+
+    Args:
+        model_name (str, optional): 특정 모델만 교체. 없으면 등록된 전체 런타임 교체
+        provider (str, optional): 'ollama' 또는 'google'. 없으면 모든 제공자
+                                  (등록되지 않은 모델은 GOOGLE_MODEL이면 'google', 아니면 'ollama'로 생성)
+
+    Returns:
+        list: 교체된 런타임의 {"model", "provider"} 목록
+    """
+    with _registry_lock:
+        keys = [
+            key for key in _runtimes
+            if (model_name is None or key.model_name == model_name) and (provider is None or key.provider == provider)
+        ]
+        if model_name is not None and not keys:
+            keys = [RuntimeKey(model_name, provider=provider or ("google" if model_name == GOOGLE_MODEL else "ollama"))]
+
+        from agent.llm import clear_llm_cache
+        clear_llm_cache(model_name)
+        fresh = {key: AgentRuntime(key) for key in keys}
+        _runtimes.update(fresh)
+
+    rebuilt = [{"model": key.model_name, "provider": key.provider} for key in keys]
+    print(f"에이전트 런타임 교체: {rebuilt}")
+    return rebuilt
+
+def loaded_runtimes():
+    """현재 등록된 런타임 키 목록 반환"""
+    return [{"model": key.model_name, "base_url": key.base_url, "provider": key.provider} for key in list(_runtimes)]
+
+def node_runtime(config: Optional["RunnableConfig"]) -> AgentRuntime:
+    """노드 실행 설정에서 런타임을 꺼냄. 없으면 기본 런타임 사용"""
+    runtime = ((config or {}).get("configurable") or {}).get("runtime")
+    return runtime if runtime is not None else get_runtime()
@@ -0,0 +1,151 @@
+"""
+동일한 요청의 동시 실행을 하나로 합치는 single-flight 모듈
+
+같은 키로 동시에 들어온 요청은 먼저 시작된 실행 하나의 결과를 함께 받습니다.
+기다리는 요청이 모두 취소되면(클라이언트 연결 종료) 실행도 취소합니다.
+프로세스 안에서는 asyncio 태스크를 공유하고, SINGLE_FLIGHT_DISTRIBUTED가 켜져 있으면
+Redis 락과 pub/sub으로 다른 프로세스의 실행 결과도 기다립니다.
+"""
+
+import json
+import time
+import uuid
+import asyncio
+from agent.cancellation import detach_cancel_token
+from agent.conf.config import (
+    SINGLE_FLIGHT_ENABLED, SINGLE_FLIGHT_DISTRIBUTED,
+    SINGLE_FLIGHT_LOCK_TTL, SINGLE_FLIGHT_WAIT_TIMEOUT,
+    get_async_redis_client
+)
+
+KEY_PREFIX = "singleflight"
+RESULT_TTL = 30  # 늦게 구독한 프로세스가 결과를 읽을 수 있도록 잠시 보관 (초)
+
+# 락 소유자일 때만 삭제
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+class SingleFlight:
+    """키별로 진행 중인 실행을 공유하는 요청 합치기"""
+
+    def __init__(self):
+        self._inflight = {}
+        self._waiters = {}  # 실행 태스크별 기다리는 요청 수
+        self.stats = {"executions": 0, "coalesced": 0, "remote_coalesced": 0, "cancelled": 0}
+
+    async def do(self, key, fn):
+        """
+        같은 키로 진행 중인 실행이 있으면 그 결과를, 없으면 fn()을 실행한 결과를 반환
+
+        Args:
+            key (str): 요청 식별 키
+            fn: 인자 없는 코루틴 함수
+
+        Returns:
+            tuple: (결과, 다른 요청의 실행 결과를 공유했는지 여부)
+        """
+        if not SINGLE_FLIGHT_ENABLED:
+            return await fn(), False
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            result, _ = await self._wait(task)
+            return result, True
+
+        # 별도 태스크로 실행하여 먼저 온 요청이 취소되어도 기다리는 요청은 결과를 받도록 함
+        task = asyncio.ensure_future(self._execute(key, fn))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await self._wait(task)
+
+    async def _wait(self, task):
+        """실행 태스크의 결과를 기다림 (마지막으로 기다리던 요청이 취소되면 실행도 취소)"""
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1 and not task.done():
+                self.stats["cancelled"] += 1
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    async def _execute(self, key, fn):
+        # 실행은 요청들이 공유하므로 먼저 온 요청의 취소 상태를 따르지 않음
+        detach_cancel_token()
+        redis_client = await get_async_redis_client() if SINGLE_FLIGHT_DISTRIBUTED else None
+        if redis_client is None:
+            self.stats["executions"] += 1
+            return await fn(), False
+
+        lock_key = f"{KEY_PREFIX}:lock:{key}"
+        token = str(uuid.uuid4())
+        if not await redis_client.set(lock_key, token, nx=True, ex=SINGLE_FLIGHT_LOCK_TTL):
+            result = await self._wait_remote(redis_client, key, lock_key)
+            if result is not None:
+                self.stats["remote_coalesced"] += 1
+                return result, True
+            # 다른 프로세스의 실행이 실패했거나 너무 오래 걸리면 직접 실행
+
+        self.stats["executions"] += 1
+        try:
+            result = await fn()
+        except BaseException:
+            await self._release(redis_client, lock_key, token)
+            raise
+
+        # 실행은 성공했으므로 결과 공유나 락 해제가 실패해도 기다리는 요청에는 결과를 돌려줌
+        # (다른 프로세스는 락이 만료되면 직접 실행)
+        try:
+            payload = json.dumps(result, ensure_ascii=False)
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.set(f"{KEY_PREFIX}:result:{key}", payload, ex=RESULT_TTL)
+                pipe.publish(f"{KEY_PREFIX}:done:{key}", payload)
+                await pipe.execute()
+        except Exception as e:
+            print(f"single-flight 결과 공유 실패 ({key}): {str(e)}")
+        await self._release(redis_client, lock_key, token)
+        return result, False
+
+    async def _release(self, redis_client, lock_key, token):
+        """락 해제 (실패해도 SINGLE_FLIGHT_LOCK_TTL 후 만료되므로 기록만 함)"""
+        try:
+            await redis_client.eval(RELEASE_SCRIPT, 1, lock_key, token)
+        except Exception as e:
+            print(f"single-flight 락 해제 실패 ({lock_key}): {str(e)}")
+
+    async def _wait_remote(self, redis_client, key, lock_key):
+        """다른 프로세스의 실행 결과를 기다림. 실행이 사라지거나 시간이 초과되면 None"""
+        pubsub = redis_client.pubsub()
+        await pubsub.subscribe(f"{KEY_PREFIX}:done:{key}")
+        try:
+            deadline = time.monotonic() + SINGLE_FLIGHT_WAIT_TIMEOUT
+            while time.monotonic() < deadline:
+                # 구독 전에 끝났을 수 있으므로 보관된 결과 확인
+                payload = await redis_client.get(f"{KEY_PREFIX}:result:{key}")
+                if payload is not None:
+                    return json.loads(payload)
+                if not await redis_client.exists(lock_key):
+                    return None
+
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None:
+                    return json.loads(message["data"])
+            return None
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+
+    def snapshot(self):
+        return {**self.stats, "inflight": len(self._inflight), "distributed": SINGLE_FLIGHT_DISTRIBUTED}
+
+# 프로세스 전역 인스턴스
+single_flight = SingleFlight()
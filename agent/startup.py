@@ -0,0 +1,69 @@
+"""
+서버 시작 준비(warm-up) 상태 관리 모듈
+
+Redis 연결, 그래프 컴파일, SDK import 같은 준비 작업을 단계별로 실행하고
+각 단계의 완료 여부와 걸린 시간을 기록하여 준비 상태 확인(readiness) 엔드포인트에서 보여줍니다.
+"""
+
+import time
+import asyncio
+
+class Readiness:
+    """준비 작업 단계별 결과와 전체 완료 시점"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.ready_at = None
+        self.steps = {}
+
+    @property
+    def ready(self):
+        return self.ready_at is not None
+
+    async def run_step(self, name, fn, required=True):
+        """
+        준비 단계 하나를 실행하고 결과 기록
+
+        Args:
+            name (str): 단계 이름
+            fn: 인자 없는 코루틴 함수. False/None을 반환하면 실패로 기록
+            required (bool): False면 실패해도 준비 완료를 막지 않음
+        """
+        started = time.perf_counter()
+        try:
+            ok = await fn() not in (False, None)
+            error = None
+        except Exception as e:
+            ok, error = False, str(e)
+
+        self.steps[name] = {"ok": ok, "required": required, "seconds": round(time.perf_counter() - started, 3)}
+        if error:
+            self.steps[name]["error"] = error
+        print(f"준비 단계 {name}: {'완료' if ok else '실패'} ({self.steps[name]['seconds']}초)")
+        return ok
+
+    async def warm_up(self, steps):
+        """
+        준비 단계들을 동시에 실행하고, 필수 단계가 모두 성공하면 준비 완료로 표시
+
+        필수가 아닌 단계(예: 재시도 중인 Redis 연결)는 준비 완료를 기다리게 하지 않고 계속 실행됩니다.
+
+        Args:
+            steps (list): (이름, 코루틴 함수, 필수 여부) 목록
+        """
+        optional = [asyncio.create_task(self.run_step(name, fn, False)) for name, fn, required in steps if not required]
+        results = await asyncio.gather(*[self.run_step(name, fn) for name, fn, required in steps if required])
+        if all(results):
+            self.ready_at = time.perf_counter()
+            print(f"서버 준비 완료 ({self.ready_at - self.started:.2f}초)")
+        await asyncio.gather(*optional)
+
+    def snapshot(self):
+        return {
+            "ready": self.ready,
+            "seconds": round((self.ready_at or time.perf_counter()) - self.started, 3),
+            "steps": self.steps,
+        }
+
+# 프로세스 전역 준비 상태
+readiness = Readiness()
@@ -1,9 +1,11 @@
-from typing import Dict, List, Optional, TypedDict
+import operator
+from typing import Annotated, Dict, List, Optional, TypedDict
 
 class AgentState(TypedDict):
     """에이전트 상태 정의"""
     question: str
-    thoughts: List[str]
+    # 병렬 노드에서 동시에 추가할 수 있도록 리듀서로 병합
+    thoughts: Annotated[List[str], operator.add]
     research_results: str
     answer: str
     is_game_resource_request: bool
@@ -0,0 +1,151 @@
+"""
+작업 출력(전체 답변과 단계별 중간 결과) 압축 저장 모듈
+
+task:{task_id} 해시에는 답변 앞부분(PREVIEW_CHARS)만 남기고, 전체 답변(response)과 중간 결과(thoughts,
+research_results, work_results)는 zstd로 압축해 task:{task_id}:blobs 해시에 바이너리 값으로 저장합니다.
+짧은 한국어 출력은 공유 사전이 있어야 잘 압축되므로, scripts/task_blobs.py로 기록된 출력에서
+사전을 학습해 TASK_BLOB_DICT_DIR에 두면 가장 최근 사전으로 압축합니다.
+각 값은 zstd 프레임에 사전 ID가 들어 있어, 이전 사전으로 압축한 값도 그 사전 파일이 남아 있으면 읽을 수 있습니다.
+
+압축은 write-behind 작성기(task_log)나 작업 큐 워커(jobs.complete_job)에서 하고, 압축 해제는 API로 조회할 때만 합니다.
+"""
+
+import os
+import zstandard
+from redis.client import NEVER_DECODE
+from agent.conf.config import TASK_BLOB_LEVEL, TASK_BLOB_DICT_DIR, TASK_HISTORY_TTL
+from agent.metrics import TASK_BLOB_BYTES
+from agent.task_history import blob_key
+
+BLOB_FIELDS = ("response", "thoughts", "research_results", "work_results")
+
+# 작업 기록(task:{task_id})에 남기는 답변 앞부분 길이 (전체는 압축 출력에서 조회)
+PREVIEW_CHARS = 1000
+
+# 값 앞 1바이트: 저장 형식
+ZSTD = b"z"
+RAW = b"r"  # 압축해도 줄지 않는 짧은 값
+
+class BlobCodec:
+    """사전 기반 zstd 압축기 (사전은 처음 사용할 때 TASK_BLOB_DICT_DIR에서 불러옴)"""
+
+    def __init__(self, dict_dir=TASK_BLOB_DICT_DIR, level=TASK_BLOB_LEVEL):
+        self.dict_dir = dict_dir
+        self.level = level
+        self._dicts = None  # 사전 ID -> ZstdCompressionDict
+        self._compressor = None
+        self._decompressors = {}
+        self.dict_id = 0
+        self.stats = {"values": 0, "raw_bytes": 0, "stored_bytes": 0, "decompressed": 0, "errors": 0}
+
+    def load(self):
+        """사전 디렉터리를 다시 읽어 가장 최근 사전으로 압축하도록 설정"""
+        self._dicts, newest = {}, None
+        if self.dict_dir and os.path.isdir(self.dict_dir):
+            paths = [os.path.join(self.dict_dir, name) for name in os.listdir(self.dict_dir) if name.endswith(".dict")]
+            for path in sorted(paths, key=os.path.getmtime):
+                with open(path, "rb") as f:
+                    newest = zstandard.ZstdCompressionDict(f.read())
+                self._dicts[newest.dict_id()] = newest
+        self.dict_id = newest.dict_id() if newest else 0
+        self._compressor = zstandard.ZstdCompressor(level=self.level, dict_data=newest)
+        self._decompressors = {}
+        if newest:
+            print(f"작업 출력 압축 사전 사용: {self.dict_id} (사전 {len(self._dicts)}개)")
+
+    def compress(self, text):
+        if self._dicts is None:
+            self.load()
+        raw = text.encode("utf-8")
+        packed = self._compressor.compress(raw)
+        stored = ZSTD + packed if len(packed) < len(raw) else RAW + raw
+        self.stats["values"] += 1
+        self.stats["raw_bytes"] += len(raw)
+        self.stats["stored_bytes"] += len(stored)
+        return stored
+
+    def decompress(self, data):
+        """
+        저장된 값을 문자열로 복원
+
+        Raises:
+            ValueError: 알 수 없는 형식이거나 압축에 사용한 사전이 없는 경우
+        """
+        if self._dicts is None:
+            self.load()
+        self.stats["decompressed"] += 1
+        marker, payload = data[:1], data[1:]
+        if marker == RAW:
+            return payload.decode("utf-8")
+        if marker != ZSTD:
+            raise ValueError(f"알 수 없는 저장 형식입니다: {marker!r}")
+
+        dict_id = zstandard.get_frame_parameters(payload).dict_id
+        if dict_id and dict_id not in self._dicts:
+            raise ValueError(f"압축 사전 {dict_id}를 찾을 수 없습니다. ({self.dict_dir})")
+        if dict_id not in self._decompressors:
+            self._decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=self._dicts.get(dict_id))
+        return self._decompressors[dict_id].decompress(payload).decode("utf-8")
+
+    def snapshot(self):
+        """누적 압축 통계 (압축률은 저장 크기 / 원본 크기)"""
+        raw, stored = self.stats["raw_bytes"], self.stats["stored_bytes"]
+        return {
+            **self.stats,
+            "ratio": round(stored / raw, 3) if raw else None,
+            "dict_id": self.dict_id if self._dicts is not None else None,
+        }
+
+# 프로세스 전역 압축기
+codec = BlobCodec()
+
+def write_blobs(pipe, task_id, outputs):
+    """
+    출력을 압축해 파이프라인에 추가 (작업 기록과 같은 TTL 적용)
+
+    Args:
+        pipe: Redis 파이프라인
+        task_id (str): 작업 ID
+        outputs (dict): 필드 이름 -> 문자열 (빈 값은 제외)
+    """
+    mapping = {}
+    for name, text in outputs.items():
+        if not text:
+            continue
+        mapping[name] = codec.compress(text)
+        TASK_BLOB_BYTES.inc(len(text.encode("utf-8")), field=name, kind="raw")
+        TASK_BLOB_BYTES.inc(len(mapping[name]), field=name, kind="stored")
+    if not mapping:
+        return
+    pipe.hset(blob_key(task_id), mapping=mapping)
+    if TASK_HISTORY_TTL > 0:
+        pipe.expire(blob_key(task_id), TASK_HISTORY_TTL)
+
+async def stored_sizes(redis_client, task_id):
+    """필드별 저장(압축 후) 크기. 압축을 풀지 않음"""
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for name in BLOB_FIELDS:
+            pipe.hstrlen(blob_key(task_id), name)
+        sizes = await pipe.execute()
+    return {name: size for name, size in zip(BLOB_FIELDS, sizes) if size}
+
+async def read_blobs(redis_client, task_id, fields=BLOB_FIELDS):
+    """
+    요청한 필드만 읽어 압축 해제 (없는 필드는 제외, 풀 수 없는 값은 None)
+
+    Returns:
+        dict: 필드 이름 -> 문자열
+    """
+    # 공유 클라이언트는 응답을 문자열로 디코딩하므로 바이너리 값은 디코딩하지 않고 받음
+    values = await redis_client.execute_command("HMGET", blob_key(task_id), *fields, **{NEVER_DECODE: True})
+    outputs = {}
+    for name, data in zip(fields, values):
+        if data is None:
+            continue
+        try:
+            outputs[name] = codec.decompress(data)
+        except (ValueError, zstandard.ZstdError) as e:
+            codec.stats["errors"] += 1
+            print(f"작업 출력 압축 해제 실패 ({task_id} {name}): {str(e)}")
+            outputs[name] = None
+    return outputs
@@ -0,0 +1,323 @@
+"""
+작업 기록(task:{task_id}) 색인과 조회 모듈
+
+작업 해시를 쓸 때마다 Lua 스크립트로 생성 시각 순 sorted set 색인을 함께 갱신합니다.
+스크립트가 쓰는 키는 모두 Python에서 만들어 KEYS로 넘깁니다.
+- tasks:index                     전체 작업 (점수: 생성 시각)
+- tasks:index:status:{상태}       상태별 (상태가 바뀌면 이전 색인에서 빼고 새 색인에 넣음)
+- tasks:index:model:{모델}        모델별
+- tasks:index:service:{서비스}    서비스별
+- tasks:duration                  끝난 작업의 처리 시간(초) 순
+덕분에 KEYS task:* 없이 기간, 상태, 모델, 서비스로 작업을 찾을 수 있습니다.
+작업 해시(와 압축 출력 해시 task:{task_id}:blobs)는 마지막으로 쓴 뒤 TASK_HISTORY_TTL초가 지나면 만료되고, 색인은 prune()이
+보존 기간(TASK_HISTORY_TTL)과 최대 개수(TASK_HISTORY_MAX_ENTRIES)를 넘은 항목을 지웁니다.
+"""
+
+import time
+import datetime
+from agent.conf.config import TASK_HISTORY_TTL, TASK_HISTORY_MAX_ENTRIES
+
+INDEX_KEY = "tasks:index"
+DURATION_KEY = "tasks:duration"
+INDEX_SET_KEY = "tasks:indexes"  # 만들어진 보조 색인 키 목록 (정리할 때 사용)
+INDEXED_FIELDS = ("status", "model", "service")
+FINISHED_STATUSES = ("completed", "failed", "rejected", "cancelled")
+
+# 목록 조회 응답에서 제외하는 큰 필드 (전체 기록은 GET /api/tasks/{task_id})
+LARGE_FIELDS = ("response", "result", "trace", "routing")
+
+# 키는 모두 KEYS로 받음 (Redis Cluster와 스크립트 키 검사에서 선언하지 않은 키를 쓰지 않도록)
+# KEYS[1]: 작업 해시, KEYS[2]: 압축 출력 해시, KEYS[3]: tasks:index, KEYS[4]: tasks:duration, KEYS[5]: tasks:indexes,
+# KEYS[6..8]: 이전 status/model/service 색인, KEYS[9..11]: 새 status/model/service 색인 (값이 없으면 tasks:index를 넣고 사용하지 않음)
+# ARGV: task_id, 현재 시각, TTL, 기록에 있다고 예상한 status/model/service ('' = 없음), 필드/값 쌍...
+# 기록의 값이 예상과 다르면 아무것도 쓰지 않고 {0, status, model, service}를 반환하므로 그 값으로 다시 호출
+UPDATE_SCRIPT = """
+local key, task_id = KEYS[1], ARGV[1]
+local now, ttl = tonumber(ARGV[2]), tonumber(ARGV[3])
+local old = redis.call('HMGET', key, 'status', 'model', 'service', 'created_ts')
+for i = 1, 3 do
+    if (old[i] or '') ~= ARGV[3 + i] then
+        return {0, old[1] or '', old[2] or '', old[3] or ''}
+    end
+end
+
+local fields = {}
+for i = 7, #ARGV, 2 do fields[ARGV[i]] = ARGV[i + 1] end
+redis.call('HSET', key, unpack(ARGV, 7))
+
+local created = tonumber(old[4])
+if not created then
+    created = now
+    redis.call('HSET', key, 'created_ts', ARGV[2])
+    redis.call('ZADD', KEYS[3], created, task_id)
+end
+
+local names = {'status', 'model', 'service'}
+for i, name in ipairs(names) do
+    local value = fields[name]
+    if value and value ~= (old[i] or '') then
+        -- 빈 값은 색인하지 않음
+        if old[i] and old[i] ~= '' then
+            redis.call('ZREM', KEYS[5 + i], task_id)
+        end
+        if value ~= '' then
+            redis.call('ZADD', KEYS[8 + i], created, task_id)
+            redis.call('SADD', KEYS[5], KEYS[8 + i])
+        end
+    end
+end
+
+local status = fields['status']
+if status == 'completed' or status == 'failed' or status == 'rejected' or status == 'cancelled' then
+    local duration = now - created
+    redis.call('HSET', key, 'duration', tostring(duration))
+    redis.call('ZADD', KEYS[4], duration, task_id)
+elseif status then
+    redis.call('ZREM', KEYS[4], task_id)
+end
+
+if ttl > 0 then
+    redis.call('EXPIRE', key, ttl)
+    redis.call('EXPIRE', KEYS[2], ttl)
+end
+return {1}
+"""
+
+# 다른 곳에서 같은 작업 기록을 계속 바꿔 예상 값이 맞지 않을 때 다시 시도하는 횟수
+UPDATE_RETRIES = 5
+
+def task_key(task_id):
+    return f"task:{task_id}"
+
+def blob_key(task_id):
+    """압축한 출력을 저장하는 해시 (task_blobs 참고)"""
+    return f"task:{task_id}:blobs"
+
+def index_key(name, value):
+    """보조 색인 키 (예: tasks:index:status:completed)"""
+    return f"{INDEX_KEY}:{name}:{value}"
+
+def _script_args(task_id, fields, old, now):
+    """UPDATE_SCRIPT의 KEYS와 ARGV (old: 기록에 있다고 예상한 status/model/service 값 목록)"""
+    keys = [task_key(task_id), blob_key(task_id), INDEX_KEY, DURATION_KEY, INDEX_SET_KEY]
+    keys += [index_key(name, value) if value else INDEX_KEY for name, value in zip(INDEXED_FIELDS, old)]
+    keys += [index_key(name, fields[name]) if str(fields.get(name, "")) else INDEX_KEY for name in INDEXED_FIELDS]
+    args = [task_id, now, TASK_HISTORY_TTL, *old]
+    for name, value in fields.items():
+        args += [name, value]
+    return keys, args
+
+def _expected(old, fields):
+    """갱신 후 기록에 있을 status/model/service 값"""
+    return [str(fields[name]) if name in fields else value for name, value in zip(INDEXED_FIELDS, old)]
+
+async def _update_one(redis_client, task_id, fields, now, old=None):
+    for _ in range(UPDATE_RETRIES):
+        if old is None:
+            old = [value or "" for value in await redis_client.hmget(task_key(task_id), *INDEXED_FIELDS)]
+        keys, args = _script_args(task_id, fields, old, now)
+        result = await redis_client.eval(UPDATE_SCRIPT, len(keys), *keys, *args)
+        if int(result[0]) == 1:
+            return
+        old = list(result[1:])
+    raise RuntimeError(f"작업 기록이 계속 바뀌어 갱신하지 못했습니다: {task_id}")
+
+async def update_tasks(redis_client, updates):
+    """
+    작업 기록 필드를 쓰고 색인 갱신 (같은 작업을 여러 번 갱신해도 순서대로 적용)
+
+    이전 색인 키도 KEYS로 넘겨야 하므로 먼저 현재 status/model/service를 한 번에 읽고, 앞선 갱신을 반영한
+    예상 값으로 스크립트를 파이프라인 한 번에 실행합니다. 그 사이 다른 곳에서 기록이 바뀌어 예상과 달랐던
+    작업은 그 갱신부터 순서대로 다시 실행합니다. (같은 갱신을 다시 적용해도 결과는 같음)
+
+    Args:
+        redis_client: Redis 클라이언트
+        updates (list): (task_id, fields, now) 목록. fields의 None 값은 제외, now가 None이면 현재 시각
+
+    Raises:
+        RuntimeError: UPDATE_RETRIES번 다시 시도해도 예상 값이 맞지 않는 경우
+    """
+    timestamp = time.time()
+    updates = [
+        (task_id, {name: value for name, value in fields.items() if value is not None}, now if now is not None else timestamp)
+        for task_id, fields, now in updates
+    ]
+    if not updates:
+        return
+
+    task_ids = list(dict.fromkeys(task_id for task_id, _, _ in updates))
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for task_id in task_ids:
+            pipe.hmget(task_key(task_id), *INDEXED_FIELDS)
+        current = {task_id: [value or "" for value in values] for task_id, values in zip(task_ids, await pipe.execute())}
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for task_id, fields, now in updates:
+            keys, args = _script_args(task_id, fields, current[task_id], now)
+            pipe.eval(UPDATE_SCRIPT, len(keys), *keys, *args)
+            current[task_id] = _expected(current[task_id], fields)
+        results = await pipe.execute()
+
+    retrying = set()
+    for (task_id, fields, now), result in zip(updates, results):
+        if task_id in retrying or int(result[0]) != 1:
+            retrying.add(task_id)
+            await _update_one(redis_client, task_id, fields, now, old=None if int(result[0]) == 1 else list(result[1:]))
+
+async def update_task(redis_client, task_id, fields, now=None):
+    """
+    작업 기록 하나의 필드를 쓰고 색인 갱신 (update_tasks 참고)
+
+    Args:
+        redis_client: Redis 클라이언트
+        task_id (str): 작업 ID
+        fields (dict): 쓸 필드 (None 값은 제외)
+        now (float, optional): 기록 시각 (epoch 초)
+    """
+    await update_tasks(redis_client, [(task_id, fields, now)])
+
+async def prune(redis_client):
+    """
+    보존 기간이 지났거나 최대 개수를 넘은 작업을 색인에서 지움 (넘친 작업은 해시도 삭제)
+
+    Returns:
+        int: 지운 작업 수
+    """
+    cutoff = time.time() - TASK_HISTORY_TTL if TASK_HISTORY_TTL > 0 else 0
+    expired = await redis_client.zrangebyscore(INDEX_KEY, "-inf", f"({cutoff}") if cutoff else []
+    overflow = []
+    if TASK_HISTORY_MAX_ENTRIES > 0:
+        excess = await redis_client.zcard(INDEX_KEY) - len(expired) - TASK_HISTORY_MAX_ENTRIES
+        if excess > 0:
+            overflow = await redis_client.zrange(INDEX_KEY, len(expired), len(expired) + excess - 1)
+
+    removed = expired + overflow
+    if not removed:
+        return 0
+
+    indexes = await redis_client.smembers(INDEX_SET_KEY)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for start in range(0, len(removed), 500):
+            chunk = removed[start:start + 500]
+            for key in (INDEX_KEY, DURATION_KEY, *indexes):
+                pipe.zrem(key, *chunk)
+        # 보존 기간이 지난 작업의 해시는 TTL로 이미 만료되므로, 개수 제한을 넘은 작업만 삭제
+        for start in range(0, len(overflow), 500):
+            chunk = overflow[start:start + 500]
+            pipe.delete(*[task_key(task_id) for task_id in chunk], *[blob_key(task_id) for task_id in chunk])
+        await pipe.execute()
+
+    # 비어 있는 보조 색인은 목록에서 제거
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for key in indexes:
+            pipe.zcard(key)
+        sizes = await pipe.execute()
+    empty = [key for key, size in zip(indexes, sizes) if not size]
+    if empty:
+        await redis_client.srem(INDEX_SET_KEY, *empty)
+    return len(removed)
+
+def parse_time(value):
+    """epoch 초 또는 ISO 8601 문자열을 epoch 초로 변환 (잘못된 값이면 ValueError)"""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
+
+def encode_cursor(score, skip):
+    """다음 페이지 위치: 마지막 점수와, 그 점수인 항목 중 이미 돌려준 개수"""
+    return f"{score!r}:{skip}"
+
+def decode_cursor(cursor):
+    """encode_cursor()로 만든 문자열을 (점수, 건너뛸 개수)로 변환 (잘못된 값이면 ValueError)"""
+    score, _, skip = cursor.partition(":")
+    skip = int(skip)
+    if skip < 0:
+        raise ValueError(f"잘못된 cursor입니다: {cursor}")
+    return float(score), skip
+
+async def query_tasks(redis_client, since=None, until=None, status=None, model=None, service=None,
+                      order="recent", limit=50, cursor=None, max_scan=1000):
+    """
+    색인으로 작업 목록 조회 (최신순 또는 처리 시간이 긴 순)
+
+    조건 중 하나(status > model > service 순)의 색인을 훑고 나머지 조건은 작업 기록으로 거릅니다.
+    한 번에 max_scan개까지만 훑으므로, 조건에 맞는 작업이 적으면 결과가 limit보다 적어도 next_cursor가 있을 수 있습니다.
+
+    Args:
+        since, until (float, optional): 생성 시각 범위 (epoch 초)
+        status, model, service (str, optional): 조건
+        order (str): 'recent'(생성 시각 내림차순) 또는 'slowest'(처리 시간 내림차순, 끝난 작업만)
+        limit (int): 최대 반환 개수
+        cursor (str, optional): 이전 응답의 next_cursor
+
+    Returns:
+        dict: {"tasks": [...], "next_cursor": str 또는 None}
+    """
+    filters = {"status": status, "model": model, "service": service}
+    if order == "slowest":
+        index = DURATION_KEY
+        low, high = "-inf", "+inf"
+    else:
+        field = next((name for name in INDEXED_FIELDS if filters[name]), None)
+        index = f"{INDEX_KEY}:{field}:{filters[field]}" if field else INDEX_KEY
+        # 생성 시각 색인은 기간 조건을 점수 범위로 바로 적용
+        low = since if since is not None else "-inf"
+        high = until if until is not None else "+inf"
+        if field:
+            filters[field] = None
+
+    # 한 배치의 작업처럼 점수가 같은 항목이 많을 수 있으므로, 마지막 점수에서 이미 본 개수만큼
+    # 건너뛰어(start) 다음 항목부터 읽음
+    last_score, skip = decode_cursor(cursor) if cursor else (None, 0)
+    if last_score is not None:
+        high = last_score
+
+    tasks, scanned, page_size = [], 0, max(limit * 2, 20)
+    next_cursor = None
+    while len(tasks) < limit and scanned < max_scan:
+        entries = await redis_client.zrevrangebyscore(index, high, low, start=skip, num=page_size, withscores=True)
+        if not entries:
+            next_cursor = None
+            break
+
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for task_id, _ in entries:
+                pipe.hgetall(task_key(task_id))
+            records = await pipe.execute()
+
+        for (task_id, score), record in zip(entries, records):
+            scanned += 1
+            if score == last_score:
+                skip += 1
+            else:
+                last_score, skip = score, 1
+            next_cursor = encode_cursor(score, skip)
+            if record and _matches(record, filters, since, until):
+                tasks.append(_summary(record))
+                if len(tasks) >= limit:
+                    break
+            if scanned >= max_scan:
+                break
+        high = last_score
+
+    return {"tasks": tasks, "next_cursor": next_cursor}
+
+def _matches(record, filters, since, until):
+    for name, value in filters.items():
+        if value and record.get(name) != value:
+            return False
+    created = float(record.get("created_ts", 0))
+    if since is not None and created < since:
+        return False
+    if until is not None and created > until:
+        return False
+    return True
+
+def _summary(record):
+    summary = {name: value for name, value in record.items() if name not in LARGE_FIELDS}
+    if "prompt" in summary and len(summary["prompt"]) > 200:
+        summary["prompt"] = summary["prompt"][:200] + "…"
+    if "duration" in summary:
+        summary["duration"] = round(float(summary["duration"]), 3)
+    return summary
@@ -0,0 +1,292 @@
+"""
+Redis 작업 기록을 백그라운드에서 모아 쓰는 write-behind 로거 모듈
+
+요청 경로에서는 쓰기 작업을 메모리 큐에 넣기만 하고, 백그라운드 태스크가
+큐를 배치 단위로 꺼내 트랜잭션 없는 파이프라인 한 번으로 Redis에 기록합니다.
+Redis가 느리거나 큐가 가득 차면 디스크 파일로 넘기고(spill), Redis가 다시 정상이 되면 재전송합니다.
+작업 자체가 잘못되어 실패한 경우에는 그 작업만 다시 넘기고, TASK_LOG_MAX_ATTEMPTS번 실패하면
+{spill_path}.bad로 옮겨 나머지 기록을 막지 않게 합니다.
+작업 기록(task:{task_id})은 task_history 스크립트로 써서 색인과 TTL을 함께 갱신하고,
+TASK_HISTORY_PRUNE_INTERVAL마다 오래된 색인 항목을 정리합니다.
+"""
+
+import os
+import json
+import time
+import asyncio
+from agent.conf.config import (
+    TASK_LOG_QUEUE_SIZE, TASK_LOG_BATCH_SIZE, TASK_LOG_FLUSH_INTERVAL,
+    TASK_LOG_WRITE_TIMEOUT, TASK_LOG_SPILL_PATH, TASK_LOG_MAX_ATTEMPTS, TASK_HISTORY_PRUNE_INTERVAL,
+    REDIS_UNAVAILABLE_ERRORS, get_async_redis_client
+)
+from agent.metrics import TASK_LOG_FLUSH_DURATION, TASK_LOG_FLUSH_ERRORS
+from agent import task_history, task_blobs
+
+class TaskLogWriter:
+    """큐에 쌓인 Redis 쓰기 작업을 배치로 기록하는 백그라운드 작성기"""
+
+    def __init__(self, queue_size=TASK_LOG_QUEUE_SIZE, batch_size=TASK_LOG_BATCH_SIZE,
+                 flush_interval=TASK_LOG_FLUSH_INTERVAL, write_timeout=TASK_LOG_WRITE_TIMEOUT,
+                 spill_path=TASK_LOG_SPILL_PATH, max_attempts=TASK_LOG_MAX_ATTEMPTS):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.write_timeout = write_timeout
+        self.spill_path = spill_path
+        self.max_attempts = max_attempts
+        self._queue = None
+        self._task = None
+        self._last_prune = 0.0
+        self.stats = {"queued": 0, "written": 0, "batches": 0, "spilled": 0, "dropped": 0, "replayed": 0, "pruned": 0,
+                      "failed": 0, "quarantined": 0}
+
+    def start(self):
+        """현재 이벤트 루프에서 백그라운드 기록 태스크 시작"""
+        if self._task is not None and not self._task.done():
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """남은 작업을 모두 기록한 뒤 백그라운드 태스크 종료"""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    def submit(self, op):
+        """
+        쓰기 작업을 큐에 추가 (대기하지 않음)
+
+        Args:
+            op (dict): {"type": "task", "task_id": ..., "fields": {...}, "ts": ...} (작업 기록, 색인 갱신),
+                       {"type": "tasks", "records": {task_id: fields}, "ts": ...} (일괄 요청처럼 한 번에 기록할 묶음),
+                       {"type": "blobs", "task_id": ..., "outputs": {...}} (전체 답변과 중간 결과, 기록할 때 압축) 또는
+                       {"type": "hset", "key": ..., "mapping": {...}} (색인 없는 일반 해시)
+                       ts는 요청 시각(epoch 초)이며 작업 생성/완료 시각으로 색인에 쓰입니다.
+        """
+        if self._task is None or self._task.done():
+            try:
+                self.start()
+            except RuntimeError:
+                # 실행 중인 이벤트 루프가 없으면 기록할 수 없음
+                self._spill([op])
+                return
+
+        try:
+            self._queue.put_nowait(op)
+            self.stats["queued"] += 1
+        except asyncio.QueueFull:
+            self._spill([op])
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            op = await self._queue.get()
+            if op is None:
+                break
+            batch = [op]
+
+            # 짧은 시간 동안 추가 작업을 모아 한 번에 기록
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                try:
+                    op = self._queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(self._queue.get(), timeout)
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+                if op is None:
+                    stopping = True
+                    break
+                batch.append(op)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        redis_client = await get_async_redis_client()
+        if redis_client is None:
+            self._spill(batch)
+            return
+
+        started = time.perf_counter()
+        try:
+            failed = await asyncio.wait_for(self._write(redis_client, batch), self.write_timeout)
+            self.stats["written"] += len(batch) - len(failed)
+            self.stats["batches"] += 1
+            TASK_LOG_FLUSH_DURATION.observe(time.perf_counter() - started)
+        except Exception as e:
+            TASK_LOG_FLUSH_ERRORS.inc()
+            print(f"Redis 작업 기록 실패 ({len(batch)}건): {str(e)}")
+            self._spill(batch)
+            return
+
+        await self._replay_spill(redis_client)
+        # 실패한 작업은 바로 다시 보내지 않고 다음 재전송 때 기록
+        self._retry_later(failed)
+        await self._prune(redis_client)
+
+    async def _write(self, redis_client, batch):
+        """
+        배치를 기록하고 기록하지 못한 작업 목록 반환
+
+        트랜잭션 없이 보내 명령별 결과를 확인하므로 잘못된 작업 하나가 배치 전체를 실패시키지 않습니다.
+        연결 오류나 타임아웃처럼 Redis 쪽 문제는 예외로 올려 배치 전체를 디스크에 넘깁니다.
+        """
+        failed, updates, owners = [], [], []
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for op in batch:
+                try:
+                    if op["type"] == "task":
+                        updates.append((op, [(op["task_id"], op["fields"], op.get("ts"))]))
+                    elif op["type"] == "tasks":
+                        updates.append((op, [(task_id, fields, op.get("ts")) for task_id, fields in op["records"].items()]))
+                    elif op["type"] == "blobs":
+                        queued = len(pipe)
+                        task_blobs.write_blobs(pipe, op["task_id"], op["outputs"])
+                        owners += [op] * (len(pipe) - queued)
+                    elif op["type"] == "hset":
+                        _check_mapping(op["mapping"])
+                        pipe.hset(op["key"], mapping=op["mapping"])
+                        owners.append(op)
+                    else:
+                        raise ValueError(f"알 수 없는 작업 종류입니다: {op['type']}")
+                except Exception as e:
+                    print(f"잘못된 작업 기록: {str(e)}")
+                    failed.append(op)
+
+            # 작업 기록은 이전 색인 값을 먼저 읽어야 하므로 따로 기록
+            try:
+                await task_history.update_tasks(redis_client, [update for _, op_updates in updates for update in op_updates])
+            except REDIS_UNAVAILABLE_ERRORS:
+                raise
+            except Exception:
+                # 어느 작업 때문인지 알 수 없으므로 작업별로 다시 기록 (같은 갱신을 다시 적용해도 결과는 같음)
+                for op, op_updates in updates:
+                    try:
+                        await task_history.update_tasks(redis_client, op_updates)
+                    except REDIS_UNAVAILABLE_ERRORS:
+                        raise
+                    except Exception as e:
+                        print(f"작업 기록 실패 ({op_updates[0][0]}): {str(e)}")
+                        failed.append(op)
+
+            results = await pipe.execute(raise_on_error=False) if owners else []
+        for op, result in zip(owners, results):
+            if isinstance(result, Exception) and not any(op is other for other in failed):
+                print(f"작업 기록 실패 ({op.get('task_id') or op.get('key')}): {str(result)}")
+                failed.append(op)
+        return failed
+
+    async def _prune(self, redis_client):
+        """TASK_HISTORY_PRUNE_INTERVAL마다 보존 기간/개수를 넘은 작업 색인 정리"""
+        now = time.monotonic()
+        if TASK_HISTORY_PRUNE_INTERVAL <= 0 or now - self._last_prune < TASK_HISTORY_PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        try:
+            self.stats["pruned"] += await task_history.prune(redis_client)
+        except Exception as e:
+            print(f"작업 기록 색인 정리 실패: {str(e)}")
+
+    def _spill(self, ops, path=None):
+        """기록하지 못한 작업을 디스크에 저장. 경로가 없으면 버림"""
+        if not self.spill_path:
+            self.stats["dropped"] += len(ops)
+            return False
+        try:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            with open(path or self.spill_path, "a", encoding="utf-8") as f:
+                for op in ops:
+                    f.write((op if isinstance(op, str) else json.dumps(op, ensure_ascii=False)) + "\n")
+            if path is None:
+                self.stats["spilled"] += len(ops)
+            return True
+        except OSError as e:
+            print(f"작업 기록 디스크 저장 실패: {str(e)}")
+            self.stats["dropped"] += len(ops)
+            return False
+
+    def _retry_later(self, ops):
+        """작업 자체의 오류로 실패한 작업을 다시 넘기고, max_attempts번 실패한 작업은 .bad 파일로 옮김"""
+        retry, bad = [], []
+        for op in ops:
+            if not isinstance(op, dict):
+                bad.append(op)
+                continue
+            op["attempts"] = op.get("attempts", 0) + 1
+            (bad if op["attempts"] >= self.max_attempts else retry).append(op)
+        self.stats["failed"] += len(ops)
+        if retry:
+            self._spill(retry)
+        if bad:
+            self._quarantine(bad)
+
+    def _quarantine(self, ops):
+        """다시 기록해도 실패할 작업(또는 읽을 수 없는 줄)을 {spill_path}.bad로 옮김"""
+        print(f"기록할 수 없는 작업 {len(ops)}건을 따로 보관합니다.")
+        if self._spill(ops, f"{self.spill_path}.bad"):
+            self.stats["quarantined"] += len(ops)
+
+    async def _replay_spill(self, redis_client):
+        """Redis가 정상일 때 디스크에 저장된 작업을 다시 기록"""
+        if not self.spill_path:
+            return
+
+        replay_path = f"{self.spill_path}.replay"
+        ops, done = [], 0
+        try:
+            # 이전 재전송이 실패해 남은 파일이 있으면 그것부터 처리
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.spill_path):
+                    return
+                os.replace(self.spill_path, replay_path)
+
+            bad = []
+            with open(replay_path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        ops.append(json.loads(line))
+                    except ValueError:
+                        bad.append(line.rstrip("\n"))
+            if bad:
+                self._quarantine(bad)
+                # 재전송이 중간에 실패해 다시 읽을 때 같은 줄을 또 옮기지 않도록 재전송 파일에서 뺌
+                self._rewrite(replay_path, ops)
+
+            for done in range(0, len(ops), self.batch_size):
+                failed = await asyncio.wait_for(self._write(redis_client, ops[done:done + self.batch_size]), self.write_timeout)
+                # 실패한 작업은 spill 파일로 넘어가므로 재전송 파일에는 남기지 않음
+                self._retry_later(failed)
+            done = len(ops)
+            os.remove(replay_path)
+            self.stats["replayed"] += len(ops)
+        except Exception as e:
+            print(f"디스크 작업 기록 재전송 실패: {str(e)}")
+            if 0 < done < len(ops):
+                self._rewrite(replay_path, ops[done:])
+
+    def _rewrite(self, path, ops):
+        """재전송하다 멈춘 경우 이미 기록한 작업을 빼고 남은 작업만 다시 저장"""
+        try:
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                for op in ops:
+                    f.write(json.dumps(op, ensure_ascii=False) + "\n")
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            print(f"작업 기록 재전송 파일 갱신 실패: {str(e)}")
+
+    def snapshot(self):
+        """큐 길이와 누적 통계 반환"""
+        return {**self.stats, "pending": self._queue.qsize() if self._queue else 0}
+
+def _check_mapping(mapping):
+    """Redis에 쓸 수 없는 값(None, dict 등)이 있으면 ValueError (파이프라인 전체가 실패하지 않도록 미리 확인)"""
+    invalid = [name for name, value in mapping.items() if isinstance(value, bool) or not isinstance(value, (str, bytes, int, float))]
+    if invalid:
+        raise ValueError(f"기록할 수 없는 값입니다: {', '.join(invalid)}")
+
+# 프로세스 전역 작성기
+task_log_writer = TaskLogWriter()
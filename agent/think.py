@@ -1,22 +1,17 @@
+from langchain_core.runnables import RunnableConfig
 from agent.state import AgentState
-from agent.llm import create_ollama_llm
-from langchain_core.prompts import PromptTemplate
+from agent.runtime import node_runtime
+from agent.node_cache import memoize_node
+from agent.budget import build_prompt
 
-def think(state: AgentState) -> AgentState:
+# 사고 결과는 질문에만 의존
+@memoize_node(inputs=("question",), prompts=("think",))
+async def think(state: AgentState, config: RunnableConfig) -> AgentState:
     """사고 단계: 질문을 분석하고 접근 방법 결정"""
-    llm = create_ollama_llm()
-    prompt = PromptTemplate.from_template(
-        """질문을 분석하고 게임 리소스 제작에 대한 사고 과정을 설명하세요:
-        
-        질문: {question}
-        
-        사고 과정:"""
-    )
+    runtime = node_runtime(config)
+    prompt = runtime.prompts["think"]
     
-    thoughts = llm.invoke(prompt.format(question=state["question"]))
+    thoughts = await runtime.node_llm("think").ainvoke(build_prompt("think", prompt, {"question": state["question"]}))
     
-    return {
-        **state,
-        "thoughts": state.get("thoughts", []) + [thoughts],
-        "next": "research_step"
-    }
\ No newline at end of file
+    # thoughts는 리듀서로 누적되므로 새 항목만 반환
+    return {"thoughts": [thoughts]}
@@ -0,0 +1,153 @@
+"""
+요청 단위 추적(trace) 모듈
+
+trace를 요청한 경우에만 span 트리를 만듭니다. 여기에는 대기열 대기, 캐시 조회, 작업 기록,
+그래프 노드, LLM 호출이 들어갑니다. 현재 span은 contextvar로 전달되므로 병렬로 실행되는 노드도
+각자의 부모 아래에 기록되고, trace가 없는 요청에서는 span()이 아무 일도 하지 않습니다.
+프로파일을 요청하거나 TRACE_PROFILE_SAMPLE_RATE에 따라 선택된 요청은 cProfile 결과를 파일로 저장합니다.
+"""
+
+import os
+import json
+import time
+import random
+import cProfile
+import threading
+import contextvars
+from contextlib import contextmanager
+from agent.conf.config import TRACE_PROFILE_DIR, TRACE_PROFILE_SAMPLE_RATE
+
+current_span = contextvars.ContextVar("current_span", default=None)
+
+# cProfile은 프로세스에서 하나만 활성화할 수 있음
+_profile_lock = threading.Lock()
+
+class Span:
+    """실행 구간 하나 (시작/종료 시각, 속성, 하위 구간)"""
+
+    __slots__ = ("name", "attrs", "started", "ended", "children")
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.started = time.perf_counter()
+        self.ended = None
+        self.children = []
+
+    def child(self, name, **attrs):
+        span = Span(name, **attrs)
+        self.children.append(span)
+        return span
+
+    def finish(self, **attrs):
+        self.attrs.update(attrs)
+        self.ended = time.perf_counter()
+
+    def to_dict(self, origin=None):
+        """시작 시각을 trace 시작 기준 밀리초로 변환한 트리 반환"""
+        origin = self.started if origin is None else origin
+        ended = self.ended if self.ended is not None else time.perf_counter()
+        data = {
+            "name": self.name,
+            "start_ms": round((self.started - origin) * 1000, 3),
+            "duration_ms": round((ended - self.started) * 1000, 3),
+        }
+        if self.attrs:
+            data["attrs"] = self.attrs
+        if self.children:
+            data["children"] = [child.to_dict(origin) for child in self.children]
+        return data
+
+@contextmanager
+def span(name, **attrs):
+    """현재 span 아래에 하위 span 생성 (trace 중이 아니면 None)"""
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = parent.child(name, **attrs)
+    token = current_span.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.attrs["error"] = str(e)
+        raise
+    finally:
+        child.finish()
+        current_span.reset(token)
+
+@contextmanager
+def profile_capture(name):
+    """
+    cProfile로 구간을 프로파일링하여 TRACE_PROFILE_DIR/<name>.prof에 저장
+
+    이벤트 루프 스레드 전체를 측정하므로 동시에 실행 중인 다른 요청도 함께 기록됩니다.
+    이미 다른 요청을 프로파일링 중이면 건너뜁니다 (None 반환).
+    """
+    if not _profile_lock.acquire(blocking=False):
+        yield None
+        return
+
+    path = os.path.join(TRACE_PROFILE_DIR, f"{name}.prof")
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield path
+    finally:
+        profiler.disable()
+        _profile_lock.release()
+        try:
+            os.makedirs(TRACE_PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(path)
+        except OSError as e:
+            print(f"프로파일 저장 실패: {str(e)}")
+
+class RequestTrace:
+    """요청 하나의 trace (루트 span과 프로파일 파일 경로)"""
+
+    def __init__(self, name, **attrs):
+        self.root = Span(name, **attrs)
+        self.profile_path = None
+
+    def to_dict(self):
+        data = self.root.to_dict()
+        if self.profile_path:
+            data["profile"] = self.profile_path
+        return data
+
+    def save(self, task_id):
+        """trace를 task:{task_id} 기록의 trace 필드에 저장"""
+        from agent.task_log import task_log_writer
+        task_log_writer.submit({
+            "type": "task",
+            "task_id": task_id,
+            "fields": {"trace": json.dumps(self.to_dict(), ensure_ascii=False)}
+        })
+
+@contextmanager
+def request_trace(name, enabled=False, profile=False, **attrs):
+    """
+    요청 trace 시작. enabled가 False면 None을 반환하고 아무것도 기록하지 않음
+
+    Args:
+        name (str): 루트 span 이름 (프로파일 파일 이름에도 사용)
+        enabled (bool): trace 사용 여부
+        profile (bool): cProfile 강제 사용 여부 (아니면 TRACE_PROFILE_SAMPLE_RATE 확률로 사용)
+    """
+    if not enabled:
+        yield None
+        return
+
+    trace = RequestTrace(name, **attrs)
+    token = current_span.set(trace.root)
+    try:
+        if profile or random.random() < TRACE_PROFILE_SAMPLE_RATE:
+            with profile_capture(f"{name}-{int(time.time() * 1000)}") as path:
+                trace.profile_path = path
+                yield trace
+        else:
+            yield trace
+    finally:
+        trace.root.finish()
+        current_span.reset(token)
@@ -1,6 +1,6 @@
 from agent.state import AgentState
 
-def work_step(state: AgentState) -> AgentState:
+async def work_step(state: AgentState) -> AgentState:
     """작업 단계: 실제 게임 리소스 생성 작업 수행"""
     resource_type = state.get("resource_type", "other")
     
@@ -31,8 +31,4 @@ def work_step(state: AgentState) -> AgentState:
     else:
         work_results = "지원되지 않는 리소스 유형입니다."
     
-    return {
-        **state,
-        "work_results": work_results,
-        "next": "answer_step"
-    }
\ No newline at end of file
+    return {"work_results": work_results}
\ No newline at end of file
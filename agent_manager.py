@@ -2,25 +2,31 @@
 Ollama 및 Google AI 클라이언트와 LangGraph 에이전트 통합 모듈
 """
 
+import json
 import uuid
+import time
+import asyncio
 import datetime
-import google.generativeai as genai
-from agent import answer_with_agent, streaming_agent_execution
+from contextlib import aclosing
+from agent import aanswer_with_agent, answer_with_agent, stream_agent_events, streaming_agent_execution, stage_outputs
+from agent import google_ai
 from agent.conf.config import (
-    DEFAULT_MODEL, DEFAULT_SERVICE, GOOGLE_MODEL, GOOGLE_API_KEY,
-    get_redis_client, print_environment_info
+    DEFAULT_MODEL, DEFAULT_SERVICE, GOOGLE_MODEL, GOOGLE_API_KEY, GOOGLE_AGENT_PIPELINE, BATCH_CONCURRENCY, TASK_BLOB_ENABLED,
+    print_environment_info
 )
-
-# Redis 클라이언트 가져오기
-redis_client = get_redis_client()
-
-# Google AI 초기화 (API 키가 있는 경우)
-if GOOGLE_API_KEY:
-    genai.configure(api_key=GOOGLE_API_KEY)
+from agent.response_cache import get_cached_response, store_response, request_fingerprint, normalize_prompt
+from agent.singleflight import single_flight
+from agent.admission import AdmissionRejected, get_controller
+from agent.task_log import task_log_writer
+from agent.task_blobs import PREVIEW_CHARS
+from agent.metrics import BACKEND_DURATION, BACKEND_ERRORS, CACHE_LOOKUPS, ROUTING_DECISIONS
+from agent.routing import AUTO, BACKEND_MODELS, router
+from agent.tracing import request_trace, span
+from agent.cancellation import track_generation
 
 def log_request_to_redis(task_id, service, model, prompt):
     """
-    Redis에 요청 기록 저장
+    Redis에 요청 기록 저장 (백그라운드 작성기 큐에 추가하고 바로 반환)
     
     Args:
         task_id (str): 작업 식별자 (UUID)
@@ -28,68 +34,67 @@ def log_request_to_redis(task_id, service, model, prompt):
         model (str): 사용된 모델 이름
         prompt (str): 요청된 프롬프트
     """
-    if redis_client is None:
-        return
+    timestamp = datetime.datetime.now().isoformat()
     
-    try:
-        timestamp = datetime.datetime.now().isoformat()
-        log_data = {
-            "task_id": task_id,
-            "timestamp": timestamp,
-            "service": service,
-            "model": model,
-            "prompt": prompt,
-            "status": "requested"
-        }
-        
-        # Redis에 로그 저장 (JSON 형식)
-        redis_client.hset(f"task:{task_id}", mapping=log_data)
-        
-        # 로그 메시지 저장
-        log_message = f"{timestamp}: [{task_id}] {model}에 '{prompt}' 요청"
-        redis_client.lpush("request_logs", log_message)
-        redis_client.ltrim("request_logs", 0, 999)  # 최대 1000개 로그 유지
-        
-        print(f"Redis에 작업 기록 저장: {task_id}")
-    except Exception as e:
-        print(f"Redis 로깅 실패: {str(e)}")
+    with span("task_log.submit", status="requested"):
+        task_log_writer.submit({"type": "task", "task_id": task_id, "ts": time.time(),
+                                "fields": _request_record(task_id, service, model, prompt, timestamp)})
+
+def log_requests_to_redis(requests, service, model):
+    """
+    여러 요청의 기록을 한 번의 Redis 쓰기로 저장 (일괄 요청용)
+    
+    Args:
+        requests (list): (task_id, prompt) 목록
+        service (str): 사용된 서비스
+        model (str): 사용된 모델 이름
+    """
+    timestamp = datetime.datetime.now().isoformat()
+    records = {task_id: _request_record(task_id, service, model, prompt, timestamp) for task_id, prompt in requests}
+    
+    with span("task_log.submit", status="requested", count=len(records)):
+        task_log_writer.submit({"type": "tasks", "records": records, "ts": time.time()})
 
-def update_task_status(task_id, status, response=None):
+def _request_record(task_id, service, model, prompt, timestamp):
+    return {
+        "task_id": task_id,
+        "timestamp": timestamp,
+        "service": service,
+        "model": model,
+        "prompt": prompt,
+        "status": "requested"
+    }
+
+def update_task_status(task_id, status, response=None, intermediates=None):
     """
-    Redis에 작업 상태 업데이트
+    Redis에 작업 상태 업데이트 (변경된 필드만 기록)
+    
+    완료된 작업의 전체 응답과 중간 결과는 압축하여 task:{task_id}:blobs에 따로 저장합니다. (TASK_BLOB_ENABLED)
     
     Args:
         task_id (str): 작업 식별자 (UUID)
-        status (str): 작업 상태 (completed, failed)
+        status (str): 작업 상태 (completed, failed, rejected, cancelled)
         response (str, optional): 응답 결과
+        intermediates (dict, optional): 단계별 중간 결과 (thoughts, research_results, work_results)
     """
-    if redis_client is None:
-        return
+    completed_at = datetime.datetime.now().isoformat()
+    fields = {"status": status, "completed_at": completed_at}
     
-    try:
-        # 기존 데이터 가져오기
-        task_data = redis_client.hgetall(f"task:{task_id}")
-        if not task_data:
-            return
-        
-        # 상태 업데이트
-        task_data["status"] = status
-        task_data["completed_at"] = datetime.datetime.now().isoformat()
-        
-        if response:
-            task_data["response"] = response[:1000]  # 응답이 너무 길면 자르기
-        
-        # Redis 업데이트
-        redis_client.hset(f"task:{task_id}", mapping=task_data)
-        
-        # 완료 로그 추가
-        log_message = f"{task_data['completed_at']}: [{task_id}] {status}"
-        redis_client.lpush("request_logs", log_message)
-        redis_client.ltrim("request_logs", 0, 999)
-    except Exception as e:
-        print(f"Redis 상태 업데이트 실패: {str(e)}")
+    if response:
+        fields["response"] = response[:PREVIEW_CHARS]  # 작업 기록에는 앞부분만 남김
+    
+    with span("task_log.submit", status=status):
+        task_log_writer.submit({"type": "task", "task_id": task_id, "fields": fields, "ts": time.time()})
+        if TASK_BLOB_ENABLED and status == "completed":
+            outputs = {"response": response, **(intermediates or {})}
+            task_log_writer.submit({"type": "blobs", "task_id": task_id, "outputs": {k: v for k, v in outputs.items() if v}})
+
+def backend_name(service):
+    """지표에 사용할 백엔드 이름 (google 외에는 ollama)"""
+    return "google" if service.lower() == "google" else "ollama"
 
-def generate_with_gemma3(prompt, model=DEFAULT_MODEL, stream=False, service=DEFAULT_SERVICE):
+async def generate_with_gemma3(prompt, model=DEFAULT_MODEL, stream=False, service=DEFAULT_SERVICE, use_cache=True, task_id=None, priority="normal",
+                               trace=False, profile=False, record_status=True):
     """
     선택한 서비스(Ollama 또는 Google AI)를 사용하여 텍스트 생성
     
@@ -97,39 +102,416 @@ def generate_with_gemma3(prompt, model=DEFAULT_MODEL, stream=False, service=DEFA
         prompt (str): 모델에 전송할 프롬프트 텍스트
         model (str): 사용할 모델 이름 (기본값: .env의 MODEL 값)
         stream (bool): 스트리밍 응답 여부
-        service (str): 사용할 서비스 - 'ollama' 또는 'google' (기본값: .env의 DEFAULT_SERVICE 값)
+        service (str): 사용할 서비스 - 'ollama', 'google' 또는 'auto'(백엔드 자동 선택) (기본값: .env의 DEFAULT_SERVICE 값)
+        use_cache (bool): 응답 캐시 사용 여부 (False면 캐시를 조회/저장하지 않음)
+        task_id (str, optional): 이미 기록된 작업 ID (작업 큐, 일괄 요청에서 사용)
+        priority (str): 백엔드 대기열 우선순위 - 'high', 'normal', 'low'
+        trace (bool): 실행 구간(span) 트리를 결과의 "trace" 키와 작업 기록에 포함할지 여부
+        profile (bool): trace와 함께 cProfile 결과를 TRACE_PROFILE_DIR에 저장할지 여부
+        record_status (bool): 작업 상태와 출력을 기록할지 여부. 작업 큐 워커는 재등록/완료 상태와 출력을
+            agent.jobs로 직접 쓰므로 False로 넘기고, 이때 중간 결과는 결과의 "intermediates"로 받음
+            (write-behind 큐로 늦게 기록된 상태가 덮어쓰지 않도록)
         
     Returns:
-        dict: 모델의 응답 결과
+        dict: 모델의 응답 결과 ("cache" 키에 hit/miss/bypass 표시, 자동 선택이면 "service", "model", "routing" 포함)
+        
+    Raises:
+        AdmissionRejected: 백엔드 대기열이 가득 찼거나 대기 시간이 초과된 경우
     """
-    # UUID 생성
-    task_id = str(uuid.uuid4())
-    
-    # Redis에 요청 기록 저장
-    log_request_to_redis(task_id, service, model, prompt)
+    with request_trace("generate", enabled=trace or profile, profile=profile, model=model, service=service) as request:
+        if task_id is None:
+            # UUID 생성
+            task_id = str(uuid.uuid4())
+            
+            # Redis에 요청 기록 저장
+            log_request_to_redis(task_id, service, model, prompt)
+        
+        result = await _generate(task_id, prompt, model, stream, service, use_cache, priority, record_status)
     
+    if request is not None:
+        request.save(task_id)
+        result["trace"] = request.to_dict()
+    return result
+
+async def _generate(task_id, prompt, model, stream, service, use_cache, priority, record_status=True):
+    """
+    generate_with_gemma3의 백엔드 실행과 작업 상태 기록 부분 (service가 'auto'면 백엔드 자동 선택)
+
+    record_status가 False면 상태와 출력을 기록하지 않고 중간 결과를 결과에 남겨 호출자가 기록합니다.
+    """
+    def finish(status, response=None, intermediates=None):
+        if record_status:
+            update_task_status(task_id, status, response, intermediates)
+
     try:
-        if service.lower() == "google":
-            result = generate_with_google_ai(prompt, model, stream)
-        else:  # 기본값은 ollama
-            result = generate_with_ollama(prompt, model, stream)
+        if service == AUTO:
+            result = await _execute_routed(task_id, prompt, stream, use_cache, priority)
+        else:
+            result = await _execute(prompt, model, stream, service, use_cache, priority)
         
-        # 성공 상태 업데이트
+        # 성공 상태 업데이트 (중간 결과는 작업 기록에만 남기고 응답에서는 제외)
+        intermediates = result.pop("intermediates", None) if record_status else result.get("intermediates")
         if "response" in result:
-            update_task_status(task_id, "completed", result["response"])
+            finish("completed", result["response"], intermediates)
         else:
-            update_task_status(task_id, "failed", result.get("error", "알 수 없는 오류"))
+            finish("failed", result.get("error", "알 수 없는 오류"))
         
-        # 결과에 task_id 추가
         result["task_id"] = task_id
         return result
+    except AdmissionRejected as e:
+        finish("rejected", str(e))
+        raise
+    except asyncio.CancelledError:
+        # 클라이언트 연결이 끊겨 요청이 취소됨
+        finish("cancelled")
+        raise
     except Exception as e:
         error_msg = f"생성 중 오류 발생: {str(e)}"
         # 실패 상태 업데이트
-        update_task_status(task_id, "failed", error_msg)
+        finish("failed", error_msg)
         return {"error": error_msg, "task_id": task_id}
 
-def generate_with_ollama(prompt, model=DEFAULT_MODEL, stream=False):
+async def _execute(prompt, model, stream, service, use_cache, priority):
+    """
+    백엔드 하나로 캐시 조회, 요청 합치기, 생성 실행
+    
+    Returns:
+        dict: 결과 ("cache" 키에 hit/miss/bypass, "coalesced" 키에 합치기 여부 표시)
+    """
+    # 캐시된 응답이 있으면 파이프라인을 실행하지 않고 반환
+    if use_cache:
+        with span("cache.lookup"):
+            cached = await get_cached_response(prompt, model, service)
+        CACHE_LOOKUPS.inc(result="miss" if cached is None else "hit")
+        if cached is not None:
+            return {"response": cached["response"], "done": True, "cache": "hit", "coalesced": False}
+    else:
+        CACHE_LOOKUPS.inc(result="bypass")
+    
+    async def run():
+        # 백엔드별 동시 실행 수를 넘으면 우선순위 순서대로 대기
+        async with get_controller(service).slot(priority):
+            started = time.perf_counter()
+            with span(f"backend.{backend_name(service)}"), track_generation(backend_name(service)) as usage:
+                if service.lower() == "google":
+                    result = await generate_with_google_ai(prompt, model, stream)
+                else:  # 기본값은 ollama
+                    result = await generate_with_ollama(prompt, model, stream)
+            if usage.truncated:
+                # 출력 예산(NODE_OUTPUT_BUDGETS)에 걸려 답변이 잘린 노드
+                result["truncated"] = usage.truncated
+            elapsed = time.perf_counter() - started
+            BACKEND_DURATION.observe(elapsed, backend=backend_name(service))
+            router.observe(backend_name(service), elapsed, "error" not in result, result.get("error"))
+            if "error" in result:
+                BACKEND_ERRORS.inc(backend=backend_name(service))
+        
+        # 잘린 답변은 캐시하지 않음 (캐시 적중 응답에는 truncated 표시가 없으므로)
+        if "response" in result and use_cache and "truncated" not in result:
+            with span("cache.store"):
+                await store_response(prompt, model, service, result["response"], time.perf_counter() - started)
+        return result
+    
+    # 같은 요청이 이미 실행 중이면 그 결과를 함께 사용 (작업 기록은 요청마다 따로 남김)
+    with span("single_flight") as flight_span:
+        shared_result, coalesced = await single_flight.do(request_fingerprint(prompt, model, service), run)
+        if flight_span is not None:
+            flight_span.attrs["coalesced"] = coalesced
+    
+    # 결과에 캐시 사용 여부, 합치기 여부 추가
+    return {**shared_result, "cache": "miss" if use_cache else "bypass", "coalesced": coalesced}
+
+async def _execute_routed(task_id, prompt, stream, use_cache, priority):
+    """예상 처리 시간이 가장 짧은 백엔드부터 실행하고, 실패하면 다음 백엔드로 전환"""
+    decision = {}
+    
+    async def call(service):
+        return await _execute(prompt, BACKEND_MODELS[service], stream, service, use_cache, priority)
+    
+    try:
+        with span("routing") as routing_span:
+            result = await router.run(call, decision)
+            if routing_span is not None:
+                routing_span.attrs.update(service=decision.get("service"), outcome=decision.get("outcome"))
+    finally:
+        record_routing(task_id, decision)
+    return {**result, "service": decision.get("service"), "model": decision.get("model"), "routing": decision}
+
+def record_routing(task_id, decision):
+    """백엔드 선택 결과를 작업 기록에 저장 (service/model은 실제로 사용한 값으로 변경)"""
+    fields = {"routing": json.dumps(decision, ensure_ascii=False)}
+    if decision.get("service"):
+        fields.update(service=decision["service"], model=decision["model"])
+    task_log_writer.submit({"type": "task", "task_id": task_id, "fields": fields})
+
+async def generate_batch(prompts, model=DEFAULT_MODEL, service=DEFAULT_SERVICE, use_cache=True, priority="normal",
+                         concurrency=BATCH_CONCURRENCY):
+    """
+    여러 프롬프트를 동시에 생성하고 끝나는 순서대로 결과를 전달
+    
+    같은 (정규화된) 프롬프트는 한 번만 실행하고 결과를 함께 사용하며, 요청 기록은 한 번의 Redis 쓰기로 남깁니다.
+    service가 'auto'면 항목마다 백엔드를 자동 선택하므로 사용 가능한 백엔드에 나누어 실행됩니다.
+    
+    Args:
+        prompts (list): 프롬프트 목록
+        model (str): 사용할 모델 이름
+        service (str): 사용할 서비스 - 'ollama', 'google' 또는 'auto'
+        use_cache (bool): 응답 캐시 사용 여부
+        priority (str): 백엔드 대기열 우선순위 - 'high', 'normal', 'low'
+        concurrency (int): 동시에 실행할 생성 수
+        
+    Yields:
+        dict: "batch"(항목별 작업 ID) → 끝나는 순서대로 항목마다 "item" → "done"
+    """
+    started = time.perf_counter()
+    keys = [normalize_prompt(prompt) for prompt in prompts]
+    groups = {}  # 정규화된 프롬프트 -> 항목 번호 목록
+    for index, key in enumerate(keys):
+        groups.setdefault(key, []).append(index)
+    task_ids = {key: str(uuid.uuid4()) for key in groups}
+    
+    log_requests_to_redis([(task_ids[key], prompts[indexes[0]]) for key, indexes in groups.items()], service, model)
+    yield {"event": "batch", "items": len(prompts), "unique": len(groups), "task_ids": [task_ids[key] for key in keys]}
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def run(key):
+        async with semaphore:
+            try:
+                result = await generate_with_gemma3(
+                    prompts[groups[key][0]], model, service=service, use_cache=use_cache,
+                    task_id=task_ids[key], priority=priority
+                )
+            except AdmissionRejected as e:
+                result = {"error": str(e), "status_code": e.status_code, "retry_after": e.retry_after}
+        return key, result
+    
+    tasks = [asyncio.ensure_future(run(key)) for key in groups]
+    counts = {"completed": 0, "failed": 0}
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            key, result = await next_done
+            if "error" in result:
+                item = {"error": result["error"], **{name: result[name] for name in ("status_code", "retry_after") if name in result}}
+            else:
+                item = {"result": result.get("response", ""), "cache": result.get("cache"), "coalesced": result.get("coalesced", False)}
+            item.update(service=result.get("service", service), model=result.get("model", model))
+            
+            for position, index in enumerate(groups[key]):
+                counts["failed" if "error" in result else "completed"] += 1
+                # 중복 항목은 첫 항목의 실행 결과를 그대로 사용
+                yield {"event": "item", "index": index, "task_id": task_ids[key], "deduplicated": position > 0, **item}
+    finally:
+        # 소비하는 쪽이 스트림을 닫으면(클라이언트 연결 종료) 남은 생성도 취소
+        for task in tasks:
+            task.cancel()
+    
+    yield {"event": "done", **counts, "elapsed_seconds": round(time.perf_counter() - started, 3)}
+
+async def stream_with_gemma3(prompt, model=DEFAULT_MODEL, service=DEFAULT_SERVICE, use_cache=True, priority="normal",
+                             trace=False, profile=False):
+    """
+    선택한 서비스를 사용하여 생성 과정을 이벤트 단위로 스트리밍
+    
+    Args:
+        prompt (str): 모델에 전송할 프롬프트 텍스트
+        model (str): 사용할 모델 이름
+        service (str): 사용할 서비스 - 'ollama', 'google' 또는 'auto'(백엔드 자동 선택)
+        use_cache (bool): 응답 캐시 사용 여부
+        priority (str): 백엔드 대기열 우선순위 - 'high', 'normal', 'low'
+        trace (bool): "done"/"error" 이벤트와 작업 기록에 실행 구간(span) 트리를 포함할지 여부
+        profile (bool): trace와 함께 cProfile 결과를 TRACE_PROFILE_DIR에 저장할지 여부
+        
+    Yields:
+        dict: "task" → ("route") → "node"/"token" ... → "done" 또는 "error" 순서의 이벤트
+    """
+    with request_trace("stream", enabled=trace or profile, profile=profile, model=model, service=service) as request:
+        task_id = str(uuid.uuid4())
+        log_request_to_redis(task_id, service, model, prompt)
+        yield {"event": "task", "task_id": task_id, "model": model, "service": service}
+        
+        async for event in _stream(task_id, prompt, model, service, use_cache, priority):
+            if request is not None and event["event"] in ("done", "error"):
+                event = {**event, "trace": request.to_dict()}
+            yield event
+    
+    if request is not None:
+        request.save(task_id)
+
+async def _stream(task_id, prompt, model, service, use_cache, priority, record_errors=True):
+    """
+    stream_with_gemma3의 캐시 조회와 백엔드 스트리밍 부분
+    
+    record_errors가 False면 오류를 작업 기록에 남기지 않음 (다른 백엔드로 전환할 수 있는 경우)
+    """
+    if service == AUTO:
+        async for event in _stream_routed(task_id, prompt, use_cache, priority):
+            yield event
+        return
+    
+    if use_cache:
+        with span("cache.lookup"):
+            cached = await get_cached_response(prompt, model, service)
+        CACHE_LOOKUPS.inc(result="miss" if cached is None else "hit")
+        if cached is not None:
+            update_task_status(task_id, "completed", cached["response"])
+            yield {"event": "token", "text": cached["response"]}
+            yield {"event": "done", "answer": cached["response"], "cache": "hit", "task_id": task_id}
+            return
+    else:
+        CACHE_LOOKUPS.inc(result="bypass")
+    
+    final = None
+    try:
+        async with get_controller(service).slot(priority):
+            started = time.perf_counter()
+            if service.lower() == "google":
+                events = stream_with_google_ai(prompt, model)
+            else:
+                events = stream_with_ollama(prompt, model)
+            
+            # 스트림이 중간에 닫히면 진행 중인 에이전트 실행과 백엔드 HTTP 스트림까지 바로 닫음
+            async with aclosing(events):
+                with track_generation(backend_name(service)) as usage:
+                    async for event in events:
+                        if event["event"] in ("done", "error"):
+                            final = event
+                            break
+                        yield event
+            if final is None:
+                # 완료/오류 이벤트 없이 끝난 스트림도 실패로 기록하고 클라이언트에 종료 이벤트를 보냄
+                final = {"event": "error", "error": "스트림이 완료 이벤트 없이 종료되었습니다."}
+            
+            elapsed = time.perf_counter() - started
+            BACKEND_DURATION.observe(elapsed, backend=backend_name(service))
+            router.observe(backend_name(service), elapsed, final["event"] == "done", final.get("error"))
+            if final["event"] == "done":
+                final = dict(final)
+                update_task_status(task_id, "completed", final["answer"], final.pop("intermediates", None))
+                if usage.truncated:
+                    final["truncated"] = usage.truncated
+                if use_cache and not usage.truncated:
+                    with span("cache.store"):
+                        await store_response(prompt, model, service, final["answer"], time.perf_counter() - started)
+                final = {**final, "cache": "miss" if use_cache else "bypass", "task_id": task_id}
+            else:
+                BACKEND_ERRORS.inc(backend=backend_name(service))
+                if record_errors:
+                    update_task_status(task_id, "failed", final["error"])
+                final = {**final, "task_id": task_id}
+            yield final
+    except (asyncio.CancelledError, GeneratorExit):
+        # 완료/오류 이벤트를 보내기 전에 스트림이 닫히면 클라이언트 연결이 끊긴 것으로 기록
+        # (다른 백엔드로 전환하면서 닫은 스트림은 이미 오류 이벤트를 보냈으므로 제외)
+        if final is None:
+            update_task_status(task_id, "cancelled")
+        raise
+    except AdmissionRejected as e:
+        if record_errors:
+            update_task_status(task_id, "rejected", str(e))
+        yield {"event": "error", "error": str(e), "status_code": e.status_code, "retry_after": e.retry_after, "task_id": task_id}
+    except Exception as e:
+        error_msg = f"생성 중 오류 발생: {str(e)}"
+        if record_errors:
+            update_task_status(task_id, "failed", error_msg)
+        yield {"event": "error", "error": error_msg, "task_id": task_id}
+
+async def _stream_routed(task_id, prompt, use_cache, priority):
+    """
+    예상 처리 시간이 가장 짧은 백엔드로 스트리밍
+    
+    첫 이벤트를 보내기 전에 실패하면 다음 백엔드로 전환하고, 선택한 백엔드는 "route" 이벤트로 알립니다.
+    (이미 보낸 토큰은 되돌릴 수 없으므로 스트리밍에는 중복 요청(hedging)을 사용하지 않음)
+    """
+    order = router.candidates()
+    decision = {
+        "mode": AUTO,
+        "expected_seconds": {backend.name: round(backend.expected_seconds(), 3) for backend in order},
+        "attempts": [],
+    }
+    usable = [backend for backend in order if backend.breaker.allow()] or order[:1]
+    decision["attempts"] += [{"service": backend.name, "skipped": "unhealthy"} for backend in order if backend not in usable]
+    
+    for index, backend in enumerate(usable):
+        last = index == len(usable) - 1
+        decision.update(service=backend.name, model=backend.model)
+        events = _stream(task_id, prompt, backend.model, backend.name, use_cache, priority, record_errors=last)
+        first = await anext(events)
+        if first["event"] == "error" and not last:
+            await events.aclose()
+            decision["attempts"].append({"service": backend.name, "error": first["error"]})
+            continue
+        
+        decision["attempts"].append({"service": backend.name, "error": first["error"]} if first["event"] == "error" else {"service": backend.name})
+        decision["outcome"] = "failed" if first["event"] == "error" else ("failover" if index > 0 else "primary")
+        if first["event"] != "error":
+            ROUTING_DECISIONS.inc(service=backend.name, outcome=decision["outcome"])
+        record_routing(task_id, decision)
+        yield {"event": "route", "service": backend.name, "model": backend.model, "routing": decision}
+        
+        async with aclosing(events):
+            yield first
+            async for event in events:
+                if event["event"] == "error" and not last:
+                    # 토큰을 보낸 뒤의 오류는 전환하지 않고 실패로 기록
+                    update_task_status(task_id, "failed", event["error"])
+                yield event
+        return
+
+async def stream_with_ollama(prompt, model=DEFAULT_MODEL):
+    """
+    Ollama 에이전트 실행을 노드 진행 이벤트와 답변 토큰으로 스트리밍
+    
+    Args:
+        prompt (str): 모델에 전송할 프롬프트 텍스트
+        model (str): 사용할 모델 이름
+        
+    Yields:
+        dict: 에이전트 실행 이벤트
+    """
+    from agent.llm import model_warmer
+    model_warmer.mark_used(model)
+    try:
+        async with aclosing(stream_agent_events(prompt, model_name=model)) as events:
+            async for event in events:
+                yield event
+    except Exception as e:
+        yield {"event": "error", "error": f"Ollama 생성 중 오류 발생: {str(e)}"}
+
+async def stream_with_google_ai(prompt, model=GOOGLE_MODEL):
+    """
+    Google AI 응답을 스트리밍 (GOOGLE_AGENT_PIPELINE이면 Gemini로 에이전트 그래프를 실행)
+    
+    Args:
+        prompt (str): 모델에 전송할 프롬프트 텍스트
+        model (str): 사용할 Google AI 모델 이름
+        
+    Yields:
+        dict: 에이전트 실행 이벤트 또는 토큰 이벤트와 완료 이벤트
+    """
+    if not GOOGLE_API_KEY:
+        yield {"event": "error", "error": "Google API 키가 설정되지 않았습니다. .env 파일에 GOOGLE_API_KEY를 추가하세요."}
+        return
+    
+    try:
+        if GOOGLE_AGENT_PIPELINE:
+            async with aclosing(stream_agent_events(prompt, model_name=model, provider="google")) as events:
+                async for event in events:
+                    yield event
+            return
+        
+        chunks = []
+        async with aclosing(google_ai.stream(prompt, model)) as response:
+            async for chunk in response:
+                text = google_ai.chunk_text(chunk)
+                if text:
+                    chunks.append(text)
+                    yield {"event": "token", "text": text}
+        yield {"event": "done", "answer": "".join(chunks)}
+    except Exception as e:
+        yield {"event": "error", "error": f"Google AI 생성 중 오류 발생: {str(e)}"}
+
+async def generate_with_ollama(prompt, model=DEFAULT_MODEL, stream=False):
     """
     Ollama를 사용하여 텍스트 생성
     
@@ -141,28 +523,22 @@ def generate_with_ollama(prompt, model=DEFAULT_MODEL, stream=False):
     Returns:
         dict: 모델의 응답 결과
     """
+    from agent.llm import model_warmer
+    model_warmer.mark_used(model)
     try:
-        if stream:
-            # 스트리밍 방식은 현재 API에서 처리하기 어려우므로
-            # 일반 방식으로 처리 후 결과만 반환
-            result = answer_with_agent(prompt, model_name=model)
-            return {
-                "response": result["answer"],
-                "done": True
-            }
-        else:
-            # 일반 응답 방식
-            result = answer_with_agent(prompt, model_name=model)
-            return {
-                "response": result["answer"],
-                "done": True
-            }
+        # 토큰 단위 스트리밍은 stream_with_ollama에서 처리하고, 여기서는 전체 결과만 반환
+        result = await aanswer_with_agent(prompt, model_name=model)
+        return {
+            "response": result["answer"],
+            "done": True,
+            "intermediates": stage_outputs(result)
+        }
     except Exception as e:
         return {"error": f"Ollama 생성 중 오류 발생: {str(e)}"}
 
-def generate_with_google_ai(prompt, model=GOOGLE_MODEL, stream=False):
+async def generate_with_google_ai(prompt, model=GOOGLE_MODEL, stream=False):
     """
-    Google AI 서비스를 사용하여 텍스트 생성
+    Google AI 서비스를 사용하여 텍스트 생성 (GOOGLE_AGENT_PIPELINE이면 Gemini로 에이전트 그래프를 실행)
     
     Args:
         prompt (str): 모델에 전송할 프롬프트 텍스트
@@ -176,29 +552,17 @@ def generate_with_google_ai(prompt, model=GOOGLE_MODEL, stream=False):
         return {"error": "Google API 키가 설정되지 않았습니다. .env 파일에 GOOGLE_API_KEY를 추가하세요."}
     
     try:
-        # Google Generative AI 모델 설정
-        genai_model = genai.GenerativeModel(model)
+        if GOOGLE_AGENT_PIPELINE:
+            result = await aanswer_with_agent(prompt, model_name=model, provider="google")
+            return {"response": result["answer"], "done": True, "intermediates": stage_outputs(result)}
         
         if stream:
-            # 스트리밍 방식 응답
-            response = genai_model.generate_content(prompt, stream=True)
-            streaming_result = ""
-            
-            for chunk in response:
-                if hasattr(chunk, 'text'):
-                    streaming_result += chunk.text
-            
-            return {
-                "response": streaming_result,
-                "done": True
-            }
-        else:
-            # 일반 응답 방식
-            response = genai_model.generate_content(prompt)
-            return {
-                "response": response.text,
-                "done": True
-            }
+            # 청크를 받는 대로 이어 붙여 전체 결과만 반환
+            chunks = [google_ai.chunk_text(chunk) async for chunk in google_ai.stream(prompt, model)]
+            return {"response": "".join(chunks), "done": True}
+        
+        text, _ = await google_ai.generate(prompt, model)
+        return {"response": text, "done": True}
     except Exception as e:
         return {"error": f"Google AI 생성 중 오류 발생: {str(e)}"}
 
@@ -220,7 +584,7 @@ if __name__ == "__main__":
         print("\n\n=== Google AI 서비스 테스트 ===")
         question2 = "걷는 애니메이션을 만들어줘"
         print(f"질문: {question2}")
-        result = generate_with_google_ai(question2)
+        result = asyncio.run(generate_with_google_ai(question2))
         print(f"Google AI 답변: {result['response']}")
     
     # 3. 스트리밍 방식으로 에이전트 실행 과정 보기
@@ -1,11 +1,34 @@
-from fastapi import FastAPI, HTTPException, Body
+import sys
+import json
+import asyncio
+import importlib
+from fastapi import FastAPI, HTTPException, Body, Header, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import uvicorn
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Literal, Optional
 import agent_manager
+from agent.response_cache import get_cache_stats
+from agent.task_log import task_log_writer
+from agent.singleflight import single_flight
+from agent.admission import AdmissionRejected, get_controller, admission_stats
+from agent import metrics, google_ai
+from agent.startup import readiness
+from agent.routing import AUTO, router
+from agent.node_cache import node_cache_stats
+from agent.cancellation import CancelToken, current_cancel_token
+from agent.jobs import (
+    QueueFullError, QueueUnavailableError,
+    enqueue_job, get_job, get_job_outputs, list_jobs, wait_for_job, queue_stats
+)
+from agent.task_blobs import BLOB_FIELDS, codec as task_blob_codec
+from agent.task_history import parse_time, decode_cursor
+from agent.runtime import get_runtime, rebuild_runtimes, loaded_runtimes
 from agent.conf.config import (
-    DEFAULT_MODEL, DEFAULT_SERVICE, GOOGLE_MODEL, GOOGLE_API_KEY,
-    print_environment_info
+    DEFAULT_MODEL, DEFAULT_SERVICE, GOOGLE_MODEL, GOOGLE_API_KEY, GOOGLE_AGENT_PIPELINE, FAST_START, ROUTING_ENABLED,
+    CANCEL_ON_DISCONNECT, DISCONNECT_POLL_INTERVAL, TRACE_PROFILE_ALLOWED, BATCH_MAX_ITEMS, BATCH_CONCURRENCY,
+    OLLAMA_WARMUP_ENABLED, OLLAMA_WARMUP_REQUIRED,
+    connect_async_redis, redis_health, print_environment_info
 )
 
 app = FastAPI(title="ML Bootcamp API", version="0.1.0")
@@ -14,7 +37,19 @@ class PromptRequest(BaseModel):
     prompt: str
     model: Optional[str] = None
     stream: bool = False
-    service: str = DEFAULT_SERVICE
+    service: Optional[str] = None  # 'ollama', 'google', 'auto' (생략하면 ROUTING_ENABLED에 따라 자동 선택)
+    bypass_cache: bool = False
+    priority: Literal["high", "normal", "low"] = "normal"
+    trace: bool = False  # 응답에 실행 구간(span) 트리 포함
+    profile: bool = False  # trace와 함께 cProfile 결과 저장
+
+class BatchRequest(BaseModel):
+    prompts: List[str]
+    model: Optional[str] = None
+    service: Optional[str] = None  # PromptRequest와 같음 (생략하면 항목마다 백엔드 자동 선택)
+    bypass_cache: bool = False
+    priority: Literal["high", "normal", "low"] = "normal"
+    concurrency: Optional[int] = None  # 동시에 실행할 생성 수 (최대 BATCH_CONCURRENCY)
 
 @app.get("/api/health")
 def health_check():
@@ -23,54 +58,283 @@ def health_check():
     """
     return {"status": "ok"}
 
+@app.get("/api/ready")
+def readiness_check():
+    """
+    준비 상태 확인 (Redis 연결, 그래프 컴파일 등 준비 작업이 끝나기 전에는 503)
+    """
+    snapshot = readiness.snapshot()
+    return JSONResponse(snapshot, status_code=200 if snapshot["ready"] else 503)
+
+def resolve_model_and_service(request: PromptRequest):
+    """요청에서 사용할 모델과 서비스 결정 (서비스와 모델을 모두 생략하면 백엔드 자동 선택)"""
+    service = request.service or (AUTO if ROUTING_ENABLED and not request.model else DEFAULT_SERVICE)
+    if service == AUTO:
+        # 모델은 선택된 백엔드의 기본 모델 사용
+        print("사용할 서비스: 자동 선택")
+        return AUTO, AUTO
+    
+    # Google 모델을 사용하는 경우 서비스도 'google'로 강제 설정
+    model = request.model or GOOGLE_MODEL
+    
+    # 모델 이름이 Google 모델이면 서비스도 'google'로 설정
+    if model == GOOGLE_MODEL:
+        service = "google"
+        print(f"Google 모델 {model}을 사용하므로 서비스를 'google'로 설정합니다.")
+    
+    print(f"사용할 서비스: {service}, 모델: {model}")
+    return model, service
+
+def admission_error(e: AdmissionRejected) -> HTTPException:
+    """대기열 거절을 429/503 응답으로 변환"""
+    return HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def format_sse(event: dict) -> str:
+    """이벤트를 Server-Sent Events 형식 문자열로 변환"""
+    return f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+# 클라이언트가 응답을 받기 전에 연결을 끊은 요청의 상태 코드 (nginx 관례)
+CLIENT_CLOSED_REQUEST = 499
+
+async def run_until_disconnected(http_request: Request, coro):
+    """
+    coro를 실행하고, 끝나기 전에 클라이언트 연결이 끊기면 실행을 취소
+    
+    요청의 CancelToken을 취소하여 그래프가 다음 노드를 실행하지 않게 하고, 태스크를 cancel하여
+    진행 중인 백엔드 HTTP 요청도 바로 중단합니다.
+    
+    Raises:
+        HTTPException: 연결이 끊겨 취소한 경우 (499)
+    """
+    cancel_token = CancelToken()
+    context_token = current_cancel_token.set(cancel_token)
+    try:
+        task = asyncio.ensure_future(coro)
+    finally:
+        current_cancel_token.reset(context_token)
+    
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                break
+    except asyncio.CancelledError:
+        # 서버 종료 등으로 요청 처리 자체가 취소된 경우
+        cancel_token.cancel("server_cancelled")
+        task.cancel()
+        raise
+    
+    print("클라이언트 연결이 끊겨 생성을 취소합니다.")
+    cancel_token.cancel()
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="클라이언트 연결이 끊겨 생성을 취소했습니다.")
+
 @app.post("/api/generate")
-def generate_text(request: PromptRequest):
+async def generate_text(
+    request: PromptRequest,
+    http_request: Request,
+    x_trace: Optional[str] = Header(None),
+    x_profile: Optional[str] = Header(None)
+):
     """
     지정된 서비스(Ollama 또는 Google AI)를 통해 텍스트 생성
+    
+    stream=true이면 노드 진행 상황과 답변 토큰을 Server-Sent Events로 전송합니다.
+    trace=true 또는 X-Trace: 1 헤더가 있으면 응답에 실행 구간 트리를 포함합니다.
+    profile=true 또는 X-Profile: 1 헤더로 cProfile을 켜는 것은 TRACE_PROFILE_ALLOWED일 때만 허용합니다.
+    클라이언트 연결이 끊기면 진행 중인 생성을 취소하고 작업 상태를 cancelled로 기록합니다.
     """
     try:
-        # Google 모델을 사용하는 경우 서비스도 'google'로 강제 설정
-        model = request.model or GOOGLE_MODEL
-        service = request.service
-        
-        # 모델 이름이 Google 모델이면 서비스도 'google'로 설정
-        if model == GOOGLE_MODEL:
-            service = "google"
-            print(f"Google 모델 {model}을 사용하므로 서비스를 'google'로 설정합니다.")
+        model, service = resolve_model_and_service(request)
+        trace = request.trace or x_trace == "1"
+        # cProfile은 이벤트 루프 전체를 프로파일링하므로 설정으로 허용한 경우에만 요청으로 켤 수 있음
+        profile = TRACE_PROFILE_ALLOWED and (request.profile or x_profile == "1")
         
-        print(f"사용할 서비스: {service}, 모델: {model}")
+        if request.stream:
+            # 스트림을 열기 전에 대기열이 가득 찼는지 확인하여 바로 거절 (자동 선택이면 다른 백엔드로 전환)
+            if service != AUTO:
+                get_controller(service).check()
+            events = agent_manager.stream_with_gemma3(
+                prompt=request.prompt,
+                model=model,
+                service=service,
+                use_cache=not request.bypass_cache,
+                priority=request.priority,
+                trace=trace,
+                profile=profile
+            )
+            return StreamingResponse(
+                (format_sse(event) async for event in events),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
         
-        result = agent_manager.generate_with_gemma3(
+        generation = agent_manager.generate_with_gemma3(
             prompt=request.prompt,
             model=model,
             stream=request.stream,
-            service=service
+            service=service,
+            use_cache=not request.bypass_cache,
+            priority=request.priority,
+            trace=trace,
+            profile=profile
         )
+        # 스트리밍 응답은 연결이 끊기면 StreamingResponse가 이벤트 생성을 취소함
+        result = await (run_until_disconnected(http_request, generation) if CANCEL_ON_DISCONNECT else generation)
         
         if "error" in result:
             raise HTTPException(status_code=500, detail=result["error"])
         
         response_data = {
             "result": result.get("response", ""), 
-            "model": model,
-            "service": service
+            "model": result.get("model", model),
+            "service": result.get("service", service),
+            "cache": result.get("cache"),
+            "coalesced": result.get("coalesced", False)
         }
         
         # 작업 ID가 있으면 응답에 포함
         if "task_id" in result:
             response_data["task_id"] = result["task_id"]
+        if "routing" in result:
+            response_data["routing"] = result["routing"]
+        if "truncated" in result:
+            response_data["truncated"] = result["truncated"]
+        if "trace" in result:
+            response_data["trace"] = result["trace"]
             
         return response_data
+    except AdmissionRejected as e:
+        raise admission_error(e)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/generate/batch")
+async def generate_batch(request: BatchRequest):
+    """
+    여러 프롬프트를 한 번에 생성하고, 끝나는 순서대로 항목별 결과를 NDJSON으로 전송
+    
+    첫 줄("batch")에 항목별 task_id를 보내고, 항목마다 "item" 줄(index, task_id, result 또는 error),
+    마지막에 "done" 줄(성공/실패 수)을 보냅니다. 같은 프롬프트는 한 번만 생성합니다.
+    """
+    if not request.prompts:
+        raise HTTPException(status_code=400, detail="prompts가 비어 있습니다.")
+    if len(request.prompts) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {BATCH_MAX_ITEMS}개까지 요청할 수 있습니다.")
+    
+    model, service = resolve_model_and_service(PromptRequest(prompt="", model=request.model, service=request.service))
+    concurrency = min(request.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY)
+    events = agent_manager.generate_batch(
+        request.prompts,
+        model=model,
+        service=service,
+        use_cache=not request.bypass_cache,
+        priority=request.priority,
+        concurrency=max(concurrency, 1)
+    )
+    return StreamingResponse(
+        (json.dumps(event, ensure_ascii=False) + "\n" async for event in events),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/tasks", status_code=202)
+async def submit_task(request: PromptRequest):
+    """
+    생성 작업을 대기열에 등록하고 task_id를 바로 반환 (워커 프로세스가 실행)
+    """
+    model, service = resolve_model_and_service(request)
+    try:
+        task_id = await enqueue_job(
+            request.prompt, model, service,
+            use_cache=not request.bypass_cache, priority=request.priority
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except QueueUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return {"task_id": task_id, "status": "queued", "model": model, "service": service}
+
+@app.get("/api/tasks")
+async def list_tasks(
+    since: Optional[str] = Query(None, description="이 시각 이후에 생성된 작업 (ISO 8601 또는 epoch 초)"),
+    until: Optional[str] = Query(None, description="이 시각 이전에 생성된 작업 (ISO 8601 또는 epoch 초)"),
+    status: Optional[str] = None,
+    model: Optional[str] = None,
+    service: Optional[str] = None,
+    order: Literal["recent", "slowest"] = Query("recent", description="recent: 최신순, slowest: 처리 시간이 긴 순 (끝난 작업만)"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="이전 응답의 next_cursor")
+):
+    """
+    작업 목록 조회 (시간/상태/모델/서비스 색인 사용, next_cursor로 다음 페이지 조회)
+    """
+    try:
+        since_ts = parse_time(since) if since else None
+        until_ts = parse_time(until) if until else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since/until은 ISO 8601 시각 또는 epoch 초여야 합니다.")
+    try:
+        if cursor:
+            decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"잘못된 cursor입니다: {cursor}")
+    
+    try:
+        return await list_jobs(
+            since=since_ts, until=until_ts, status=status, model=model, service=service,
+            order=order, limit=limit, cursor=cursor
+        )
+    except QueueUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@app.get("/api/tasks/{task_id}")
+async def get_task(
+    task_id: str,
+    wait: float = Query(0, ge=0, le=60, description="완료될 때까지 기다릴 최대 시간(초)"),
+    include: Optional[str] = Query(None, description=f"압축 해제해서 함께 반환할 출력 (쉼표 구분, all이면 전부: {', '.join(BLOB_FIELDS)})")
+):
+    """
+    작업 상태와 결과 조회 (wait > 0이면 완료될 때까지 long-poll)
+    
+    압축 저장된 출력은 stored_bytes에 크기만 표시하고, include로 요청한 필드만 압축을 풀어 outputs에 넣습니다.
+    """
+    if include == "all":
+        fields = BLOB_FIELDS
+    else:
+        fields = tuple(name.strip() for name in (include or "").split(",") if name.strip())
+    unknown = [name for name in fields if name not in BLOB_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"알 수 없는 출력 필드입니다: {', '.join(unknown)}")
+    
+    try:
+        job = await wait_for_job(task_id, wait) if wait > 0 else await get_job(task_id)
+        if job is not None:
+            job.update(await get_job_outputs(task_id, fields))
+    except QueueUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"작업을 찾을 수 없습니다: {task_id}")
+    return job
+
 @app.get("/api/config")
 def get_config():
     """
     현재 API 구성 정보 반환
     """
     google_available = bool(GOOGLE_API_KEY)
+    warmer = loaded_model_warmer()
     
     return {
         "default_service": DEFAULT_SERVICE,
@@ -83,13 +347,126 @@ def get_config():
                 "available": google_available,
                 "default_model": GOOGLE_MODEL
             }
-        }
+        },
+        "runtimes": loaded_runtimes(),
+        "task_log": task_log_writer.snapshot(),
+        "task_blobs": task_blob_codec.snapshot(),
+        "ollama_models": warmer.snapshot() if warmer is not None else None,
+        "single_flight": single_flight.snapshot(),
+        "admission": admission_stats(),
+        "routing": router.snapshot(),
+        "redis": redis_health()
     }
 
-# 서버 시작 시 환경 정보 출력
+@app.get("/api/queue/stats")
+async def task_queue_stats():
+    """
+    작업 대기열 길이 조회
+    """
+    return await queue_stats()
+
+@app.get("/api/admission/stats")
+def backend_admission_stats():
+    """
+    백엔드별 실행 중 요청 수, 대기열 길이, 거절 횟수 조회
+    """
+    return admission_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Prometheus 형식 지표 (노드/백엔드 지연 시간, 토큰 수, 오류 수, 캐시/대기열 상태)
+    """
+    for backend, stats in admission_stats().items():
+        metrics.ADMISSION_ACTIVE.set(stats["active"], backend=backend)
+        metrics.ADMISSION_QUEUE_DEPTH.set(stats["queue_depth"], backend=backend)
+    metrics.TASK_LOG_PENDING.set(task_log_writer.snapshot()["pending"])
+    metrics.SINGLE_FLIGHT_INFLIGHT.set(single_flight.snapshot()["inflight"])
+    warmer = loaded_model_warmer()
+    if warmer is not None:
+        for model, state in warmer.snapshot()["models"].items():
+            if state["resident"] is not None:
+                metrics.OLLAMA_MODEL_RESIDENT.set(int(state["resident"]), model=model)
+    
+    # Redis에 있는 값은 수집 시점에만 조회
+    jobs = await queue_stats()
+    if jobs["available"]:
+        metrics.JOB_QUEUE_DEPTH.set(jobs["pending"], state="pending")
+        metrics.JOB_QUEUE_DEPTH.set(jobs["processing"], state="processing")
+    cache = await get_cache_stats()
+    if cache.get("available"):
+        metrics.CACHE_ENTRIES.set(cache["entries"])
+        metrics.CACHE_HIT_RATE.set(cache["hit_rate"])
+    
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """
+    응답 캐시 적중률 및 절약된 생성 시간 조회 (노드 결과 캐시 상태는 "node_cache")
+    """
+    return {**await get_cache_stats(), "node_cache": node_cache_stats()}
+
+@app.post("/api/runtimes/rebuild")
+def rebuild_runtime(model: Optional[str] = None, provider: Optional[Literal["ollama", "google"]] = None):
+    """
+    에이전트 런타임(그래프, 프롬프트, LLM 클라이언트) 재생성
+
+    설정과 프롬프트 템플릿은 다시 읽지 않으므로, 바꾼 경우에는 서버를 다시 시작해야 합니다.
+    """
+    return {"rebuilt": rebuild_runtimes(model, provider)}
+
+async def compile_default_runtime():
+    # LangGraph/LangChain import와 그래프 컴파일은 오래 걸리므로 스레드에서 실행
+    return await asyncio.to_thread(get_runtime, DEFAULT_MODEL)
+
+async def warm_up_ollama_models():
+    llm = await asyncio.to_thread(importlib.import_module, "agent.llm")
+    return await llm.model_warmer.start()
+
+def loaded_model_warmer():
+    """agent.llm을 이미 불러왔으면 모델 상주 관리자 반환 (상태 조회 때문에 LangChain을 불러오지 않도록)"""
+    llm = sys.modules.get("agent.llm")
+    return llm.model_warmer if llm is not None else None
+
+async def import_google_sdk():
+    return await asyncio.to_thread(google_ai.get_genai)
+
+async def compile_google_runtime():
+    return await asyncio.to_thread(get_runtime, GOOGLE_MODEL, provider="google")
+
+# 서버 시작 시 환경 정보 출력 후 준비 작업 실행
 @app.on_event("startup")
 async def startup_event():
-    print_environment_info()
+    print_environment_info(check_redis=not FAST_START)
+    task_log_writer.start()
+    
+    # (단계 이름, 코루틴 함수, 준비 완료에 필수인지 여부)
+    steps = [
+        ("redis", connect_async_redis, False),
+        ("agent_graph", compile_default_runtime, True),
+    ]
+    if OLLAMA_WARMUP_ENABLED:
+        # 모델을 메모리에 올린 뒤 준비 완료로 표시하여 첫 요청이 모델 로드 시간을 기다리지 않게 함
+        steps.append(("ollama_models", warm_up_ollama_models, OLLAMA_WARMUP_REQUIRED))
+    if GOOGLE_API_KEY:
+        steps.append(("google_sdk", import_google_sdk, False))
+        if GOOGLE_AGENT_PIPELINE:
+            steps.append(("google_agent_graph", compile_google_runtime, False))
+    
+    if FAST_START:
+        # 준비 작업이 끝나기 전에도 요청을 받고, /api/ready로 완료 여부 확인
+        app.state.warm_up = asyncio.create_task(readiness.warm_up(steps))
+    else:
+        await readiness.warm_up(steps)
+
+# 서버 종료 시 남은 작업 기록을 Redis에 반영
+@app.on_event("shutdown")
+async def shutdown_event():
+    await task_log_writer.stop()
+    warmer = loaded_model_warmer()
+    if warmer is not None:
+        await warmer.stop()
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=2188)
\ No newline at end of file
@@ -0,0 +1,9 @@
+"""
+성능 측정용 벤치마크 패키지
+
+- fakes: 가짜 백엔드 공통 설정 (토큰 속도, 지연 분포, 실패 주입)
+- fake_ollama: Ollama /api/generate를 흉내 내는 HTTP 서버
+- fake_google: google.generativeai 클라이언트 대체
+- serve: 가짜 백엔드에 연결된 API 서버 실행
+- load: /api/generate 부하 생성 및 결과(JSON) 비교
+"""
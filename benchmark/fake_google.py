@@ -0,0 +1,54 @@
+"""
+google.generativeai 클라이언트를 대체하는 가짜 모델
+
+install()을 호출하면 agent.google_ai가 실제 SDK 대신 가짜 모델을 사용하여
+Google 경로를 API 키와 네트워크 없이 측정할 수 있습니다. (실제 SDK는 불러오지 않음)
+"""
+
+import types
+from benchmark.fakes import FakeBackendConfig, generate_tokens
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+class FakeStreamResponse:
+    """generate_content_async(stream=True) 응답처럼 청크를 비동기로 반환"""
+
+    def __init__(self, config, prompt):
+        self._tokens = generate_tokens(config, prompt)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return FakeChunk(await anext(self._tokens))
+
+class FakeGenerativeModel:
+    config = FakeBackendConfig()
+
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        if stream:
+            response = FakeStreamResponse(self.config, prompt)
+            # 실패는 첫 청크 전에 결정되므로 실제 SDK처럼 호출 시점에 예외 발생
+            first = await response.__anext__()
+            return _prepend(first, response)
+        return FakeChunk("".join([token async for token in generate_tokens(self.config, prompt)]))
+
+async def _prepend(first, rest):
+    yield first
+    async for chunk in rest:
+        yield chunk
+
+def install(config: FakeBackendConfig):
+    """agent.google_ai.get_genai()가 가짜 모델을 담은 모듈을 반환하도록 설정"""
+    from agent import google_ai
+    FakeGenerativeModel.config = config
+    google_ai._genai = types.SimpleNamespace(
+        GenerativeModel=FakeGenerativeModel,
+        configure=lambda **kwargs: None
+    )
+    google_ai.clear_model_cache()
@@ -0,0 +1,130 @@
+"""
+Ollama /api/generate를 흉내 내는 가짜 HTTP 서버
+
+사용법:
+    python -m benchmark.fake_ollama --port 11435 --token-rate 50 --latency lognormal:0.2:0.5 --failure-rate 0.01
+
+API 서버는 OLLAMA_BASE_URL=http://localhost:11435 으로 연결합니다.
+"""
+
+import json
+import time
+import argparse
+import datetime
+import uvicorn
+from fastapi import FastAPI, Body
+from fastapi.responses import JSONResponse, StreamingResponse
+from benchmark.fakes import FakeBackendConfig, InjectedFailure, Latency, generate_tokens
+
+def _chunk(model, response, done, **extra):
+    return {
+        "model": model,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "response": response,
+        "done": done,
+        **extra
+    }
+
+def create_app(config: FakeBackendConfig) -> FastAPI:
+    """설정에 따라 동작하는 가짜 Ollama 서버 생성"""
+    app = FastAPI(title="Fake Ollama")
+    stats = {"requests": 0, "failures": 0, "tokens": 0, "prompt_chars": 0, "loads": 0}
+    loaded = {}  # 모델 -> 메모리에서 내릴 시각 (/api/ps)
+
+    @app.post("/api/generate")
+    async def generate(body: dict = Body(...)):
+        stats["requests"] += 1
+        model = body.get("model", "")
+        prompt = body.get("prompt", "")
+        started = time.perf_counter_ns()
+        loaded[model] = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=5)
+        if "prompt" not in body:
+            # 프롬프트 없는 요청은 모델만 올림 (예열)
+            stats["loads"] += 1
+            return _chunk(model, "", True, done_reason="load", load_duration=0)
+        stats["prompt_chars"] += len(prompt)
+        num_predict = (body.get("options") or {}).get("num_predict")
+        tokens = generate_tokens(config, prompt, num_predict, bool(body.get("format")))
+
+        # 실패는 첫 토큰 전에 결정되므로 HTTP 오류 상태로 응답할 수 있음
+        try:
+            first = await anext(tokens)
+        except InjectedFailure as e:
+            stats["failures"] += 1
+            return JSONResponse({"error": str(e)}, status_code=500)
+        except StopAsyncIteration:
+            first = ""
+
+        def final(count):
+            stats["tokens"] += count
+            return _chunk(
+                model, "", True,
+                # num_predict에 걸려 멈추면 Ollama처럼 length
+                done_reason="length" if num_predict is not None and count >= num_predict else "stop",
+                total_duration=time.perf_counter_ns() - started,
+                prompt_eval_count=len(prompt),
+                eval_count=count
+            )
+
+        if not body.get("stream", True):
+            rest = [token async for token in tokens]
+            return {**final(1 + len(rest)), "response": first + "".join(rest)}
+
+        async def lines():
+            count = 1
+            yield json.dumps(_chunk(model, first, False), ensure_ascii=False) + "\n"
+            async for token in tokens:
+                count += 1
+                yield json.dumps(_chunk(model, token, False), ensure_ascii=False) + "\n"
+            yield json.dumps(final(count)) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": []}
+
+    @app.get("/api/ps")
+    async def ps():
+        now = datetime.datetime.now(datetime.timezone.utc)
+        return {"models": [{"name": model, "model": model, "expires_at": expires.isoformat(), "size_vram": 0}
+                           for model, expires in loaded.items() if expires > now]}
+
+    @app.delete("/api/ps/{model:path}")
+    async def unload(model: str):
+        # 메모리 부족 등으로 모델이 내려간 상황 재현용
+        return {"unloaded": loaded.pop(model, None) is not None}
+
+    @app.get("/api/version")
+    async def version():
+        return {"version": "fake"}
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+def add_backend_arguments(parser: argparse.ArgumentParser):
+    """가짜 백엔드 설정 인자 추가 (fake_ollama, serve에서 공통 사용)"""
+    parser.add_argument("--token-rate", type=float, default=50.0, help="초당 토큰 수 (0이면 지연 없음)")
+    parser.add_argument("--latency", default="fixed:0.1", help="응답 시작 전 지연 분포 (fixed:S, uniform:A:B, lognormal:MEDIAN:SIGMA)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="요청 실패 확률 (0~1)")
+    parser.add_argument("--max-tokens", type=int, default=64, help="응답당 최대 토큰 수")
+
+def backend_config(args) -> FakeBackendConfig:
+    return FakeBackendConfig(
+        token_rate=args.token_rate,
+        latency=Latency.parse(args.latency),
+        failure_rate=args.failure_rate,
+        max_tokens=args.max_tokens
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="가짜 Ollama 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    add_backend_arguments(parser)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(backend_config(args)), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,79 @@
+"""
+가짜 백엔드 공통 설정
+
+응답 시작 전 지연(latency), 토큰 생성 속도(token_rate), 실패 확률(failure_rate)을
+조절하여 실제 모델 없이 API 서버의 처리량과 지연 시간을 측정할 수 있게 합니다.
+"""
+
+import json
+import random
+import asyncio
+from dataclasses import dataclass, field
+
+# 답변 토큰으로 사용할 문장 조각
+FILLER_TOKENS = ("게임 ", "리소스 ", "제작을 ", "위해 ", "블렌더에서 ", "모델을 ", "만들고 ", "리깅한 ", "뒤 ", "애니메이션을 ", "적용합니다. ")
+
+class InjectedFailure(Exception):
+    """failure_rate에 따라 의도적으로 발생시킨 실패"""
+
+@dataclass
+class Latency:
+    """
+    응답 시작 전 지연 분포 (초 단위)
+
+    "fixed:0.2", "uniform:0.1:0.5", "lognormal:0.2:0.5"(중앙값, sigma) 형식의 문자열로 만들 수 있습니다.
+    """
+    kind: str = "fixed"
+    params: tuple = (0.0,)
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        kind, *values = spec.split(":")
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"지원하지 않는 지연 분포입니다: {kind}")
+        return cls(kind, tuple(float(value) for value in values))
+
+    def sample(self) -> float:
+        if self.kind == "uniform":
+            return random.uniform(*self.params)
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return random.lognormvariate(0, sigma) * median
+        return self.params[0]
+
+@dataclass
+class FakeBackendConfig:
+    """가짜 백엔드 동작 설정"""
+    token_rate: float = 50.0  # 초당 토큰 수 (0이면 지연 없이 생성)
+    latency: Latency = field(default_factory=Latency)
+    failure_rate: float = 0.0
+    max_tokens: int = 64
+
+def fake_completion(prompt: str, max_tokens: int, structured: bool = False) -> list:
+    """프롬프트에 맞는 가짜 응답을 토큰 목록으로 반환"""
+    # 요청 분석 프롬프트나 형식(format)을 지정한 요청에는 파싱 가능한 JSON으로 응답
+    if structured or "JSON" in prompt:
+        resource_type = "animation" if "애니메이션" in prompt else "3d_model"
+        text = json.dumps({
+            "is_game_resource_request": True,
+            "resource_type": resource_type,
+            "details": {"대상": "benchmark"}
+        }, ensure_ascii=False)
+        return [text[i:i + 8] for i in range(0, len(text), 8)]
+
+    count = random.randint(max_tokens // 2, max_tokens)
+    return [FILLER_TOKENS[i % len(FILLER_TOKENS)] for i in range(count)]
+
+async def generate_tokens(config: FakeBackendConfig, prompt: str, max_tokens: int = None, structured: bool = False):
+    """지연과 토큰 속도에 맞춰 토큰을 하나씩 생성 (실패 주입 시 InjectedFailure, max_tokens는 num_predict 같은 생성 한도)"""
+    await asyncio.sleep(config.latency.sample())
+    if random.random() < config.failure_rate:
+        raise InjectedFailure("injected failure")
+
+    interval = 1.0 / config.token_rate if config.token_rate > 0 else 0
+    # 생성 한도와 관계없이 정한 길이에서 한도를 넘는 부분만 잘라냄 (실제 num_predict처럼)
+    completion = fake_completion(prompt, config.max_tokens, structured)
+    for token in completion if max_tokens is None else completion[:max_tokens]:
+        if interval:
+            await asyncio.sleep(interval)
+        yield token
@@ -0,0 +1,206 @@
+"""
+/api/generate 부하 생성기
+
+고정 동시 요청 수(--concurrency) 또는 고정 초당 요청 수(--rps)로 요청을 보내고
+지연 시간(p50/p95/p99), 처리량, 첫 토큰까지의 시간(TTFT), 노드별 완료 시점을 JSON으로 출력합니다.
+--baseline으로 이전 결과를 지정하면 허용 범위를 넘는 성능 저하가 있을 때 종료 코드 1로 끝납니다.
+
+사용법:
+    python -m benchmark.load --concurrency 8 --requests 200 --output run.json
+    python -m benchmark.load --rps 5 --duration 60 --baseline run.json --max-regression 0.1
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import itertools
+import httpx
+
+DEFAULT_PROMPTS = (
+    "걷는 애니메이션을 만들어줘",
+    "기사 캐릭터 3D 모델을 만들어줘",
+    "점프하는 고양이 애니메이션 생성해줘",
+)
+
+def percentile(values, p):
+    """nearest-rank 방식 백분위수 (값이 없으면 None)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+def summarize(values):
+    if not values:
+        return None
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "mean": sum(values) / len(values),
+        "max": max(values),
+    }
+
+async def send_request(client, args, prompt):
+    """요청 하나를 보내고 측정 결과 반환 (시간은 초 단위)"""
+    body = {
+        "prompt": prompt,
+        "model": args.model,
+        "service": args.service,
+        "stream": args.stream,
+        "bypass_cache": not args.use_cache,
+    }
+    result = {"ok": False, "status": None, "latency": None, "ttft": None, "nodes": {}}
+    started = time.perf_counter()
+
+    try:
+        if not args.stream:
+            response = await client.post("/api/generate", json=body)
+            result["status"] = response.status_code
+            result["ok"] = response.status_code == 200
+        else:
+            async with client.stream("POST", "/api/generate", json=body) as response:
+                result["status"] = response.status_code
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    event = json.loads(line[len("data: "):])
+                    elapsed = time.perf_counter() - started
+                    if event["event"] == "token" and result["ttft"] is None:
+                        result["ttft"] = elapsed
+                    elif event["event"] == "node":
+                        result["nodes"][event["node"]] = elapsed
+                    elif event["event"] == "done":
+                        result["ok"] = response.status_code == 200
+                    elif event["event"] == "error":
+                        result["error"] = event["error"]
+    except httpx.HTTPError as e:
+        result["error"] = str(e)
+
+    result["latency"] = time.perf_counter() - started
+    return result
+
+async def run_concurrency(client, args, prompts):
+    """동시 요청 수를 고정하여 총 args.requests개 요청"""
+    results = []
+    remaining = iter(range(args.requests))
+
+    async def user():
+        for _ in remaining:
+            results.append(await send_request(client, args, next(prompts)))
+
+    await asyncio.gather(*[user() for _ in range(args.concurrency)])
+    return results
+
+async def run_rps(client, args, prompts):
+    """응답 시간과 관계없이 초당 args.rps개 요청을 args.duration초 동안 시작 (open-loop)"""
+    tasks = []
+    interval = 1.0 / args.rps
+    started = time.perf_counter()
+    for i in itertools.count():
+        scheduled = started + i * interval
+        if scheduled - started >= args.duration:
+            break
+        await asyncio.sleep(max(0, scheduled - time.perf_counter()))
+        tasks.append(asyncio.create_task(send_request(client, args, next(prompts))))
+    return await asyncio.gather(*tasks)
+
+def build_report(args, results, elapsed):
+    ok = [r for r in results if r["ok"]]
+    status_codes = {}
+    for r in results:
+        status_codes[str(r["status"])] = status_codes.get(str(r["status"]), 0) + 1
+
+    node_names = sorted({name for r in ok for name in r["nodes"]})
+    return {
+        "config": {
+            "mode": "rps" if args.rps else "concurrency",
+            "rps": args.rps,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "stream": args.stream,
+            "service": args.service,
+            "model": args.model,
+            "use_cache": args.use_cache,
+        },
+        "requests": len(results),
+        "succeeded": len(ok),
+        "failed": len(results) - len(ok),
+        "status_codes": status_codes,
+        "elapsed": elapsed,
+        "throughput_rps": len(ok) / elapsed if elapsed else 0,
+        "latency": summarize([r["latency"] for r in ok]),
+        "ttft": summarize([r["ttft"] for r in ok if r["ttft"] is not None]),
+        # 요청 시작부터 각 노드가 끝날 때까지의 시간
+        "nodes": {name: summarize([r["nodes"][name] for r in ok if name in r["nodes"]]) for name in node_names},
+    }
+
+def find_regressions(report, baseline, tolerance):
+    """기준 결과 대비 tolerance 비율을 넘게 나빠진 지표 목록"""
+    regressions = []
+    for metric in ("latency", "ttft"):
+        for stat in ("p50", "p95", "p99"):
+            base = (baseline.get(metric) or {}).get(stat)
+            current = (report.get(metric) or {}).get(stat)
+            if base and current and current > base * (1 + tolerance):
+                regressions.append(f"{metric}.{stat}: {base:.3f}s -> {current:.3f}s")
+
+    base_throughput = baseline.get("throughput_rps")
+    if base_throughput and report["throughput_rps"] < base_throughput * (1 - tolerance):
+        regressions.append(f"throughput_rps: {base_throughput:.2f} -> {report['throughput_rps']:.2f}")
+    return regressions
+
+async def main(args):
+    prompts = list(args.prompt or DEFAULT_PROMPTS)
+    if args.unique_prompts:
+        # 캐시/요청 합치기의 영향 없이 측정하도록 요청마다 다른 프롬프트 사용
+        prompts = (f"{prompt} #{i}" for i, prompt in enumerate(itertools.cycle(prompts)))
+    else:
+        prompts = itertools.cycle(prompts)
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        if args.rps:
+            results = await run_rps(client, args, prompts)
+        else:
+            results = await run_concurrency(client, args, prompts)
+        return build_report(args, results, time.perf_counter() - started)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="/api/generate 부하 생성기")
+    parser.add_argument("--url", default="http://127.0.0.1:2188")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 요청 수 (--rps가 없을 때)")
+    parser.add_argument("--requests", type=int, default=100, help="총 요청 수 (--rps가 없을 때)")
+    parser.add_argument("--rps", type=float, help="초당 요청 수 (지정하면 --duration 동안 open-loop로 실행)")
+    parser.add_argument("--duration", type=float, default=30, help="--rps 실행 시간(초)")
+    parser.add_argument("--service", default="ollama")
+    parser.add_argument("--model", default="gemma3:4b")
+    parser.add_argument("--prompt", action="append", help="사용할 프롬프트 (여러 번 지정 가능)")
+    parser.add_argument("--no-stream", dest="stream", action="store_false", help="SSE 대신 일반 응답 사용 (TTFT/노드 시간 측정 불가)")
+    parser.add_argument("--use-cache", action="store_true", help="응답 캐시 사용 (기본값: 캐시 우회)")
+    parser.add_argument("--unique-prompts", action="store_true", help="요청마다 다른 프롬프트 사용")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--max-regression", type=float, default=0.1, help="허용하는 성능 저하 비율")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(report, baseline, args.max_regression)
+        if regressions:
+            print("성능 저하 감지:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            sys.exit(1)
@@ -0,0 +1,45 @@
+"""
+가짜 백엔드에 연결된 API 서버 실행
+
+가짜 Ollama 서버를 별도 프로세스로 띄우고, Google 클라이언트를 가짜 모델로 바꾼 뒤
+app.py를 실행합니다. 부하 생성은 benchmark.load로 합니다.
+
+사용법:
+    python -m benchmark.serve --port 2188 --ollama-port 11435 --token-rate 50 --latency lognormal:0.2:0.5
+"""
+
+import os
+import argparse
+import multiprocessing
+import uvicorn
+from benchmark.fake_ollama import add_backend_arguments, backend_config, create_app
+
+def run_fake_ollama(config, host, port):
+    uvicorn.run(create_app(config), host=host, port=port, log_level="warning")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="가짜 백엔드로 API 서버 실행")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2188)
+    parser.add_argument("--ollama-port", type=int, default=11435)
+    add_backend_arguments(parser)
+    args = parser.parse_args()
+    config = backend_config(args)
+
+    fake_ollama = multiprocessing.Process(
+        target=run_fake_ollama, args=(config, args.host, args.ollama_port), daemon=True
+    )
+    fake_ollama.start()
+
+    # 설정 모듈을 불러오기 전에 환경 변수를 지정해야 적용됨
+    os.environ["OLLAMA_BASE_URL"] = f"http://{args.host}:{args.ollama_port}"
+    os.environ.setdefault("GOOGLE_API_KEY", "fake")
+
+    from benchmark import fake_google
+    fake_google.install(config)
+    from app import app
+
+    try:
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    finally:
+        fake_ollama.terminate()
@@ -0,0 +1,97 @@
+"""
+서버 시작 시간 벤치마크
+
+새 프로세스에서 다음을 측정하여 JSON으로 출력합니다.
+- import_seconds: `import app`에 걸린 시간
+- listen_seconds: 프로세스 시작부터 /api/health가 응답할 때까지
+- ready_seconds: 프로세스 시작부터 /api/ready가 200을 반환할 때까지
+- first_request_seconds / second_request_seconds: 준비 완료 직후 첫 번째/두 번째 /api/generate 응답 시간
+
+서버는 benchmark.serve로 가짜 백엔드에 연결하여 실행합니다.
+
+사용법:
+    python -m benchmark.startup --runs 3 --output startup.json
+    python -m benchmark.startup --runs 3 --no-fast-start   # 준비 작업을 시작 시점에 모두 끝내는 방식과 비교
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import httpx
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+
+def measure_import(env):
+    output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], env=env, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+def wait_until(url, started, timeout, ok_status=200):
+    """url이 ok_status를 반환할 때까지 대기하고 started부터 걸린 시간 반환"""
+    while time.perf_counter() - started < timeout:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == ok_status:
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.02)
+    raise TimeoutError(f"{url} 응답 대기 시간 초과")
+
+def timed_generate(base_url, prompt):
+    started = time.perf_counter()
+    response = httpx.post(f"{base_url}/api/generate", json={
+        "prompt": prompt, "model": "gemma3:4b", "service": "ollama", "bypass_cache": True
+    }, timeout=60)
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+def measure_server(args, env):
+    base_url = f"http://127.0.0.1:{args.port}"
+    command = [
+        sys.executable, "-m", "benchmark.serve",
+        "--port", str(args.port), "--ollama-port", str(args.ollama_port),
+        "--token-rate", "0", "--latency", "fixed:0"
+    ]
+    started = time.perf_counter()
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        result = {
+            "listen_seconds": wait_until(f"{base_url}/api/health", started, args.timeout),
+            "ready_seconds": wait_until(f"{base_url}/api/ready", started, args.timeout),
+        }
+        result["first_request_seconds"] = timed_generate(base_url, "걷는 애니메이션을 만들어줘")
+        result["second_request_seconds"] = timed_generate(base_url, "뛰는 애니메이션을 만들어줘")
+        return result
+    finally:
+        process.terminate()
+        process.wait()
+
+def summarize(runs):
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="서버 시작 시간 벤치마크")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=2289)
+    parser.add_argument("--ollama-port", type=int, default=11436)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--no-fast-start", dest="fast_start", action="store_false")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    env = {**os.environ, "FAST_START": "true" if args.fast_start else "false"}
+    runs = []
+    for _ in range(args.runs):
+        run = {"import_seconds": measure_import(env)}
+        run.update(measure_server(args, env))
+        runs.append(run)
+
+    report = {"fast_start": args.fast_start, "median": summarize(runs), "runs": runs}
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
@@ -0,0 +1,45 @@
+"""
+로컬 게임 리소스 요청 분류기 학습/평가 스크립트
+
+사용법 (저장소 루트에서 실행):
+    python -m scripts.classifier export --output samples.jsonl   # Redis에 기록된 LLM 분류 결과 내보내기
+    python -m scripts.classifier train --data samples.jsonl      # 모델 학습 후 CLASSIFIER_MODEL_PATH에 저장
+    python -m scripts.classifier evaluate --data samples.jsonl   # 규칙/모델/결합 분류기 오프라인 평가
+"""
+
+import os
+import json
+import argparse
+
+from agent.classifier import SAMPLES_KEY, LinearClassifier, load_samples, evaluate
+from agent.conf.config import CLASSIFIER_MODEL_PATH, get_redis_client
+
+def export_samples(output: str):
+    """Redis에 기록된 분류 샘플을 JSONL 파일로 저장"""
+    redis_client = get_redis_client()
+    if redis_client is None:
+        raise SystemExit("Redis에 연결할 수 없습니다.")
+    samples = redis_client.lrange(SAMPLES_KEY, 0, -1)
+    with open(output, "w", encoding="utf-8") as f:
+        for sample in samples:
+            f.write(sample + "\n")
+    print(f"{len(samples)}개 샘플 저장: {output}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="로컬 게임 리소스 요청 분류기")
+    parser.add_argument("command", choices=["export", "train", "evaluate"])
+    parser.add_argument("--data", help="JSONL 샘플 파일 ({\"question\": ..., \"label\": ...})")
+    parser.add_argument("--output", default="classifier_samples.jsonl")
+    parser.add_argument("--model", default=CLASSIFIER_MODEL_PATH)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_samples(args.output)
+    elif args.command == "train":
+        questions, labels = load_samples(args.data)
+        LinearClassifier.train(questions, labels).save(args.model)
+        print(f"{len(questions)}개 샘플로 학습한 모델 저장: {args.model}")
+    else:
+        questions, labels = load_samples(args.data)
+        model = LinearClassifier.load(args.model) if os.path.exists(args.model) else None
+        print(json.dumps(evaluate(questions, labels, model), ensure_ascii=False, indent=2))
@@ -0,0 +1,102 @@
+"""
+작업 출력 압축 사전 학습과 저장 크기 통계 스크립트
+
+사용법 (저장소 루트에서 실행):
+    python -m scripts.task_blobs train --limit 2000    # 최근 작업 출력으로 zstd 사전을 학습해 TASK_BLOB_DICT_DIR에 저장
+    python -m scripts.task_blobs stats --limit 1000    # 최근 작업의 원본/압축 크기와 보존 개수별 예상 메모리
+
+새 사전은 서버를 다시 시작하면 사용합니다. 이전 사전으로 압축한 기록이 만료(TASK_HISTORY_TTL)될 때까지
+이전 사전 파일을 지우지 마세요.
+"""
+
+import os
+import json
+import argparse
+import zstandard
+from redis.client import NEVER_DECODE
+
+from agent.conf.config import TASK_BLOB_DICT_DIR, TASK_BLOB_LEVEL, TASK_HISTORY_MAX_ENTRIES, get_redis_client
+from agent.task_history import INDEX_KEY, blob_key
+from agent.task_blobs import BLOB_FIELDS, codec
+
+def recent_outputs(redis_client, limit: int):
+    """최근 작업의 압축 출력을 (작업 ID, 필드, 저장 값) 목록으로 반환"""
+    task_ids = redis_client.zrevrange(INDEX_KEY, 0, limit - 1)
+    pipe = redis_client.pipeline(transaction=False)
+    for task_id in task_ids:
+        pipe.execute_command("HMGET", blob_key(task_id), *BLOB_FIELDS, **{NEVER_DECODE: True})
+    rows = []
+    for task_id, values in zip(task_ids, pipe.execute()):
+        rows += [(task_id, name, data) for name, data in zip(BLOB_FIELDS, values) if data is not None]
+    return task_ids, rows
+
+def train(redis_client, limit: int, size: int):
+    """최근 작업 출력으로 사전을 학습해 저장"""
+    _, rows = recent_outputs(redis_client, limit)
+    samples = []
+    for task_id, name, data in rows:
+        try:
+            samples.append(codec.decompress(data).encode("utf-8"))
+        except (ValueError, zstandard.ZstdError) as e:
+            print(f"건너뜀 ({task_id} {name}): {str(e)}")
+    if not samples:
+        raise SystemExit("학습할 작업 출력이 없습니다.")
+
+    try:
+        dictionary = zstandard.train_dictionary(size, samples, level=TASK_BLOB_LEVEL)
+    except zstandard.ZstdError as e:
+        raise SystemExit(f"사전 학습 실패 (샘플 {len(samples)}개, 더 많은 작업이 필요할 수 있음): {str(e)}")
+
+    os.makedirs(TASK_BLOB_DICT_DIR, exist_ok=True)
+    path = os.path.join(TASK_BLOB_DICT_DIR, f"{dictionary.dict_id()}.dict")
+    with open(path, "wb") as f:
+        f.write(dictionary.as_bytes())
+
+    # 학습한 사전으로 다시 압축했을 때의 크기 비교
+    compressor = zstandard.ZstdCompressor(level=TASK_BLOB_LEVEL, dict_data=dictionary)
+    raw = sum(len(sample) for sample in samples)
+    stored = sum(min(len(compressor.compress(sample)), len(sample)) + 1 for sample in samples)
+    print(f"{len(samples)}개 출력으로 학습한 사전 저장: {path} (ID {dictionary.dict_id()}, {len(dictionary.as_bytes())}바이트)")
+    print(f"학습 샘플 압축률: {stored / raw:.3f} (원본 {raw}바이트 -> {stored}바이트)")
+
+def stats(redis_client, limit: int):
+    """최근 작업의 필드별 원본/저장 크기와 보존 개수별 예상 메모리"""
+    task_ids, rows = recent_outputs(redis_client, limit)
+    fields = {name: {"count": 0, "raw_bytes": 0, "stored_bytes": 0} for name in BLOB_FIELDS}
+    for task_id, name, data in rows:
+        try:
+            raw = len(codec.decompress(data).encode("utf-8"))
+        except (ValueError, zstandard.ZstdError):
+            continue
+        fields[name]["count"] += 1
+        fields[name]["raw_bytes"] += raw
+        fields[name]["stored_bytes"] += len(data)
+
+    stored = sum(field["stored_bytes"] for field in fields.values())
+    raw = sum(field["raw_bytes"] for field in fields.values())
+    per_task = stored / len(task_ids) if task_ids else 0
+    total = redis_client.zcard(INDEX_KEY)
+    print(json.dumps({
+        "sampled_tasks": len(task_ids),
+        "fields": fields,
+        "ratio": round(stored / raw, 3) if raw else None,
+        "stored_bytes_per_task": round(per_task),
+        "indexed_tasks": total,
+        "estimated_stored_bytes": round(per_task * total),
+        "estimated_stored_bytes_at_max_entries": round(per_task * TASK_HISTORY_MAX_ENTRIES),
+    }, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="작업 출력 압축 사전과 저장 크기")
+    parser.add_argument("command", choices=["train", "stats"])
+    parser.add_argument("--limit", type=int, default=2000, help="사용할 최근 작업 수")
+    parser.add_argument("--size", type=int, default=64 * 1024, help="사전 크기 (바이트)")
+    args = parser.parse_args()
+
+    redis_client = get_redis_client()
+    if redis_client is None:
+        raise SystemExit("Redis에 연결할 수 없습니다.")
+    if args.command == "train":
+        train(redis_client, args.limit, args.size)
+    else:
+        stats(redis_client, args.limit)
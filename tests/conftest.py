@@ -0,0 +1,17 @@
+import os
+import sys
+import pytest
+import fakeredis
+
+# 저장소 루트의 agent, agent_manager 등을 불러올 수 있도록 경로 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.conf import config
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """공유 비동기 Redis 클라이언트(get_async_redis_client)를 fakeredis로 교체"""
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(config, "async_redis_client", redis_client)
+    config.redis_breaker.record_success()
+    return redis_client
@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from agent.admission import AdmissionController, AdmissionRejected
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_cancelled_waiter_after_handoff_returns_slot():
+    async def scenario():
+        controller = AdmissionController("test", max_concurrency=1, max_queue=4, queue_timeout=5)
+
+        async def use():
+            async with controller.slot():
+                await asyncio.sleep(0.01)
+
+        await controller.acquire()
+        waiter = asyncio.create_task(use())
+        await asyncio.sleep(0)
+        # 슬롯을 넘겨받은 대기 요청이 재개되기 전에 취소됨 (클라이언트 연결 종료 등)
+        controller.release()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert controller.active == 0
+        # 이후 요청은 기다리지 않고 바로 슬롯을 받음
+        await asyncio.wait_for(controller.acquire(), 0.1)
+        assert controller.active == 1
+
+    run(scenario())
+
+def test_cancelled_waiter_before_handoff_is_skipped():
+    async def scenario():
+        controller = AdmissionController("test", max_concurrency=1, max_queue=4, queue_timeout=5)
+        await controller.acquire()
+        cancelled = asyncio.create_task(controller.acquire())
+        second = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+
+        controller.release()
+        await asyncio.wait_for(second, 0.1)
+        assert controller.active == 1
+        assert controller.queue_depth == 0
+
+    run(scenario())
+
+def test_queue_timeout_rejects_with_503_and_keeps_capacity():
+    async def scenario():
+        controller = AdmissionController("test", max_concurrency=1, max_queue=4, queue_timeout=0.05)
+        await controller.acquire()
+        with pytest.raises(AdmissionRejected) as error:
+            await controller.acquire()
+        assert error.value.status_code == 503
+        assert controller.stats["rejected_timeout"] == 1
+
+        controller.release()
+        assert controller.active == 0
+        assert controller.queue_depth == 0
+
+    run(scenario())
+
+def test_full_queue_rejects_with_429():
+    async def scenario():
+        controller = AdmissionController("test", max_concurrency=1, max_queue=1, queue_timeout=5)
+        await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as error:
+            await controller.acquire()
+        assert error.value.status_code == 429
+
+        controller.release()
+        await waiter
+        controller.release()
+        assert controller.active == 0
+
+    run(scenario())
+
+def test_priority_order():
+    async def scenario():
+        controller = AdmissionController("test", max_concurrency=1, max_queue=4, queue_timeout=5)
+        await controller.acquire()
+        order = []
+
+        async def wait(priority):
+            await controller.acquire(priority)
+            order.append(priority)
+            controller.release()
+
+        tasks = [asyncio.create_task(wait(priority)) for priority in ("low", "normal", "high")]
+        await asyncio.sleep(0)
+        controller.release()
+        await asyncio.gather(*tasks)
+        assert order == ["high", "normal", "low"]
+        assert controller.active == 0
+
+    run(scenario())
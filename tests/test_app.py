@@ -0,0 +1,25 @@
+import pytest
+from fastapi.testclient import TestClient
+import app
+import agent_manager
+
+@pytest.fixture
+def profiled(monkeypatch):
+    """generate_with_gemma3에 전달된 profile 값 기록"""
+    calls = []
+    async def generate(**kwargs):
+        calls.append(kwargs["profile"])
+        return {"response": "답변"}
+    monkeypatch.setattr(agent_manager, "generate_with_gemma3", generate)
+    monkeypatch.setattr(app, "CANCEL_ON_DISCONNECT", False)
+    return calls
+
+@pytest.mark.parametrize("allowed", [False, True])
+def test_request_profiling_requires_config(monkeypatch, profiled, allowed):
+    monkeypatch.setattr(app, "TRACE_PROFILE_ALLOWED", allowed)
+    client = TestClient(app.app)
+    body = {"prompt": "검 모델 만들어줘", "service": "ollama", "model": "gemma3:4b"}
+
+    assert client.post("/api/generate", json=body, headers={"X-Profile": "1"}).status_code == 200
+    assert client.post("/api/generate", json={**body, "profile": True}).status_code == 200
+    assert profiled == [allowed, allowed]
@@ -0,0 +1,49 @@
+import pytest
+from agent.classifier import rule_predict, extract_details
+
+@pytest.mark.parametrize("question", [
+    "판타지 드래곤 주세요",
+    "low-poly tree asset",
+    "오늘 날씨 어때",
+    "소설 캐릭터 만들어줘",
+    "자동차 모델 만들어줘",
+    "python으로 animation 만들어줘",
+])
+def test_uncertain_questions_fall_back(question):
+    assert rule_predict(question) is None
+
+@pytest.mark.parametrize("question", [
+    "언어 모델을 만들어줘",
+    "make a data model",
+    "파이썬 코드 만들어줘",
+    "모델 학습 코드 짜줘",
+])
+def test_off_topic_requests_are_rejected(question):
+    prediction = rule_predict(question)
+    assert prediction is not None
+    assert prediction.resource_type == "other"
+    assert not prediction.is_game_resource_request
+
+@pytest.mark.parametrize("question, resource_type", [
+    ("3D 캐릭터 모델 만들어줘", "3d_model"),
+    ("3D모델 만들어줘", "3d_model"),
+    ("make a 3d model of a sword", "3d_model"),
+    ("유니티용 무기 소품 제작해줘", "3d_model"),
+    ("걷는 애니메이션 만들어줘", "animation"),
+    ("create a walk cycle animation", "animation"),
+])
+def test_explicit_requests(question, resource_type):
+    prediction = rule_predict(question)
+    assert prediction is not None
+    assert prediction.resource_type == resource_type
+    assert prediction.confidence >= 0.9
+
+def test_keywords_match_token_start_only():
+    # 단어 중간의 키워드는 무시 ("프로게임단"의 "게임", "a13d"의 "3d")
+    assert rule_predict("프로게임단 로고 만들어줘") is None
+    assert rule_predict("a13d code를 만들어줘").resource_type == "other"
+
+def test_extract_details():
+    assert extract_details("로우폴리 나무 에셋을 만들어 주세요.", "3d_model") == {"대상": "로우폴리 나무 에셋", "스타일": "로우폴리"}
+    assert extract_details("걷는 애니메이션 만들어줘", "animation") == {"대상": "걷는 애니메이션", "동작": "걷는"}
+    assert extract_details("make a 3d model of a sword", "3d_model") == {"대상": "a 3d model of a sword"}
@@ -0,0 +1,25 @@
+from types import SimpleNamespace
+import pytest
+from agent import runtime
+from agent.runtime import RuntimeKey, rebuild_runtimes
+
+@pytest.fixture
+def registry(monkeypatch):
+    """그래프 컴파일 없이 키만 가진 런타임으로 레지스트리 교체"""
+    monkeypatch.setattr(runtime, "_runtimes", {})
+    monkeypatch.setattr(runtime, "AgentRuntime", lambda key: SimpleNamespace(key=key))
+    monkeypatch.setattr("agent.llm.clear_llm_cache", lambda model_name=None: None)
+    return runtime._runtimes
+
+def test_rebuild_keeps_provider(registry):
+    ollama = RuntimeKey("gemma3:4b")
+    google = RuntimeKey(runtime.GOOGLE_MODEL, provider="google")
+    registry.update({ollama: "old", google: "old"})
+
+    assert rebuild_runtimes(provider="google") == [{"model": runtime.GOOGLE_MODEL, "provider": "google"}]
+    assert registry[google].key == google
+    assert registry[ollama] == "old"
+
+def test_rebuild_unregistered_google_model_uses_google(registry):
+    assert rebuild_runtimes(runtime.GOOGLE_MODEL) == [{"model": runtime.GOOGLE_MODEL, "provider": "google"}]
+    assert rebuild_runtimes("llama3") == [{"model": "llama3", "provider": "ollama"}]
@@ -0,0 +1,122 @@
+import asyncio
+import pytest
+from agent import singleflight
+from agent.singleflight import SingleFlight
+
+def run(coro):
+    return asyncio.run(coro)
+
+@pytest.fixture(autouse=True)
+def local_only(monkeypatch):
+    """프로세스 안의 요청 합치기만 확인 (Redis 락 사용 안 함)"""
+    monkeypatch.setattr(singleflight, "SINGLE_FLIGHT_ENABLED", True)
+    monkeypatch.setattr(singleflight, "SINGLE_FLIGHT_DISTRIBUTED", False)
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"response": "답변"}
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", generate) for _ in range(5)))
+
+    results = run(scenario())
+    assert len(calls) == 1
+    assert [result for result, _ in results] == [{"response": "답변"}] * 5
+    assert sorted(shared for _, shared in results) == [False] + [True] * 4
+    assert flight.stats["coalesced"] == 4
+    assert flight.snapshot()["inflight"] == 0
+
+def test_first_caller_cancel_keeps_execution_for_others():
+    flight = SingleFlight()
+
+    async def generate():
+        await asyncio.sleep(0.05)
+        return "답변"
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.do("key", generate))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flight.do("key", generate))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == ("답변", True)
+        assert first.cancelled()
+
+    run(scenario())
+    assert flight.stats["cancelled"] == 0
+
+def test_execution_cancelled_when_every_caller_leaves():
+    flight = SingleFlight()
+    finished = []
+
+    async def generate():
+        await asyncio.sleep(1)
+        finished.append(1)
+
+    async def scenario():
+        callers = [asyncio.ensure_future(flight.do("key", generate)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert flight.snapshot()["inflight"] == 0
+
+    run(scenario())
+    assert not finished
+    assert flight.stats["cancelled"] == 1
+
+def test_error_is_shared_and_not_cached():
+    flight = SingleFlight()
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("backend down")
+
+    async def scenario():
+        results = await asyncio.gather(*(flight.do("key", generate) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        # 실패한 실행은 남지 않으므로 다음 요청은 다시 실행
+        await asyncio.gather(flight.do("key", generate), return_exceptions=True)
+
+    run(scenario())
+    assert len(calls) == 2
+
+def test_result_returned_when_redis_publish_fails(monkeypatch, fake_redis):
+    monkeypatch.setattr(singleflight, "SINGLE_FLIGHT_DISTRIBUTED", True)
+    async def get_client():
+        return fake_redis
+    monkeypatch.setattr(singleflight, "get_async_redis_client", get_client)
+
+    # 결과 공유(파이프라인)와 락 해제가 모두 실패하는 Redis
+    pipeline = fake_redis.pipeline
+    def broken_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        async def execute(raise_on_error=True):
+            raise ConnectionError("Redis 연결 끊김")
+        pipe.execute = execute
+        return pipe
+    async def broken_eval(*args):
+        raise ConnectionError("Redis 연결 끊김")
+    monkeypatch.setattr(fake_redis, "pipeline", broken_pipeline)
+    monkeypatch.setattr(fake_redis, "eval", broken_eval)
+
+    flight = SingleFlight()
+
+    async def generate():
+        await asyncio.sleep(0.01)
+        return {"response": "답변"}
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", generate) for _ in range(3)))
+
+    results = run(scenario())
+    assert [result for result, _ in results] == [{"response": "답변"}] * 3
+    assert flight.stats["executions"] == 1
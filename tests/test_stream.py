@@ -0,0 +1,39 @@
+import asyncio
+import pytest
+import agent_manager
+
+def run(coro):
+    return asyncio.run(coro)
+
+@pytest.fixture
+def statuses(monkeypatch):
+    """update_task_status 호출 기록"""
+    calls = []
+    monkeypatch.setattr(agent_manager, "update_task_status", lambda task_id, status, *args: calls.append((status, *args)))
+    return calls
+
+def backend(*events):
+    async def stream(prompt, model):
+        for event in events:
+            yield event
+    return stream
+
+async def collect(**kwargs):
+    return [event async for event in agent_manager._stream("t1", "프롬프트", "gemma3:4b", "ollama", False, "normal", **kwargs)]
+
+@pytest.mark.parametrize("events", [(), ({"event": "token", "text": "답"},)])
+def test_stream_without_done_event_ends_with_error(monkeypatch, statuses, events):
+    monkeypatch.setattr(agent_manager, "stream_with_ollama", backend(*events))
+
+    received = run(collect())
+    assert received[:-1] == list(events)
+    assert received[-1]["event"] == "error"
+    assert received[-1]["task_id"] == "t1"
+    assert statuses == [("failed", received[-1]["error"])]
+
+def test_stream_without_done_event_not_recorded_before_failover(monkeypatch, statuses):
+    monkeypatch.setattr(agent_manager, "stream_with_ollama", backend())
+
+    received = run(collect(record_errors=False))
+    assert [event["event"] for event in received] == ["error"]
+    assert statuses == []
@@ -0,0 +1,56 @@
+import os
+import pytest
+import zstandard
+from agent.task_blobs import BlobCodec, RAW, ZSTD
+
+SAMPLES = [
+    f"{name} 캐릭터 모델을 블렌더에서 만들고 리깅한 뒤 {motion} 애니메이션을 적용합니다. 단계 {i}"
+    for i, (name, motion) in enumerate([("기사", "걷기"), ("마법사", "달리기"), ("궁수", "공격")] * 100)
+]
+
+def train(dict_dir, size=2048):
+    os.makedirs(dict_dir, exist_ok=True)
+    trained = zstandard.train_dictionary(size, [sample.encode("utf-8") for sample in SAMPLES])
+    path = os.path.join(dict_dir, f"{trained.dict_id()}.dict")
+    with open(path, "wb") as f:
+        f.write(trained.as_bytes())
+    return trained.dict_id()
+
+def test_round_trip_without_dictionary(tmp_path):
+    codec = BlobCodec(dict_dir=str(tmp_path / "none"))
+    text = "게임 리소스 제작 답변입니다. " * 50
+    stored = codec.compress(text)
+    assert stored[:1] == ZSTD
+    assert len(stored) < len(text.encode("utf-8"))
+    assert codec.decompress(stored) == text
+
+def test_short_value_is_stored_raw(tmp_path):
+    codec = BlobCodec(dict_dir=str(tmp_path / "none"))
+    stored = codec.compress("검")
+    assert stored == RAW + "검".encode("utf-8")
+    assert codec.decompress(stored) == "검"
+
+def test_round_trip_with_dictionary(tmp_path):
+    dict_dir = str(tmp_path / "dicts")
+    dict_id = train(dict_dir)
+    codec = BlobCodec(dict_dir=dict_dir)
+    text = "용사 캐릭터 모델을 블렌더에서 만들고 리깅한 뒤 점프 애니메이션을 적용합니다."
+    stored = codec.compress(text)
+    assert codec.dict_id == dict_id
+    assert stored[:1] == ZSTD
+    assert zstandard.get_frame_parameters(stored[1:]).dict_id == dict_id
+
+    # 새 프로세스처럼 사전을 다시 읽어 복원
+    assert BlobCodec(dict_dir=dict_dir).decompress(stored) == text
+
+def test_missing_dictionary_raises(tmp_path):
+    dict_dir = str(tmp_path / "dicts")
+    train(dict_dir)
+    stored = BlobCodec(dict_dir=dict_dir).compress(SAMPLES[0])
+
+    with pytest.raises(ValueError):
+        BlobCodec(dict_dir=str(tmp_path / "empty")).decompress(stored)
+
+def test_unknown_marker_raises(tmp_path):
+    with pytest.raises(ValueError):
+        BlobCodec(dict_dir=str(tmp_path / "none")).decompress(b"x" + b"payload")
@@ -0,0 +1,132 @@
+import asyncio
+import pytest
+import fakeredis
+from agent import task_history
+from agent.task_history import update_task, update_tasks, query_tasks, decode_cursor, encode_cursor, INDEX_KEY
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def collect(redis_client, **kwargs):
+    """next_cursor가 없을 때까지 모든 페이지를 읽어 task_id 목록 반환"""
+    seen, cursor = [], None
+    while True:
+        page = await query_tasks(redis_client, cursor=cursor, **kwargs)
+        seen += [task["task_id"] for task in page["tasks"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return seen
+
+def test_pagination_with_tied_scores_returns_every_task():
+    async def scenario():
+        redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        # 배치 요청처럼 같은 시각에 만들어진 작업
+        for i in range(300):
+            await update_task(redis_client, f"t{i:03d}", {"task_id": f"t{i:03d}", "status": "completed"}, now=1000.0)
+
+        seen = await collect(redis_client, limit=50)
+        assert len(seen) == 300
+        assert len(set(seen)) == 300
+
+        by_status = await collect(redis_client, status="completed", limit=50)
+        assert sorted(by_status) == sorted(seen)
+
+    run(scenario())
+
+def test_pagination_across_mixed_scores():
+    async def scenario():
+        redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        for i in range(120):
+            # 3개씩 같은 시각
+            await update_task(redis_client, f"t{i:03d}", {"task_id": f"t{i:03d}", "status": "requested"}, now=1000.0 + i // 3)
+
+        seen = await collect(redis_client, limit=7)
+        assert len(seen) == len(set(seen)) == 120
+        created = [await redis_client.zscore(INDEX_KEY, task_id) for task_id in seen]
+        assert created == sorted(created, reverse=True)
+
+    run(scenario())
+
+def test_pagination_with_filter_scan_limit():
+    async def scenario():
+        redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        for i in range(200):
+            model = "gemma3:4b" if i % 10 == 0 else "other"
+            await update_task(redis_client, f"t{i:03d}", {"task_id": f"t{i:03d}", "status": "completed", "model": model}, now=1000.0)
+
+        # status 색인을 훑고 model은 기록으로 거르므로, 한 번에 훑는 개수가 작으면 여러 페이지에 나뉨
+        seen, cursor = [], None
+        while True:
+            page = await query_tasks(redis_client, status="completed", model="gemma3:4b", limit=50, cursor=cursor, max_scan=30)
+            seen += [task["task_id"] for task in page["tasks"]]
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        assert sorted(seen) == [f"t{i:03d}" for i in range(0, 200, 10)]
+
+    run(scenario())
+
+def test_status_change_moves_index():
+    async def scenario():
+        redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        await update_task(redis_client, "a", {"task_id": "a", "status": "queued", "model": "m"}, now=1000.0)
+        await update_task(redis_client, "a", {"status": "completed"}, now=1004.0)
+
+        assert await redis_client.zscore("tasks:index:status:queued", "a") is None
+        assert await redis_client.zscore("tasks:index:status:completed", "a") == 1000.0
+        assert await redis_client.zscore("tasks:duration", "a") == 4.0
+        record = await redis_client.hgetall("task:a")
+        assert record["created_ts"] == "1000.0"
+
+    run(scenario())
+
+@pytest.mark.parametrize("cursor", ["abc:1", "1.0:x", "1.0:-1", "1.0"])
+def test_decode_cursor_rejects_invalid(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(1712345678.123456, 42)) == (1712345678.123456, 42)
+
+def test_batch_updates_for_same_task_apply_in_order():
+    async def scenario():
+        redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        await update_tasks(redis_client, [
+            ("a", {"task_id": "a", "status": "requested", "model": "auto", "service": "auto"}, 1000.0),
+            ("a", {"model": "gemma3:4b", "service": "ollama"}, 1001.0),
+            ("a", {"status": "completed", "response": "답변"}, 1003.0),
+            ("b", {"task_id": "b", "status": "requested", "model": "auto"}, 1002.0),
+        ])
+
+        assert await redis_client.zrange("tasks:index:status:completed", 0, -1) == ["a"]
+        assert await redis_client.zrange("tasks:index:status:requested", 0, -1) == ["b"]
+        assert await redis_client.zrange("tasks:index:model:auto", 0, -1) == ["b"]
+        assert await redis_client.zrange("tasks:index:model:gemma3:4b", 0, -1) == ["a"]
+        assert await redis_client.zscore("tasks:duration", "a") == 3.0
+        assert await redis_client.smembers("tasks:indexes") == {
+            "tasks:index:status:requested", "tasks:index:status:completed", "tasks:index:model:auto",
+            "tasks:index:model:gemma3:4b", "tasks:index:service:auto", "tasks:index:service:ollama",
+        }
+
+    run(scenario())
+
+def test_update_retries_when_record_changed_elsewhere():
+    async def scenario():
+        redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        await update_task(redis_client, "a", {"task_id": "a", "status": "queued"}, now=1000.0)
+        # 읽은 뒤 다른 워커가 상태를 바꾼 경우처럼, 기록과 다른 이전 값으로 실행
+        await task_history._update_one(redis_client, "a", {"status": "completed"}, 1002.0, old=["running", "", ""])
+
+        assert await redis_client.zscore("tasks:index:status:queued", "a") is None
+        assert await redis_client.zscore("tasks:index:status:completed", "a") == 1000.0
+        assert (await redis_client.hgetall("task:a"))["status"] == "completed"
+
+    run(scenario())
+
+def test_script_declares_every_key():
+    keys, _ = task_history._script_args("a", {"status": "completed", "model": "m"}, ["running", "m", ""], 1.0)
+    assert keys == [
+        "task:a", "task:a:blobs", "tasks:index", "tasks:duration", "tasks:indexes",
+        "tasks:index:status:running", "tasks:index:model:m", "tasks:index",
+        "tasks:index:status:completed", "tasks:index:model:m", "tasks:index",
+    ]
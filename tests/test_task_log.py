@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import asyncio
+from agent import task_log
+from agent.task_log import TaskLogWriter
+
+def run(coro):
+    return asyncio.run(coro)
+
+def use_redis(monkeypatch, redis_client):
+    """작성기가 쓰는 Redis 클라이언트 교체 (None이면 Redis를 사용할 수 없는 상태)"""
+    async def get_client():
+        return redis_client
+    monkeypatch.setattr(task_log, "get_async_redis_client", get_client)
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def task_op(task_id, **fields):
+    # 보존 기간 안의 시각이어야 기록 후 색인 정리에서 지워지지 않음
+    return {"type": "task", "task_id": task_id, "fields": {"task_id": task_id, "status": "completed", **fields}, "ts": time.time()}
+
+def test_spilled_ops_are_replayed_when_redis_returns(monkeypatch, tmp_path, fake_redis):
+    spill_path = str(tmp_path / "spill.jsonl")
+    writer = TaskLogWriter(spill_path=spill_path)
+
+    async def scenario():
+        use_redis(monkeypatch, None)
+        await writer._flush([task_op("a"), {"type": "hset", "key": "trace:a", "mapping": {"node": "answer"}}])
+        assert len(read_lines(spill_path)) == 2
+
+        use_redis(monkeypatch, fake_redis)
+        await writer._flush([task_op("b")])
+        assert not os.path.exists(spill_path)
+        assert not os.path.exists(f"{spill_path}.replay")
+        assert await fake_redis.zrange("tasks:index:status:completed", 0, -1) == ["a", "b"]
+        assert await fake_redis.hgetall("trace:a") == {"node": "answer"}
+
+    run(scenario())
+    assert writer.stats["spilled"] == 2
+    assert writer.stats["replayed"] == 2
+
+def test_bad_op_is_quarantined_without_blocking_others(monkeypatch, tmp_path, fake_redis):
+    spill_path = str(tmp_path / "spill.jsonl")
+    writer = TaskLogWriter(spill_path=spill_path, max_attempts=2)
+    use_redis(monkeypatch, fake_redis)
+
+    async def scenario():
+        await fake_redis.set("trace:x", "string")
+        bad = [
+            {"type": "hset", "key": "trace:x", "mapping": {"node": "answer"}},  # WRONGTYPE
+            task_op("c", details={"대상": "검"}),  # Redis에 쓸 수 없는 값
+        ]
+        await writer._flush([task_op("a"), *bad])
+        assert await fake_redis.zrange("tasks:index:status:completed", 0, -1) == ["a"]
+        assert [op["attempts"] for op in read_lines(spill_path)] == [1, 1]
+
+        # 다음 기록 때 재전송에서 다시 실패하면 .bad로 옮기고 재전송 파일은 비움
+        await writer._flush([task_op("b")])
+        assert await fake_redis.zrange("tasks:index:status:completed", 0, -1) == ["a", "b"]
+        assert not os.path.exists(spill_path)
+        assert not os.path.exists(f"{spill_path}.replay")
+        assert [op["attempts"] for op in read_lines(f"{spill_path}.bad")] == [2, 2]
+
+    run(scenario())
+    assert writer.stats["quarantined"] == 2
+
+def test_unreadable_spill_line_is_quarantined(monkeypatch, tmp_path, fake_redis):
+    spill_path = str(tmp_path / "spill.jsonl")
+    with open(spill_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(task_op("a")) + "\n{broken\n")
+    writer = TaskLogWriter(spill_path=spill_path)
+    use_redis(monkeypatch, fake_redis)
+
+    run(writer._replay_spill(fake_redis))
+    assert run(fake_redis.hget("task:a", "status")) == "completed"
+    with open(f"{spill_path}.bad", encoding="utf-8") as f:
+        assert f.read() == "{broken\n"
+
+def test_rename_failure_does_not_stop_writer(monkeypatch, tmp_path, fake_redis):
+    spill_path = str(tmp_path / "spill.jsonl")
+    writer = TaskLogWriter(spill_path=spill_path)
+    writer._spill([task_op("a")])
+    use_redis(monkeypatch, fake_redis)
+
+    def fail_replace(src, dst):
+        raise OSError("read-only file system")
+    monkeypatch.setattr(task_log.os, "replace", fail_replace)
+
+    async def scenario():
+        writer.start()
+        writer.submit(task_op("b"))
+        await asyncio.sleep(0.2)
+        assert not writer._task.done()
+        writer.submit(task_op("c"))
+        await writer.stop()
+
+    run(scenario())
+    assert writer.stats["written"] == 2
+    assert len(read_lines(spill_path)) == 1
+
+def test_unreadable_line_is_quarantined_once_when_replay_is_retried(monkeypatch, tmp_path, fake_redis):
+    spill_path = str(tmp_path / "spill.jsonl")
+    with open(spill_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(task_op("a")) + "\n{broken\n")
+    writer = TaskLogWriter(spill_path=spill_path)
+
+    write = writer._write
+    async def unavailable(redis_client, batch):
+        raise ConnectionError("Redis 연결 끊김")
+    monkeypatch.setattr(writer, "_write", unavailable)
+    run(writer._replay_spill(fake_redis))
+    monkeypatch.setattr(writer, "_write", write)
+    run(writer._replay_spill(fake_redis))
+
+    assert run(fake_redis.hget("task:a", "status")) == "completed"
+    assert not os.path.exists(f"{spill_path}.replay")
+    with open(f"{spill_path}.bad", encoding="utf-8") as f:
+        assert f.read() == "{broken\n"
+    assert writer.stats["quarantined"] == 1
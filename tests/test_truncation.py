@@ -0,0 +1,63 @@
+import uuid
+import asyncio
+from types import SimpleNamespace
+from langchain_core.outputs import Generation, LLMResult
+from agent.callbacks import ollama_usage_handler
+from agent.cancellation import track_generation
+from agent.llm import GoogleGenerativeLLM
+from agent.metrics import current_node, instrument_node
+from agent.node_cache import memoize_node, local_cache
+
+def finish(done_reason):
+    result = LLMResult(generations=[[Generation(text="답변", generation_info={"done_reason": done_reason, "eval_count": 20})]])
+    ollama_usage_handler.on_llm_end(result, run_id=uuid.uuid4())
+
+def test_length_stop_is_reported_per_node():
+    token = current_node.set("answer_step")
+    try:
+        with track_generation("ollama") as usage:
+            finish("stop")
+            assert usage.truncated == []
+            finish("length")
+            finish("length")
+        assert usage.truncated == ["answer_step"]
+        assert usage.completion_tokens == 60
+    finally:
+        current_node.reset(token)
+
+def test_google_marks_responses_that_hit_max_output_tokens():
+    llm = GoogleGenerativeLLM(model="gemini", max_output_tokens=20)
+    usage = SimpleNamespace(prompt_token_count=5, candidates_token_count=20)
+    assert llm._generation_info(usage)["done_reason"] == "length"
+    usage.candidates_token_count = 12
+    assert "done_reason" not in llm._generation_info(usage)
+    assert "done_reason" not in GoogleGenerativeLLM(model="gemini")._generation_info(usage)
+
+def test_truncated_node_output_is_not_cached(fake_redis):
+    calls = []
+
+    @memoize_node(inputs=("question",))
+    async def think(state, config):
+        calls.append(1)
+        # 첫 호출만 생성 최대 토큰에 걸려 잘림
+        finish("length" if len(calls) == 1 else "stop")
+        return {"thoughts": f"생각 {len(calls)}"}
+
+    node = instrument_node("think", think)
+    runtime = SimpleNamespace(model_name="gemma3:4b", key=SimpleNamespace(provider="ollama"))
+    config = {"configurable": {"runtime": runtime}}
+
+    async def request():
+        with track_generation("ollama") as usage:
+            result = await node({"question": "검 모델 만들어줘"}, config)
+        return result, usage.truncated
+
+    local_cache.clear()
+    try:
+        assert asyncio.run(request()) == ({"thoughts": "생각 1"}, ["think"])
+        assert asyncio.run(request()) == ({"thoughts": "생각 2"}, [])
+        # 잘리지 않은 결과는 캐시에서 받음
+        assert asyncio.run(request()) == ({"thoughts": "생각 2"}, [])
+        assert len(calls) == 2
+    finally:
+        local_cache.clear()
@@ -0,0 +1,73 @@
+import asyncio
+import agent_manager
+import worker
+from agent import jobs
+from agent.admission import AdmissionRejected
+from agent.task_blobs import PREVIEW_CHARS
+from agent.task_log import task_log_writer
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_rejected_job_stays_queued_after_requeue(fake_redis, monkeypatch):
+    async def rejected(*args, **kwargs):
+        raise AdmissionRejected("대기열이 가득 찼습니다.", status_code=429, retry_after=0)
+
+    monkeypatch.setattr(agent_manager, "_execute", rejected)
+
+    async def scenario():
+        task_id = await jobs.enqueue_job("프롬프트", "gemma3:4b", "ollama")
+        assert await jobs.claim_job(fake_redis) == task_id
+        await worker.run_job(fake_redis, task_id)
+        # write-behind 큐에 남은 기록까지 모두 쓴 뒤에도 재등록 상태가 유지되어야 함
+        await task_log_writer.stop()
+
+        job = await jobs.get_job(task_id)
+        assert job["status"] == "queued"
+        assert job["attempts"] == "0"
+        assert await fake_redis.lrange(jobs.PENDING_KEY, 0, -1) == [task_id]
+        assert await fake_redis.zrange("tasks:index:status:rejected", 0, -1) == []
+
+    run(scenario())
+
+def test_completed_job_keeps_outputs(fake_redis, monkeypatch):
+    async def completed(*args, **kwargs):
+        return {"response": "답변", "done": True, "cache": "miss", "coalesced": False,
+                "intermediates": {"thoughts": "생각"}}
+
+    monkeypatch.setattr(agent_manager, "_execute", completed)
+
+    async def scenario():
+        task_id = await jobs.enqueue_job("프롬프트", "gemma3:4b", "ollama")
+        await jobs.claim_job(fake_redis)
+        await worker.run_job(fake_redis, task_id)
+        await task_log_writer.stop()
+
+        job = await jobs.get_job(task_id)
+        assert job["status"] == "completed"
+        outputs = await jobs.get_job_outputs(task_id)
+        assert outputs["outputs"] == {"response": "답변", "thoughts": "생각"}
+
+    run(scenario())
+
+def test_long_result_is_stored_as_preview(fake_redis, monkeypatch):
+    answer = "가" * 5000
+
+    async def completed(*args, **kwargs):
+        return {"response": answer, "done": True, "cache": "miss", "coalesced": False}
+
+    monkeypatch.setattr(agent_manager, "_execute", completed)
+
+    async def scenario():
+        task_id = await jobs.enqueue_job("프롬프트", "gemma3:4b", "ollama")
+        await jobs.claim_job(fake_redis)
+        await worker.run_job(fake_redis, task_id)
+
+        job = await jobs.get_job(task_id)
+        assert job["result"] == answer[:PREVIEW_CHARS]
+        assert job["result_truncated"] == "1"
+        outputs = await jobs.get_job_outputs(task_id, ("response",))
+        assert outputs["outputs"]["response"] == answer
+        assert outputs["stored_bytes"]["response"] < len(answer.encode("utf-8"))
+
+    run(scenario())
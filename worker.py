@@ -0,0 +1,144 @@
+"""
+작업 큐 워커 프로세스
+
+jobs:pending 대기열에서 작업을 꺼내 agent_manager.generate_with_gemma3로 실행하고 결과를 기록합니다.
+API 서버와 별도로 실행하여 워커 수를 독립적으로 조절할 수 있습니다.
+
+사용법:
+    python worker.py [--workers N] [--concurrency M]
+"""
+
+import signal
+import asyncio
+import argparse
+import multiprocessing
+
+import agent_manager
+from agent.jobs import claim_job, complete_job, get_job, heartbeat, requeue_job, requeue_stuck_jobs
+from agent.admission import AdmissionRejected
+from agent.task_log import task_log_writer
+from agent.conf.config import (
+    JOB_WORKERS, JOB_WORKER_CONCURRENCY, JOB_HEARTBEAT_INTERVAL,
+    get_async_redis_client
+)
+
+async def wait_for_redis(stop: asyncio.Event):
+    """Redis에 연결될 때까지 재시도"""
+    while not stop.is_set():
+        redis_client = await get_async_redis_client()
+        if redis_client is not None:
+            return redis_client
+        await asyncio.sleep(2)
+    return None
+
+async def keep_alive(redis_client, task_id):
+    """작업이 실행되는 동안 주기적으로 하트비트 기록"""
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+        try:
+            await heartbeat(redis_client, task_id)
+        except Exception as e:
+            print(f"하트비트 기록 실패 ({task_id}): {str(e)}")
+
+async def run_job(redis_client, task_id):
+    job = await get_job(task_id)
+    if job is None:
+        await complete_job(redis_client, task_id, "failed", "작업 정보를 찾을 수 없습니다.")
+        return
+
+    beat = asyncio.create_task(keep_alive(redis_client, task_id))
+    try:
+        result = await agent_manager.generate_with_gemma3(
+            prompt=job["prompt"],
+            model=job["model"],
+            service=job["service"],
+            use_cache=job.get("use_cache", "1") == "1",
+            task_id=task_id,
+            priority=job.get("priority", "normal"),
+            # 상태와 출력은 complete_job/requeue_job으로만 기록 (재등록한 작업이 나중에 rejected로 덮이지 않도록)
+            record_status=False
+        )
+        if "error" in result:
+            await complete_job(redis_client, task_id, "failed", result["error"])
+        else:
+            await complete_job(redis_client, task_id, "completed", result.get("response", ""), result.get("intermediates"))
+    except AdmissionRejected as e:
+        # 백엔드가 밀려 있으면 시도 횟수를 되돌리고 잠시 뒤 다시 처리
+        print(f"백엔드 대기열 초과로 작업 재등록: {task_id} ({e.retry_after}초 후)")
+        await redis_client.hincrby(f"task:{task_id}", "attempts", -1)
+        await requeue_job(redis_client, task_id)
+        await asyncio.sleep(e.retry_after)
+    finally:
+        beat.cancel()
+
+async def consume(name, redis_client, stop: asyncio.Event):
+    """대기열에서 작업을 하나씩 꺼내 실행"""
+    while not stop.is_set():
+        try:
+            task_id = await claim_job(redis_client, timeout=1.0)
+            if task_id is None:
+                continue
+            print(f"[{name}] 작업 시작: {task_id}")
+            await run_job(redis_client, task_id)
+        except Exception as e:
+            print(f"[{name}] 작업 처리 실패: {str(e)}")
+            await asyncio.sleep(1)
+
+async def reap(redis_client, stop: asyncio.Event):
+    """멈춘 작업을 주기적으로 재등록"""
+    while not stop.is_set():
+        try:
+            await requeue_stuck_jobs(redis_client)
+        except Exception as e:
+            print(f"멈춘 작업 확인 실패: {str(e)}")
+        try:
+            await asyncio.wait_for(stop.wait(), JOB_HEARTBEAT_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+async def run_worker(index, concurrency):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    redis_client = await wait_for_redis(stop)
+    if redis_client is None:
+        return
+
+    task_log_writer.start()
+    print(f"워커 {index} 시작 (동시 작업 {concurrency}개)")
+    try:
+        # 진행 중인 작업은 끝까지 처리한 뒤 종료
+        await asyncio.gather(
+            reap(redis_client, stop),
+            *[consume(f"worker-{index}-{i}", redis_client, stop) for i in range(concurrency)]
+        )
+    finally:
+        await task_log_writer.stop()
+        print(f"워커 {index} 종료")
+
+def worker_process(index, concurrency):
+    asyncio.run(run_worker(index, concurrency))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="작업 큐 워커")
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS, help="워커 프로세스 수")
+    parser.add_argument("--concurrency", type=int, default=JOB_WORKER_CONCURRENCY, help="프로세스당 동시 작업 수")
+    args = parser.parse_args()
+
+    processes = [
+        multiprocessing.Process(target=worker_process, args=(i, args.concurrency), name=f"worker-{i}")
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()